@@ -0,0 +1,66 @@
+""" This module benchmarks the 'parallel' executor against the single-process batch processor.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    Run from the repository root:  python -m benchmarks.bench_parallel [--recipes N] [--max-workers N]
+"""
+
+import argparse
+import os
+import time
+from brew_tools import batch, calculator, parallel
+from benchmarks.workloads import synthetic_recipes
+
+
+def _time(results):
+    start = time.perf_counter()
+    count = sum(1 for _ in results)
+    return count, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_parallel')
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=parallel.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--backend', choices=('decimal', 'float'), default='decimal')
+    args = parser.parse_args(argv)
+
+    # generate the recipes up front so only the calculation, serialization and IPC are timed
+    recipes = list(synthetic_recipes(args.recipes))
+
+    with calculator.backend(args.backend):
+        count, serial = _time(batch.result_to_json(result) for result in batch.process_recipes(recipes))
+    print('{:>8} {:>10} {:>12} {:>8} {:>11}'.format('workers', 'seconds', 'recipes/s', 'speedup', 'efficiency'))
+    print('{:>8} {:>10.2f} {:>12.0f} {:>8} {:>11}'.format('serial', serial, count / serial, '1.00x', '-'))
+
+    worker_counts = sorted(set([2 ** power for power in range(args.max_workers.bit_length())] + [args.max_workers]))
+    for workers in worker_counts:
+        lines = parallel.process_recipes(recipes, workers, args.chunk_size, ordered=False, backend=args.backend,
+                                         serialize=batch.result_to_json)
+        count, elapsed = _time(line for block in lines for line in block.splitlines())
+        speedup = serial / elapsed
+        print('{:>8} {:>10.2f} {:>12.0f} {:>7.2f}x {:>10.0%}'.format(
+            workers, elapsed, count / elapsed, speedup, speedup / workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+""" This module is the benchmark suite for the calculator, formatter and grain lookups.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    It runs offline and is reproducible:  every workload is generated from a fixed seed.  Run from the repository root:
+
+        python -m benchmarks.bench_suite                          # micro and catalog benchmarks
+        python -m benchmarks.bench_suite --save baseline.json     # ... and save the results
+        python -m benchmarks.bench_suite --compare baseline.json  # ... and fail on regressions against a baseline
+        python -m benchmarks.bench_suite --catalog-sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from itertools import count
+from brew_tools import batch, calculator, formatter, grains
+from benchmarks.workloads import synthetic_columns, synthetic_recipes
+
+DEFAULT_CATALOG_SIZES = (10000, 100000)
+
+# the catalog benchmarks take the best of this many runs, as time_per_call does for the micro benchmarks
+CATALOG_REPEAT = 3
+
+# a benchmark is a regression when it is this much slower than the baseline
+DEFAULT_THRESHOLD = .10
+
+GRAIN_LIST = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+
+# efficiencies with this many decimal places are rarely repeated, like per-grain calibrated efficiencies
+VARIED_EFFICIENCY_PLACES = 4
+
+
+def _micro_benchmarks():
+    grain_bill = calculator.calc_grain_bill(1.052, 5.5, GRAIN_LIST)
+    gravities, volumes, grain_lists = synthetic_columns(100)
+    table = calculator.get_fermentable_table()
+
+    # every call sees efficiencies it has not seen before
+    efficiencies = (.6 + step * 1e-7 for step in count())
+
+    def calc_grain_bill_varied():
+        efficiency = next(efficiencies)
+        calculator.calc_grain_bill(1.052, 5.5, (('American Wheat', .67, efficiency),
+                                                ('American Pale (2-Row)', .33, efficiency)))
+
+    return (
+        ('to_decimal', lambda: calculator.to_decimal(99.12345)),
+        ('convert_sg_to_ppg', lambda: calculator.convert_sg_to_ppg(1.052)),
+        ('convert_lbs_to_lbs_ounces', lambda: calculator.convert_lbs_to_lbs_ounces(12.33)),
+        ('calc_strike_temp', lambda: calculator.calc_strike_temp(1.25, 70, 152)),
+        ('calc_infusion_volume', lambda: calculator.calc_infusion_volume(104, 140, 210, 8, 8)),
+        ('calc_grain_bill', lambda: calculator.calc_grain_bill(1.052, 5.5, GRAIN_LIST)),
+        ('calc_grain_bill varied efficiency', calc_grain_bill_varied),
+        ('calc_grain_bills[100]', lambda: calculator.calc_grain_bills(gravities, volumes, grain_lists)),
+        ('format_grain_bill', lambda: formatter.format_grain_bill(grain_bill)),
+        ('grains.max_gravities lookup', lambda: grains.max_gravities['American Wheat']),
+        ('FermentableTable.expected_yield', lambda: table.expected_yield('American Wheat', .68)),
+    )
+
+
+def time_per_call(function, repeat=5):
+    """ Times a function with timeit, taking the best of several runs to filter out noise.
+
+    :param function:  The function to time.  It takes no arguments.
+    :param repeat:  The number of runs.
+    :return:  The best time per call, in seconds.
+    """
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run_micro_benchmarks(backend):
+    """ Runs the per-function micro benchmarks.
+
+    :param backend:  The calculator backend to run them with.
+    :return:  A dict of benchmark name to {'seconds': seconds per call}.
+    """
+
+    with calculator.backend(backend):
+        return dict((name, {'seconds': time_per_call(function)}) for (name, function) in _micro_benchmarks())
+
+
+def peak_bytes(function):
+    """ Measures the peak memory allocated while a function runs, with tracemalloc.
+
+    :param function:  The function to measure.  It takes no arguments.
+    :return:  The peak traced allocation, in bytes.
+    """
+
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_catalog_benchmarks(sizes, backend):
+    """ Runs the end-to-end catalog benchmarks:  calc_grain_bills over a whole synthetic catalog, again with rarely
+    repeated efficiencies, and the streaming batch processor over the same recipes formatted as JSON.  Peak memory is
+    traced separately from the timing runs, since tracing slows Python down.
+
+    :param sizes:  The catalog sizes, in recipes.
+    :param backend:  The calculator backend to run them with.
+    :return:  A dict of benchmark name to {'seconds': best total seconds, 'peak_bytes': peak traced allocation}.
+    """
+
+    results = {}
+    with calculator.backend(backend):
+        for size in sizes:
+            columns = synthetic_columns(size)
+            varied_columns = synthetic_columns(size, efficiency_places=VARIED_EFFICIENCY_PLACES)
+
+            def grain_bills():
+                calculator.calc_grain_bills(*columns)
+
+            def varied_grain_bills():
+                # a fresh table, so no efficiency has been seen before
+                calculator.reset_fermentable_table()
+                calculator.calc_grain_bills(*varied_columns)
+
+            def stream():
+                for result in batch.process_recipes(synthetic_recipes(size)):
+                    batch.result_to_json(result)
+
+            for (name, function) in (('catalog calc_grain_bills', grain_bills),
+                                     ('catalog calc_grain_bills varied efficiency', varied_grain_bills),
+                                     ('catalog batch stream', stream)):
+                seconds = min(timeit.repeat(function, repeat=CATALOG_REPEAT, number=1))
+                results['{}[{}]'.format(name, size)] = {'seconds': seconds, 'peak_bytes': peak_bytes(function)}
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ Compares benchmark results with a baseline.
+
+    :param results:  The benchmark results, as returned by run_micro_benchmarks or run_catalog_benchmarks.
+    :param baseline:  The baseline results, in the same form.
+    :param threshold:  The fractional slow-down that counts as a regression.
+    :return:  A list of (name, baseline_seconds, seconds, ratio, regressed) tuples for the benchmarks in both.
+    """
+
+    return [(name, baseline[name]['seconds'], result['seconds'], result['seconds'] / baseline[name]['seconds'],
+             result['seconds'] > baseline[name]['seconds'] * (1 + threshold))
+            for (name, result) in sorted(results.items()) if name in baseline]
+
+
+def _format_seconds(seconds):
+    for (unit, scale) in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{:.2f} {}'.format(seconds / scale, unit)
+
+    return '{:.0f} ns'.format(seconds / 1e-9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_suite')
+    parser.add_argument('--backend', choices=(calculator.DECIMAL, calculator.FLOAT), default=calculator.DECIMAL)
+    parser.add_argument('--catalog-sizes', type=int, nargs='*', default=DEFAULT_CATALOG_SIZES)
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a saved JSON baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = {}
+    if not args.skip_micro:
+        results.update(run_micro_benchmarks(args.backend))
+    results.update(run_catalog_benchmarks(args.catalog_sizes, args.backend))
+
+    for (name, result) in sorted(results.items()):
+        peak = ' {:>10.1f} MiB peak'.format(result['peak_bytes'] / 2 ** 20) if 'peak_bytes' in result else ''
+        print('{:<52} {:>10}{}'.format(name, _format_seconds(result['seconds']), peak))
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({'python': platform.python_version(), 'backend': args.backend, 'results': results},
+                      baseline_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+        comparison = compare(results, baseline, args.threshold)
+        print()
+        for (name, baseline_seconds, seconds, ratio, regressed) in comparison:
+            print('{:<52} {:>10} -> {:>10} {:>6.2f}x{}'.format(
+                name, _format_seconds(baseline_seconds), _format_seconds(seconds), ratio,
+                '  REGRESSION' if regressed else ''))
+
+        if any(regressed for (_, _, _, _, regressed) in comparison):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+""" This module generates the reproducible synthetic recipe workloads used by the benchmarks.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import random
+from brew_tools import batch, grains
+
+GRAIN_NAMES = sorted(name for (name, gravity) in grains.max_gravities.items() if gravity > 1)
+
+
+def synthetic_recipes(count, seed=0, efficiency_places=2):
+    """ Generates reproducible random recipes drawn from grains.max_gravities.
+
+    :param count:  The number of recipes.
+    :param seed:  The random seed.
+    :param efficiency_places:  The decimal places of the grain efficiencies.  More places give more distinct
+        efficiencies, as per-grain calibrated efficiencies do.  (Default is 2)
+    :return:  A generator of batch.BatchRecipe tuples.
+    """
+
+    rng = random.Random(seed)
+    for recipe_id in range(count):
+        ratios = [rng.uniform(.05, 1) for _ in range(rng.randint(1, 8))]
+        grain_list = tuple((rng.choice(GRAIN_NAMES), round(ratio / sum(ratios), 3),
+                            round(rng.uniform(.6, .8), efficiency_places)) for ratio in ratios)
+        yield batch.BatchRecipe(recipe_id, round(rng.uniform(1.030, 1.100), 3), round(rng.uniform(2, 20), 1),
+                                grain_list, 1.25, 68, round(rng.uniform(148, 158)))
+
+
+def synthetic_columns(count, seed=0, efficiency_places=2):
+    """ Generates reproducible random recipes as the parallel columns taken by calculator.calc_grain_bills.
+
+    :param count:  The number of recipes.
+    :param seed:  The random seed.
+    :param efficiency_places:  The decimal places of the grain efficiencies.  (Default is 2)
+    :return:  A tuple:  (target_gravities, volumes, grain_lists)
+    """
+
+    recipes = tuple(synthetic_recipes(count, seed, efficiency_places))
+    return (tuple(recipe.target_gravity for recipe in recipes),
+            tuple(recipe.volume for recipe in recipes),
+            tuple(recipe.grain_list for recipe in recipes))
@@ -1 +1,7 @@
 __author__ = 'Aaron'
+
+import os
+
+if os.environ.get('BREW_TOOLS_PROFILE'):
+    from brew_tools import profiling
+    profiling.enable()
@@ -0,0 +1,388 @@
+""" This module contains a streaming batch processor for running the calculator over large recipe files.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import argparse
+import csv
+import json
+import sys
+import tempfile
+from collections import namedtuple
+from contextlib import nullcontext
+from itertools import groupby, islice
+from brew_tools import calculator, formatter, validation
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# recipe and result files are read and written through buffers of this many bytes
+BUFFER_SIZE = 1024 * 1024
+
+CSV_FIELDS = ('id', 'target_gravity', 'volume', 'water_grist_ratio', 'grain_temp', 'mash_temp',
+              'grain', 'ratio', 'efficiency')
+
+BatchRecipe = namedtuple(
+    'BatchRecipe', 'id target_gravity volume grain_list water_grist_ratio grain_temp mash_temp')
+
+BatchResult = namedtuple('BatchResult', 'id grain_bill total_weight mash_water strike_temp')
+
+# the result for a recipe that could not be calculated; error is the exception type and message
+BatchError = namedtuple('BatchError', 'id error')
+
+# the exceptions a bad recipe can raise from the calculator
+RECIPE_ERRORS = (ArithmeticError, KeyError, TypeError, ValueError)
+
+
+def _optional_float(value):
+    return None if value is None or value == '' else float(value)
+
+
+def _error(recipe_id, error):
+    return BatchError(recipe_id, '{}: {}'.format(type(error).__name__, error))
+
+
+def read_jsonl_recipes(lines, resolve_names=False, skip_errors=False):
+    """ Reads recipes from JSON lines, one recipe object per line.  Blank lines are skipped.
+    Example:  {"id": "wit", "target_gravity": 1.052, "volume": 5.5, "grains": [["American Wheat", 0.67, 0.68]],
+               "water_grist_ratio": 1.25, "grain_temp": 70, "mash_temp": 152}
+
+    The mash fields are optional.
+
+    :param lines:  An iterable of text lines, such as an open file.
+    :param resolve_names:  When True, grain names are resolved with calculator.resolve_grain_list; names that cannot
+        be resolved are kept.  (Default is False)
+    :param skip_errors:  When True, a line that cannot be read as a recipe (eg. malformed JSON) yields a BatchError,
+        with the line number as its id unless the recipe has one, instead of stopping the batch.  (Default is False)
+    :return:  A generator of BatchRecipe (or BatchError) tuples.
+    :raises:
+        One of RECIPE_ERRORS for a line that cannot be read as a recipe, unless skip_errors is True.
+    """
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        recipe_id = line_number
+        try:
+            recipe = json.loads(line)
+            if not isinstance(recipe, dict):
+                raise ValueError('A recipe must be a JSON object.')
+
+            recipe_id = recipe.get('id', line_number)
+            grain_list = tuple((grain, float(ratio), float(efficiency))
+                               for (grain, ratio, efficiency) in recipe['grains'])
+            yield BatchRecipe(
+                recipe_id,
+                float(recipe['target_gravity']),
+                float(recipe['volume']),
+                calculator.resolve_grain_list(grain_list, False) if resolve_names else grain_list,
+                _optional_float(recipe.get('water_grist_ratio')),
+                _optional_float(recipe.get('grain_temp')),
+                _optional_float(recipe.get('mash_temp')))
+        except RECIPE_ERRORS as error:
+            if not skip_errors:
+                raise
+
+            yield _error(recipe_id, error)
+
+
+def read_csv_recipes(lines, resolve_names=False, skip_errors=False):
+    """ Reads recipes from CSV with a header row, one row per grain.  Consecutive rows with the same id make up one
+    recipe, whose other fields are taken from its first row.  The columns are listed in CSV_FIELDS; the mash columns
+    are optional.
+
+    :param lines:  An iterable of text lines, such as an open file.
+    :param resolve_names:  When True, grain names are resolved with calculator.resolve_grain_list; names that cannot
+        be resolved are kept.  (Default is False)
+    :param skip_errors:  When True, a recipe whose rows cannot be read (eg. an empty ratio) yields a BatchError
+        instead of stopping the batch.  (Default is False)
+    :return:  A generator of BatchRecipe (or BatchError) tuples.
+    :raises:
+        One of RECIPE_ERRORS for a recipe whose rows cannot be read, unless skip_errors is True.
+    """
+
+    for recipe_id, rows in groupby(csv.DictReader(lines), key=lambda row: row['id']):
+        try:
+            first = next(rows)
+            grain_list = [(first['grain'], float(first['ratio']), float(first['efficiency']))]
+            grain_list.extend((row['grain'], float(row['ratio']), float(row['efficiency'])) for row in rows)
+
+            yield BatchRecipe(
+                recipe_id,
+                float(first['target_gravity']),
+                float(first['volume']),
+                calculator.resolve_grain_list(grain_list, False) if resolve_names else tuple(grain_list),
+                _optional_float(first.get('water_grist_ratio')),
+                _optional_float(first.get('grain_temp')),
+                _optional_float(first.get('mash_temp')))
+        except RECIPE_ERRORS as error:
+            if not skip_errors:
+                raise
+
+            yield _error(recipe_id, error)
+
+
+def _calc_result(recipe, grain_bill):
+    total_weight = calculator.calc_total_grain_weight(grain_bill)
+    mash_water = strike_temp = None
+    if recipe.water_grist_ratio is not None:
+        mash_water = calculator.calc_mash_water_volume(recipe.water_grist_ratio, total_weight)
+        if recipe.grain_temp is not None and recipe.mash_temp is not None:
+            strike_temp = calculator.calc_strike_temp(recipe.water_grist_ratio, recipe.grain_temp, recipe.mash_temp)
+
+    return BatchResult(recipe.id, grain_bill, total_weight, mash_water, strike_temp)
+
+
+def _calc_recipes(recipes, skip_errors):
+    try:
+        grain_bills = calculator.calc_grain_bills(
+            tuple(recipe.target_gravity for recipe in recipes),
+            tuple(recipe.volume for recipe in recipes),
+            tuple(recipe.grain_list for recipe in recipes))
+        return [_calc_result(recipe, grain_bill) for (recipe, grain_bill) in zip(recipes, grain_bills)]
+    except RECIPE_ERRORS:
+        if not skip_errors:
+            raise
+
+    # redo the recipes one at a time to find the bad ones
+    results = []
+    for recipe in recipes:
+        try:
+            grain_bill = calculator.calc_grain_bill(recipe.target_gravity, recipe.volume, recipe.grain_list)
+            results.append(_calc_result(recipe, grain_bill))
+        except RECIPE_ERRORS as error:
+            results.append(_error(recipe.id, error))
+
+    return results
+
+
+def _calc_chunk(chunk, skip_errors):
+    recipes = [recipe for recipe in chunk if not isinstance(recipe, BatchError)]
+    if len(recipes) == len(chunk):
+        return _calc_recipes(chunk, skip_errors)
+
+    # recipes the reader could not read pass through in place
+    results = iter(_calc_recipes(recipes, skip_errors) if recipes else ())
+    return [recipe if isinstance(recipe, BatchError) else next(results) for recipe in chunk]
+
+
+def process_recipes(recipes, chunk_size=DEFAULT_CHUNK_SIZE, skip_errors=False):
+    """ Calculates the grain bill, total grain weight, mash water volume and strike temperature of each recipe.
+
+    Recipes are read and calculated chunk_size at a time through calculator.calc_grain_bills, so memory use depends
+    on the chunk size and not on the number of recipes.  The mash water volume and strike temperature are None for
+    recipes without the mash fields.
+
+    :param recipes:  An iterable of BatchRecipe tuples.  BatchErrors, such as those a reader yields with skip_errors,
+        are passed through in place.
+    :param chunk_size:  The number of recipes to calculate at a time.
+    :param skip_errors:  When True, a recipe that cannot be calculated (eg. an unknown grain) yields a BatchError
+        instead of stopping the batch.  (Default is False)
+    :return:  A generator of BatchResult (or BatchError) tuples, in input order.
+    :raises:
+        One of RECIPE_ERRORS for a recipe that cannot be calculated, unless skip_errors is True.
+    """
+
+    recipes = iter(recipes)
+    while True:
+        chunk = tuple(islice(recipes, chunk_size))
+        if not chunk:
+            return
+
+        for result in _calc_chunk(chunk, skip_errors):
+            yield result
+
+
+def format_result(result):
+    """ Formats a batch result as text lines:  the recipe id, the formatted grain bill, then the totals.
+
+    :param result:  The BatchResult (or BatchError) to format.
+    :return:  A tuple of formatted strings.
+    """
+
+    lines = ['Recipe {}'.format(result.id)]
+    if isinstance(result, BatchError):
+        lines.append('Error:  {}'.format(result.error))
+        return tuple(lines)
+
+    lines.extend(formatter.format_grain_bill(result.grain_bill))
+    lines.append('Total:  {} lbs'.format(result.total_weight))
+    if result.mash_water is not None:
+        lines.append('Mash water:  {} qt'.format(result.mash_water))
+    if result.strike_temp is not None:
+        lines.append('Strike temp:  {} F'.format(result.strike_temp))
+
+    return tuple(lines)
+
+
+def result_to_text(result):
+    """ Formats a batch result as text:  the lines from format_result, each followed by a newline.
+
+    :param result:  The BatchResult (or BatchError) to format.
+    :return:  The formatted text.
+    """
+
+    return '\n'.join(format_result(result)) + '\n'
+
+
+def result_to_json(result):
+    """ Serializes a batch result as a single line of JSON.  Decimal values are written as strings so no precision
+    is lost.
+
+    :param result:  The BatchResult (or BatchError) to serialize.
+    :return:  The JSON text, without a trailing newline.
+    """
+
+    if isinstance(result, BatchError):
+        return json.dumps({'id': result.id, 'error': result.error})
+
+    return json.dumps({
+        'id': result.id,
+        'grain_bill': [{'grain': grain, 'lbs': lbs, 'oz': ounces} for (grain, (lbs, ounces)) in result.grain_bill],
+        'total_weight': result.total_weight,
+        'mash_water': result.mash_water,
+        'strike_temp': result.strike_temp,
+    }, default=str)
+
+
+def write_text_results(results, stream):
+    """ Writes batch results as text, with a blank line after each recipe.
+
+    :param results:  An iterable of BatchResult (or BatchError) tuples.
+    :param stream:  A writable text stream.
+    """
+
+    for result in results:
+        stream.write(result_to_text(result))
+        stream.write('\n')
+
+
+def write_json_results(results, stream):
+    """ Writes batch results as JSON lines.
+
+    :param results:  An iterable of BatchResult (or BatchError) tuples.
+    :param stream:  A writable text stream.
+    """
+
+    for result in results:
+        stream.write(result_to_json(result))
+        stream.write('\n')
+
+
+READERS = {'csv': read_csv_recipes, 'jsonl': read_jsonl_recipes}
+WRITERS = {'text': write_text_results, 'json': write_json_results}
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m brew_tools.batch',
+        description='Calculate grain bills, mash water and strike temperatures for a file of recipes.')
+    parser.add_argument('input', help='the recipe file, or - for standard input')
+    parser.add_argument('-o', '--output', default='-', help='the output file, or - for standard output (default)')
+    parser.add_argument('--input-format', choices=sorted(READERS),
+                        help='the input format (default: from the input file extension, else jsonl)')
+    parser.add_argument('--output-format', choices=sorted(WRITERS) + ['columnar'], default='text',
+                        help='the output format; columnar writes a memory-mappable binary file and needs -o')
+    parser.add_argument('--backend', choices=(calculator.DECIMAL, calculator.FLOAT), default=calculator.DECIMAL)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--skip-errors', action='store_true',
+                        help='report recipes that cannot be read or calculated instead of stopping')
+    parser.add_argument('--resolve-names', action='store_true',
+                        help='resolve inexact grain names, such as "2 row pale", to catalog names')
+    parser.add_argument('--validate', action='store_true',
+                        help='check every recipe before calculating any; on problems, write a JSON report to '
+                             'standard error and exit with status 2')
+    return parser.parse_args(argv)
+
+
+def _open_text(path, mode):
+    if path == '-':
+        return nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+
+    return open(path, mode, buffering=BUFFER_SIZE, encoding='utf-8', newline='')
+
+
+def _copy_lines(lines, copy):
+    for line in lines:
+        copy.write(line)
+        yield line
+
+
+def main(argv=None):
+    """ Runs the batch processor from the command line.
+
+    :param argv:  The command line arguments, excluding the program name.  (Default is sys.argv[1:])
+    :return:  The process exit status.
+    """
+
+    args = _parse_args(argv)
+    input_format = args.input_format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+
+    if args.output_format == 'columnar' and args.output == '-':
+        sys.stderr.write('The columnar output format needs an output file (-o).\n')
+        return 2
+
+    def read_recipes(source, skip_errors=args.skip_errors):
+        return READERS[input_format](source, args.resolve_names, skip_errors)
+
+    spool = None
+    if args.validate:
+        with _open_text(args.input, 'r') as source:
+            if args.input == '-':
+                # standard input can only be read once, so it is copied to a temporary file as it is validated, and
+                # the recipes are calculated from the copy
+                spool = tempfile.TemporaryFile('w+', buffering=BUFFER_SIZE, encoding='utf-8', newline='')
+                source = _copy_lines(source, spool)
+            report = validation.validate_recipes(read_recipes(source, True))
+
+        if not report.ok:
+            if spool is not None:
+                spool.close()
+            json.dump(report.as_dict(), sys.stderr, indent=2)
+            sys.stderr.write('\n')
+            return 2
+
+        if spool is not None:
+            spool.seek(0)
+
+    def open_source():
+        return spool if spool is not None else _open_text(args.input, 'r')
+
+    if args.output_format == 'columnar':
+        # imported here because the columnar module builds on this one
+        from brew_tools import columnar
+
+        with calculator.backend(args.backend):
+            with open_source() as source:
+                columnar.write_columnar_results(process_recipes(read_recipes(source), args.chunk_size,
+                                                                args.skip_errors), args.output)
+        return 0
+
+    with calculator.backend(args.backend):
+        with open_source() as source, _open_text(args.output, 'w') as sink:
+            results = process_recipes(read_recipes(source), args.chunk_size, args.skip_errors)
+            WRITERS[args.output_format](results, sink)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+""" This module contains a memoizing cache layer over the most frequently repeated calculator functions.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from numbers import Number
+from threading import Lock
+from brew_tools import calculator
+
+# int and float arguments are rounded to this many decimal places when building cache keys, so float noise
+# (eg. 0.1 + 0.2 versus 0.3) does not cause misses
+KEY_DECIMAL_PLACES = 9
+DEFAULT_MAXSIZE = 1024
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """ A thread-safe, size-bounded mapping that evicts the least recently used entry when full.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        """ Create an empty cache.
+
+        :param maxsize:  The maximum number of entries to hold.
+        :raises:
+            ValueError when maxsize is less than one.
+        """
+
+        if maxsize < 1:
+            raise ValueError('"maxsize" argument must be a positive integer.')
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """ Gets the cached value for the key and marks it as most recently used, counting a hit or a miss.
+
+        :param key:  The cache key.
+        :param default:  The value to return when the key is not cached.
+        :return:  The cached value, or the default.
+        """
+
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """ Caches the value for the key, evicting the least recently used entries if the cache is full.
+
+        :param key:  The cache key.
+        :param value:  The value to cache.
+        """
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        """ Changes the maximum number of entries, evicting the least recently used entries if necessary.
+
+        :param maxsize:  The new maximum number of entries.
+        :raises:
+            ValueError when maxsize is less than one.
+        """
+
+        if maxsize < 1:
+            raise ValueError('"maxsize" argument must be a positive integer.')
+
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """ Removes every entry.  The hit, miss and eviction counters are kept.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """ Gets the cache counters.
+
+        :return:  A dict with the hits, misses, evictions, current size and maxsize of the cache.
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+_cache = LRUCache()
+_fermentable_table = None
+
+
+def normalize(value):
+    """ Normalizes an argument into a hashable cache key component.  Lists and tuples become tuples (recursively),
+    ints and floats are rounded to KEY_DECIMAL_PLACES as floats, and other numbers, such as Decimals, are keyed
+    exactly, tagged with their type.  The calculator keeps a Decimal's exact value where it would round a float, so
+    the two must not share a key.
+
+    :param value:  The argument value.
+    :return:  The normalized value.
+    """
+
+    if isinstance(value, (tuple, list)):
+        return tuple(normalize(item) for item in value)
+
+    if isinstance(value, bool) or not isinstance(value, Number):
+        return value
+
+    if isinstance(value, (int, float)):
+        return round(float(value), KEY_DECIMAL_PLACES)
+
+    # as_tuple keeps the exponent, so Decimal('5.5') and Decimal('5.50') do not share a key either
+    return (type(value), value.as_tuple() if isinstance(value, Decimal) else value)
+
+
+def _cached(function, *args):
+    global _fermentable_table
+
+    # a replaced grains.max_gravities gets a new table, which makes every cached grain bill stale
+    table = calculator.get_fermentable_table()
+    if table is not _fermentable_table:
+        _cache.clear()
+        _fermentable_table = table
+
+    key = (function.__name__, calculator.get_backend(), normalize(args))
+    result = _cache.get(key, _MISSING)
+    if result is _MISSING:
+        result = function(*args)
+        _cache.put(key, result)
+
+    return result
+
+
+def calc_grain_bill(target_gravity, volume, grain_list):
+    """ Cached version of calculator.calc_grain_bill.  Grain lists may be given as tuples or lists.
+
+    :param target_gravity: The target original gravity.
+    :param volume: The target post-boil volume, in gallons.
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :return:  The recipe's grain bill as a calculator.GrainBill, which behaves as a tuple of (grain_name, (lbs, oz))
+        lines.
+    """
+
+    return _cached(calculator.calc_grain_bill, target_gravity, volume, grain_list)
+
+
+def calc_strike_temp(water_grist_ratio, initial_temp, target_temp):
+    """ Cached version of calculator.calc_strike_temp.
+
+    :param water_grist_ratio: The water-to-grist ratio as quarts/pound.
+    :param initial_temp: The current temperature of the grains (at room temperature), in degrees Fahrenheit.
+    :param target_temp: The target temperature of the mash after the grains are added, in degrees Fahrenheit.
+    :return:  The necessary temperature of the strike water to achieve the target temperature, in degrees Fahrenheit.
+    """
+
+    return _cached(calculator.calc_strike_temp, water_grist_ratio, initial_temp, target_temp)
+
+
+def calc_infusion_volume(initial_temp, target_temp, infusion_temp, water_in_mash, grain_in_mash):
+    """ Cached version of calculator.calc_infusion_volume.
+
+    :param initial_temp:  The current temperature of the mash, in degrees Fahrenheit.
+    :param target_temp:  The target temperature of the mash, in degrees Fahrenheit.
+    :param infusion_temp:  The temperature of the infusion water being added to the mash, in degrees Fahrenheit.
+    :param water_in_mash:  The amount of water in the mash, in quarts.
+    :param grain_in_mash:   The amount of grains in the mash, in pounds.
+    :return:  The amount of water (in quarts) to add to the mash to achieve the target temperature.
+    """
+
+    return _cached(
+        calculator.calc_infusion_volume, initial_temp, target_temp, infusion_temp, water_in_mash, grain_in_mash)
+
+
+def set_maxsize(maxsize):
+    """ Sets the maximum number of cached results.
+
+    :param maxsize:  The new maximum number of entries.
+    :raises:
+        ValueError when maxsize is less than one.
+    """
+
+    _cache.resize(maxsize)
+
+
+def invalidate():
+    """ Discards every cached result and the fermentable table.  Call this after editing
+    grains.max_gravities in place; replacing the dict is detected automatically.
+    """
+
+    _cache.clear()
+    calculator.reset_fermentable_table()
+
+
+def stats():
+    """ Gets the cache's hit, miss and eviction counters.
+
+    :return:  A dict with the hits, misses, evictions, current size and maxsize of the cache.
+    """
+
+    return _cache.stats()
@@ -21,9 +21,46 @@
     along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
 """
 
+from array import array
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
 from numbers import Number
+from threading import Lock
 from decimal import Decimal, ROUND_HALF_UP
-from brew_tools import grains
+from brew_tools import grains, lookup
+
+
+# numeric backends; see set_backend
+DECIMAL = 'decimal'
+FLOAT = 'float'
+
+_QUANTUMS = {}
+
+# units for GrainBill.weights
+POUNDS = 'lb'
+OUNCES = 'oz'
+KILOGRAMS = 'kg'
+GRAMS = 'g'
+
+# the weight of a tenth of an ounce in each unit; GrainBill keeps ounces as whole tenths
+_TENTH_OUNCE_WEIGHTS = {POUNDS: '0.00625', OUNCES: '0.1', KILOGRAMS: '0.0028349523125', GRAMS: '2.8349523125'}
+
+# the number of efficiencies a FermentableTable keeps a grain's expected yields for before starting over
+_MAX_CACHED_EFFICIENCIES = 1024
+
+_fermentable_table = None
+
+
+def _quantum(decimal_places):
+    """ Gets the Decimal quantum for rounding to the specified number of decimal places, eg. 3 -> Decimal('0.001')
+    """
+
+    quantum = _QUANTUMS.get(decimal_places)
+    if quantum is None:
+        quantum = _QUANTUMS[decimal_places] = Decimal(1).scaleb(-decimal_places)
+
+    return quantum
 
 
 def to_decimal(value, decimal_places=3):
@@ -43,16 +80,126 @@ def to_decimal(value, decimal_places=3):
     if not isinstance(decimal_places, int):
         raise TypeError('"decimal_places" argument must be a non-negative integer')
 
-    value = Decimal(value)
-
-    if decimal_places > 0:
-        precision_format = '.' + ('0' * (decimal_places - 1)) + '1'
-    elif decimal_places == 0:
-        precision_format = '1'
-    else:
+    if decimal_places < 0:
         raise ValueError('"decimal_places" argument must be a non-negative integer.')
 
-    return Decimal(value.quantize(Decimal(precision_format), rounding=ROUND_HALF_UP))
+    return Decimal(value).quantize(_quantum(decimal_places), rounding=ROUND_HALF_UP)
+
+
+def _to_float(value, decimal_places=3):
+    """ The float backend's counterpart to to_decimal:  rounds the value as a float.
+    """
+
+    if not isinstance(value, Number):
+        raise TypeError('"value" argument must be a number.')
+
+    return round(float(value), decimal_places)
+
+
+class _DecimalBackend(object):
+    """ Exact arithmetic:  values are Decimals, rounded half-up.  This is the default backend.
+    """
+
+    name = DECIMAL
+    to_number = Decimal
+    round_to = staticmethod(to_decimal)
+
+    @staticmethod
+    def quantize(value, decimal_places):
+        # unchecked round_to for values already known to be Decimals
+        return value.quantize(_quantum(decimal_places), ROUND_HALF_UP)
+
+
+class _FloatBackend(object):
+    """ Fast arithmetic:  values are plain floats, rounded with the builtin round().
+    """
+
+    name = FLOAT
+    to_number = float
+    round_to = staticmethod(_to_float)
+    quantize = staticmethod(round)
+
+
+_BACKENDS = {DECIMAL: _DecimalBackend(), FLOAT: _FloatBackend()}
+
+_default_backend = _BACKENDS[DECIMAL]
+_backend_override = ContextVar('brew_tools_calculator_backend', default=None)
+
+
+def _current_backend():
+    return _backend_override.get() or _default_backend
+
+
+def _get_backend(name):
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError('"name" argument must be one of: {}.'.format(', '.join(sorted(_BACKENDS))))
+
+
+def get_backend():
+    """ Gets the name of the numeric backend used by the calculation functions in the current context.
+
+    :return:  DECIMAL or FLOAT.
+    """
+
+    return _current_backend().name
+
+
+def set_backend(name):
+    """ Sets the module-wide numeric backend used by the calculation functions.
+
+    The DECIMAL backend (the default) computes with Decimals and returns Decimals.  The FLOAT backend runs the same
+    calculations on plain floats and returns floats rounded to the same number of decimal places, which is much faster
+    and suited to planning and sweep workloads that do not need exact decimal arithmetic.  to_decimal always returns a
+    Decimal, whichever backend is selected.
+
+    :param name:  DECIMAL or FLOAT.
+    :raises:
+        ValueError when the backend name is unknown.
+    """
+
+    global _default_backend
+    _default_backend = _get_backend(name)
+
+
+@contextmanager
+def backend(name):
+    """ Context manager that selects the numeric backend for the enclosed block, in the current thread or task only.
+    Example:  with calculator.backend(calculator.FLOAT): calculator.calc_grain_bill(...)
+
+    :param name:  DECIMAL or FLOAT.
+    :raises:
+        ValueError when the backend name is unknown.
+    """
+
+    token = _backend_override.set(_get_backend(name))
+    try:
+        yield
+    finally:
+        _backend_override.reset(token)
+
+
+def to_number(value, decimal_places=None):
+    """ Convert the provided number value to the number type of the current backend:  a Decimal, or a float when the
+    FLOAT backend is selected.
+
+    :param value: The number value to convert.
+    :param decimal_places: The number of decimal places to round to, or None to convert without rounding.
+        (Default is None)
+    :return: The converted value.
+    :raises:
+        TypeError when the value is not a valid numeric type.
+    """
+
+    if not isinstance(value, Number):
+        raise TypeError('"value" argument must be a number.')
+
+    numbers = _current_backend()
+    if decimal_places is None:
+        return numbers.to_number(value)
+
+    return numbers.round_to(value, decimal_places)
 
 
 def convert_sg_to_ppg(gravity):
@@ -63,7 +210,8 @@ def convert_sg_to_ppg(gravity):
     :return: The calculated ppg value.
     """
 
-    return int((to_decimal(gravity) - 1) * 1000)
+    # the rounded gravity makes this a whole number; round() only absorbs float noise in the float backend
+    return int(round((_current_backend().round_to(gravity) - 1) * 1000))
 
 
 def convert_lbs_to_lbs_ounces(lbs):
@@ -74,8 +222,9 @@ def convert_lbs_to_lbs_ounces(lbs):
     :return:  The tuple representing pounds and ounces.
     """
 
+    numbers = _current_backend()
     pounds = int(lbs)
-    ounces = to_decimal((Decimal(lbs) - pounds) * 16, 1)
+    ounces = numbers.round_to((numbers.to_number(lbs) - pounds) * 16, 1)
     return pounds, ounces
 
 
@@ -87,7 +236,7 @@ def calc_total_gravity_points(specific_gravity, gallons):
     :return: The total number of gravity points based on the SG and volume.
     """
 
-    return to_decimal(convert_sg_to_ppg(specific_gravity) * gallons)
+    return _current_backend().round_to(convert_sg_to_ppg(specific_gravity) * gallons)
 
 
 def calc_expected_yield(max_yield, efficiency):
@@ -98,7 +247,7 @@ def calc_expected_yield(max_yield, efficiency):
     :return:  The calculated expected yield.
     """
 
-    return to_decimal(max_yield * efficiency)
+    return _current_backend().round_to(max_yield * efficiency)
 
 
 def calc_grain_qty(total_gravity_points, grain_ratio, expected_yield):
@@ -110,7 +259,346 @@ def calc_grain_qty(total_gravity_points, grain_ratio, expected_yield):
     :return:  The grain's total recipe weight, in pounds.
     """
 
-    return to_decimal(total_gravity_points * Decimal(grain_ratio) / Decimal(expected_yield))
+    numbers = _current_backend()
+    return numbers.round_to(total_gravity_points * numbers.to_number(grain_ratio) / numbers.to_number(expected_yield))
+
+
+class FermentableTable(object):
+    """ A lazily built, read-only view of a fermentables mapping such as grains.max_gravities.
+
+    Grains are assigned integer ids as they are first used, and their specific gravities and PPG values are held in
+    typed arrays indexed by that id.  Nothing is read from the mapping up front, so a large or memory-mapped catalog
+    costs only the grains actually used.  A grain's gravity is read from the mapping again each time it is looked up
+    in a mutable mapping, so editing grains.max_gravities in place takes effect at once.  Expected yields are cached
+    per grain and efficiency.
+    """
+
+    __slots__ = ('source', 'names', 'ids', 'gravities', 'ppgs', '_expected_yields', '_mutable', '_lock')
+
+    def __init__(self, max_gravities):
+        """ Create the table.
+
+        :param max_gravities: A mapping of grain name to maximum specific gravity.
+        """
+
+        self.source = max_gravities
+        self.names = []
+        self.ids = {}
+        self.gravities = array('d')
+        self.ppgs = array('l')
+        self._expected_yields = []
+        self._mutable = isinstance(max_gravities, MutableMapping)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.source)
+
+    def grain_id(self, grain):
+        """ Gets the id of a grain, assigning one the first time the grain is used.
+
+        :param grain: The grain name.
+        :return:  The grain id:  its index into names, gravities and ppgs.
+        :raises:
+            KeyError when the grain is not in the mapping.
+        """
+
+        grain_id = self.ids.get(grain)
+        if grain_id is not None and not self._mutable:
+            return grain_id
+
+        gravity = float(self.source[grain])
+        if grain_id is None:
+            with self._lock:
+                grain_id = self.ids.get(grain)
+                if grain_id is None:
+                    self.names.append(grain)
+                    self.gravities.append(gravity)
+                    self.ppgs.append(convert_sg_to_ppg(gravity))
+                    self._expected_yields.append({})
+                    grain_id = self.ids[grain] = len(self.names) - 1
+        elif gravity != self.gravities[grain_id]:
+            # the mapping was edited in place since the grain was last used
+            self.gravities[grain_id] = gravity
+            self.ppgs[grain_id] = convert_sg_to_ppg(gravity)
+            self._expected_yields[grain_id] = {}
+
+        return grain_id
+
+    def _expected_yield(self, grain_id, efficiency):
+        expected_yields = self._expected_yields[grain_id]
+        key = (_current_backend().name, efficiency)
+        expected_yield = expected_yields.get(key)
+        if expected_yield is None:
+            if len(expected_yields) >= _MAX_CACHED_EFFICIENCIES:
+                expected_yields.clear()
+            expected_yield = expected_yields[key] = calc_expected_yield(self.ppgs[grain_id], efficiency)
+
+        return expected_yield
+
+    def expected_yield(self, grain, efficiency):
+        """ Gets the expected yield of a grain at the given mash efficiency.
+
+        :param grain: The grain name.
+        :param efficiency: The expected conversion efficiency of the grain in the mash.
+        :return:  The expected yield of the grain.
+        :raises:
+            KeyError when the grain is not in the mapping.
+        """
+
+        return self._expected_yield(self.grain_id(grain), efficiency)
+
+
+def get_fermentable_table():
+    """ Gets the table for grains.max_gravities, creating it on first use.  Assigning a new catalog to
+    grains.max_gravities is picked up automatically, as are in-place edits.
+
+    :return:  The FermentableTable for grains.max_gravities.
+    """
+
+    global _fermentable_table
+
+    table = _fermentable_table
+    if table is None or table.source is not grains.max_gravities:
+        table = _fermentable_table = FermentableTable(grains.max_gravities)
+
+    return table
+
+
+def reset_fermentable_table():
+    """ Discards the fermentable table, and the expected yields it has cached, so it is rebuilt on next use.
+    """
+
+    global _fermentable_table
+    _fermentable_table = None
+
+
+class GrainBill(object):
+    """ A compact, read-only grain bill.
+
+    The grain ids, whole pounds and tenths of an ounce of every line are packed into a single typed array, and grain
+    names are shared with the fermentable table, so a cached grain bill costs a fraction of the equivalent nested
+    tuples.  A GrainBill still behaves like the tuple of (grain_name, (lbs, oz)) lines that calc_grain_bill has always
+    returned:  it can be iterated, indexed, unpacked and compared with those tuples.
+    """
+
+    __slots__ = ('names', 'exact', '_data')
+
+    def __init__(self, names, grain_ids, pounds, tenths, exact=True):
+        """ Create a grain bill from its columns.
+
+        :param names:  A sequence of grain names, indexed by grain id.
+        :param grain_ids:  The grain id of each line.
+        :param pounds:  The whole pounds of each line.
+        :param tenths:  The remaining weight of each line, in tenths of an ounce.
+        :param exact:  True if ounces are Decimals (the DECIMAL backend), False if they are floats.
+        :raises:
+            ValueError when the columns are not all the same length.
+        """
+
+        if not len(grain_ids) == len(pounds) == len(tenths):
+            raise ValueError('"grain_ids", "pounds" and "tenths" must be the same length.')
+
+        self.names = names
+        self.exact = exact
+        self._data = array('i', grain_ids)
+        self._data.extend(pounds)
+        self._data.extend(tenths)
+
+    @classmethod
+    def from_lines(cls, table, lines):
+        """ Create a grain bill from (grain_name, (lbs, oz)) lines, in the current backend.
+
+        :param table:  The FermentableTable the grain names belong to.
+        :param lines:  An iterable of (grain_name, (lbs, oz)) tuples, with ounces to one decimal place.
+        :return:  The GrainBill.
+        :raises:
+            KeyError when a grain is not in the table.
+        """
+
+        grain_ids = array('i')
+        pounds = array('i')
+        tenths = array('i')
+        for (grain, (lbs, ounces)) in lines:
+            grain_ids.append(table.grain_id(grain))
+            pounds.append(lbs)
+            tenths.append(int(round(ounces * 10)))
+
+        return cls(table.names, grain_ids, pounds, tenths, _current_backend().name == DECIMAL)
+
+    def __len__(self):
+        return len(self._data) // 3
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(GrainBillLine(self, line) for line in range(len(self))[index])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('grain bill index out of range')
+
+        return GrainBillLine(self, index)
+
+    def __iter__(self):
+        return (GrainBillLine(self, line) for line in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, (GrainBill, tuple)):
+            return tuple(self) == tuple(other)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return 'GrainBill({!r})'.format(tuple(tuple(line) for line in self))
+
+    def __reduce__(self):
+        # pickle only the names this bill uses, not the whole fermentable table, and the columns as raw bytes
+        grain_ids = self.grain_ids
+        used = sorted(set(grain_ids))
+        local_ids = dict((grain_id, local_id) for (local_id, grain_id) in enumerate(used))
+        data = array('i', (local_ids[grain_id] for grain_id in grain_ids))
+        data.extend(self._data[len(self):])
+        return (_unpickle_grain_bill, (tuple(self.names[grain_id] for grain_id in used), data.tobytes(), self.exact))
+
+    @property
+    def grain_ids(self):
+        """ The grain id of each line, as an array of indexes into names.
+        """
+
+        return self._data[:len(self)]
+
+    @property
+    def pounds(self):
+        """ The whole pounds of each line, as an array.
+        """
+
+        return self._data[len(self):2 * len(self)]
+
+    @property
+    def tenths(self):
+        """ The remaining weight of each line in tenths of an ounce, as an array.
+        """
+
+        return self._data[2 * len(self):]
+
+    def _ounces(self, tenths):
+        return Decimal(tenths).scaleb(-1) if self.exact else tenths / 10
+
+    def _tenth_ounces(self):
+        # the weight of each line in tenths of an ounce
+        count = len(self)
+        data = self._data
+        return [data[count + line] * 160 + data[2 * count + line] for line in range(count)]
+
+    def total_weight(self):
+        """ Calculates the total weight of the grain bill, in the current backend.  The result is the same as
+        calc_total_grain_weight over each line's lbs + oz / 16.
+
+        :return:  The total weight, in pounds.
+        """
+
+        numbers = _current_backend()
+        return numbers.quantize(
+            numbers.to_number(sum(self._tenth_ounces())) * numbers.to_number(_TENTH_OUNCE_WEIGHTS[POUNDS]), 3)
+
+    def percentages(self):
+        """ Calculates each line's share of the total weight, in the current backend.
+
+        :return:  A tuple of percentages to one decimal place, one per line.
+        """
+
+        numbers = _current_backend()
+        tenth_ounces = self._tenth_ounces()
+        total = numbers.to_number(sum(tenth_ounces))
+        if not total:
+            return tuple(numbers.to_number(0, 1) for _ in tenth_ounces)
+
+        return tuple(numbers.quantize(numbers.to_number(weight * 100) / total, 1) for weight in tenth_ounces)
+
+    def weights(self, unit=POUNDS):
+        """ Converts each line's weight to a single unit, in the current backend.
+
+        :param unit:  POUNDS, OUNCES, KILOGRAMS or GRAMS.  (Default is POUNDS)
+        :return:  A tuple of weights to three decimal places, one per line.
+        :raises:
+            ValueError when the unit is unknown.
+        """
+
+        if unit not in _TENTH_OUNCE_WEIGHTS:
+            raise ValueError('"unit" argument must be one of: {}.'.format(', '.join(sorted(_TENTH_OUNCE_WEIGHTS))))
+
+        numbers = _current_backend()
+        tenth_ounce = numbers.to_number(_TENTH_OUNCE_WEIGHTS[unit])
+        return tuple(numbers.quantize(numbers.to_number(weight) * tenth_ounce, 3) for weight in self._tenth_ounces())
+
+
+def _unpickle_grain_bill(names, data, exact):
+    grain_bill = GrainBill.__new__(GrainBill)
+    grain_bill.names = names
+    grain_bill.exact = exact
+    grain_bill._data = array('i')
+    grain_bill._data.frombytes(data)
+    return grain_bill
+
+
+class GrainBillLine(object):
+    """ A view of one line of a GrainBill that behaves like the tuple (grain_name, (lbs, oz)).
+    """
+
+    __slots__ = ('bill', 'index')
+
+    def __init__(self, bill, index):
+        self.bill = bill
+        self.index = index
+
+    @property
+    def grain_id(self):
+        return self.bill._data[self.index]
+
+    @property
+    def grain(self):
+        return self.bill.names[self.bill._data[self.index]]
+
+    @property
+    def lbs(self):
+        return self.bill._data[len(self.bill) + self.index]
+
+    @property
+    def ounces(self):
+        return self.bill._ounces(self.bill._data[2 * len(self.bill) + self.index])
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self.grain
+        yield (self.lbs, self.ounces)
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (GrainBillLine, tuple)):
+            return tuple(self) == tuple(other)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return repr(tuple(self))
 
 
 def calc_grain_bill(target_gravity, volume, grain_list):
@@ -119,34 +607,119 @@ def calc_grain_bill(target_gravity, volume, grain_list):
     :param target_gravity: The target original gravity.
     :param volume: The target post-boil volume, in gallons.
     :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
-    :return:  The recipe's grain bill as a tuple: (grain_name, weight_in_pounds)
+    :return:  The recipe's grain bill as a GrainBill, which behaves as a tuple of (grain_name, (lbs, oz)) lines
     """
 
     total_gravity_points = calc_total_gravity_points(target_gravity, volume)
+    table = get_fermentable_table()
 
-    return tuple(
+    return GrainBill.from_lines(table, (
         (grain,
          convert_lbs_to_lbs_ounces(
              calc_grain_qty(
                  total_gravity_points,
                  ratio,
-                 calc_expected_yield(convert_sg_to_ppg(grains.max_gravities[grain]), efficiency))))
+                 table.expected_yield(grain, efficiency))))
         for (grain, ratio, efficiency) in grain_list
-    )
+    ))
+
+
+def resolve_grain_list(grain_list, strict=True):
+    """ Resolves the grain names of a grain list through the fuzzy fermentable index (see the lookup module), so
+    names such as '2 row pale' can be given to calc_grain_bill.  Catalog names are returned unchanged.
+
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :param strict:  When False, names that cannot be resolved are kept as they are, to be reported later as unknown
+        grains.  (Default is True)
+    :return:  The grain list as a tuple, with catalog grain names.
+    :raises:
+        KeyError when a grain name cannot be resolved, if strict.
+    """
+
+    index = lookup.get_index()
+    resolved = []
+    for (grain, ratio, efficiency) in grain_list:
+        try:
+            grain = index.resolve(grain)
+        except KeyError:
+            if strict:
+                raise
+        resolved.append((grain, ratio, efficiency))
+
+    return tuple(resolved)
+
+
+def calc_grain_bills(target_gravities, volumes, grain_lists):
+    """ Calculate the grain bills of many recipes in a single pass.
+
+    The recipes are supplied as parallel columns.  Total gravity points are computed once per distinct gravity and
+    volume, and grain yields are cached per grain and efficiency in the fermentable table, so a large catalog drawn from
+    the same fermentables costs little more than the per-line arithmetic.  The results are identical to calling
+    calc_grain_bill once per recipe.
+
+    :param target_gravities: The target original gravity of each recipe.
+    :param volumes: The target post-boil volume of each recipe, in gallons.
+    :param grain_lists: The grain list of each recipe, as accepted by calc_grain_bill.
+    :return:  A tuple of GrainBills, one per recipe, in the order of the input columns.
+    :raises:
+        ValueError when the columns are not all the same length.
+    """
+
+    if not len(target_gravities) == len(volumes) == len(grain_lists):
+        raise ValueError('"target_gravities", "volumes" and "grain_lists" must be the same length.')
+
+    numbers = _current_backend()
+    exact = numbers.name == DECIMAL
+    table = get_fermentable_table()
+    gravity_points = {}
+    ratios = {}
+    grain_bills = []
+
+    for target_gravity, volume, grain_list in zip(target_gravities, volumes, grain_lists):
+        total_gravity_points = gravity_points.get((target_gravity, volume))
+        if total_gravity_points is None:
+            total_gravity_points = calc_total_gravity_points(target_gravity, volume)
+            gravity_points[(target_gravity, volume)] = total_gravity_points
+
+        line_ids = array('i')
+        pounds = array('i')
+        tenths = array('i')
+        for (grain, ratio, efficiency) in grain_list:
+            grain_id = table.grain_id(grain)
+            expected_yield = table._expected_yield(grain_id, efficiency)
+
+            number_ratio = ratios.get(ratio)
+            if number_ratio is None:
+                number_ratio = ratios[ratio] = numbers.to_number(ratio)
+
+            # same rounding as calc_grain_qty and convert_lbs_to_lbs_ounces, without re-validating each value
+            weight = numbers.quantize(total_gravity_points * number_ratio / expected_yield, 3)
+            lbs = int(weight)
+            line_ids.append(grain_id)
+            pounds.append(lbs)
+            tenths.append(int(round(numbers.quantize((weight - lbs) * 16, 1) * 10)))
+
+        grain_bills.append(GrainBill(table.names, line_ids, pounds, tenths, exact))
+
+    return tuple(grain_bills)
 
 
 def calc_total_grain_weight(grain_bill):
     """ Calculates the total weight of a grain bill by summing the weights of the grains.
 
-    :param grain_bill:  The grain bill to sum.
+    :param grain_bill:  The grain bill to sum:  a GrainBill, or (grain_name, weight_in_pounds) tuples.
     :return:  The total sum of the individual grain weights, in pounds.
     """
 
-    total_weight = Decimal('0')
+    if isinstance(grain_bill, GrainBill):
+        return grain_bill.total_weight()
+
+    numbers = _current_backend()
+    total_weight = numbers.to_number('0')
     for (grain, weight) in grain_bill:
-        total_weight += Decimal(weight)
+        total_weight += numbers.to_number(weight)
 
-    return to_decimal(total_weight)
+    return numbers.round_to(total_weight)
 
 
 def calc_mash_water_volume(water_grist_ratio, grains_weight):
@@ -157,7 +730,13 @@ def calc_mash_water_volume(water_grist_ratio, grains_weight):
     :return:  The amount of water necessary to achieve the ratio, in quarts.
     """
     
-    return to_decimal(water_grist_ratio * grains_weight)
+    # multiply the values as given, so float arguments round as they always have; only a Decimal mixed with a float
+    # needs converting, and the float goes through str() so it keeps the value it prints as
+    if isinstance(water_grist_ratio, Decimal) != isinstance(grains_weight, Decimal):
+        water_grist_ratio, grains_weight = (value if isinstance(value, Decimal) else Decimal(str(value))
+                                            for value in (water_grist_ratio, grains_weight))
+
+    return _current_backend().round_to(water_grist_ratio * grains_weight)
 
 
 def calc_strike_temp(water_grist_ratio, initial_temp, target_temp):
@@ -169,12 +748,13 @@ def calc_strike_temp(water_grist_ratio, initial_temp, target_temp):
     :return:  The necessary temperature of the strike water to achieve the target temperature, in degrees Fahrenheit.
     """
 
-    water_grist_ratio = Decimal(water_grist_ratio)
-    initial_temp = Decimal(initial_temp)
-    target_temp = Decimal(target_temp)
-    thermodynamic_constant = Decimal('0.2')
+    numbers = _current_backend()
+    water_grist_ratio = numbers.to_number(water_grist_ratio)
+    initial_temp = numbers.to_number(initial_temp)
+    target_temp = numbers.to_number(target_temp)
+    thermodynamic_constant = numbers.to_number('0.2')
 
-    return to_decimal((thermodynamic_constant / water_grist_ratio) * (target_temp - initial_temp) + target_temp)
+    return numbers.round_to((thermodynamic_constant / water_grist_ratio) * (target_temp - initial_temp) + target_temp)
 
 
 def calc_infusion_volume(initial_temp, target_temp, infusion_temp, water_in_mash, grain_in_mash):
@@ -188,11 +768,12 @@ def calc_infusion_volume(initial_temp, target_temp, infusion_temp, water_in_mash
     :return:  The amount of water (in quarts) to add to the mash to achieve the target temperature.
     """
 
-    initial_temp = Decimal(initial_temp)
-    target_temp = Decimal(target_temp)
-    infusion_temp = Decimal(infusion_temp)
-    water_in_mash = Decimal(water_in_mash)
-    grain_in_mash = Decimal(grain_in_mash)
-    thermodynamic_constant = Decimal('0.2')
+    numbers = _current_backend()
+    initial_temp = numbers.to_number(initial_temp)
+    target_temp = numbers.to_number(target_temp)
+    infusion_temp = numbers.to_number(infusion_temp)
+    water_in_mash = numbers.to_number(water_in_mash)
+    grain_in_mash = numbers.to_number(grain_in_mash)
+    thermodynamic_constant = numbers.to_number('0.2')
 
-    return to_decimal((target_temp - initial_temp) * (thermodynamic_constant * grain_in_mash + water_in_mash) / (infusion_temp - target_temp))
\ No newline at end of file
+    return numbers.round_to((target_temp - initial_temp) * (thermodynamic_constant * grain_in_mash + water_in_mash) / (infusion_temp - target_temp))
\ No newline at end of file
@@ -0,0 +1,338 @@
+""" This module contains per-grain and per-system mash efficiency calibration from logged brews.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    Each logged brew gives the gravity points it actually reached (measured OG x volume), and the points its grains
+    could have given (pounds x maximum ppg).  The efficiency of a grain on a brewing system is modelled as a per-grain
+    efficiency plus a per-system offset, fitted by regularized least squares with every brew weighted equally:
+
+        measured_points / potential_points  ~=  sum(share of potential from grain * grain efficiency) + system offset
+
+    Only the sums of grain efficiencies and system offsets show in the logs, so when every brew names a system the
+    offsets are held to a brew-weighted sum of zero; otherwise brews without a system are the reference.
+
+    The fit keeps only the normal equations, whose size depends on the number of grains and systems rather than the
+    number of brews, so logs are streamed once, new logs can be added to a saved calibration, and calibrations built
+    from separate log files can be merged.
+"""
+
+import json
+from collections import namedtuple
+from math import sqrt
+from numbers import Number
+from brew_tools import calculator
+
+# a logged brew:  grain_bill is (grain_name, weight) pairs, with weights in pounds or as (lbs, oz) tuples; system
+# names the brewing equipment (it is converted to a string), or is None
+BrewLog = namedtuple('BrewLog', 'grain_bill volume measured_gravity system')
+
+# the efficiency grains are pulled towards when the logs say little about them
+DEFAULT_PRIOR_EFFICIENCY = 0.7
+
+# how strongly efficiencies are pulled towards the prior, in brews' worth of evidence
+DEFAULT_REGULARIZATION = 0.01
+
+# fitted efficiencies are rounded to this many places so recipes share the fermentable table's cached expected yields
+EFFICIENCY_DECIMAL_PLACES = 3
+
+_GRAIN = 'grain'
+_SYSTEM = 'system'
+
+
+def read_jsonl_logs(lines):
+    """ Reads brew logs from JSON lines, one brew object per line.  Blank lines are skipped.
+    Example:  {"grains": [["American Wheat", 6.25], ["American Pale (2-Row)", [3, 2.5]]], "volume": 5.5,
+               "measured_gravity": 1.051, "system": "10 gallon"}
+
+    The system is optional.
+
+    :param lines:  An iterable of text lines, such as an open file.
+    :return:  A generator of BrewLog tuples.
+    """
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        log = json.loads(line)
+        yield BrewLog(tuple((grain, weight if isinstance(weight, Number) else tuple(weight))
+                            for (grain, weight) in log['grains']),
+                      float(log['volume']), float(log['measured_gravity']), log.get('system'))
+
+
+def _pounds(weight):
+    if isinstance(weight, Number):
+        return float(weight)
+
+    lbs, ounces = weight
+    return float(lbs) + float(ounces) / 16
+
+
+def _cholesky_solve(matrix, vector):
+    # solves matrix * x = vector for a symmetric positive definite matrix, as lists of floats
+    size = len(vector)
+    lower = [[0.0] * size for _ in range(size)]
+    for row in range(size):
+        for column in range(row + 1):
+            total = matrix[row][column] - sum(lower[row][k] * lower[column][k] for k in range(column))
+            lower[row][column] = sqrt(total) if row == column else total / lower[column][column]
+
+    forward = []
+    for row in range(size):
+        forward.append((vector[row] - sum(lower[row][k] * forward[k] for k in range(row))) / lower[row][row])
+
+    solution = [0.0] * size
+    for row in reversed(range(size)):
+        solution[row] = (forward[row] - sum(lower[k][row] * solution[k] for k in range(row + 1, size))) / \
+            lower[row][row]
+
+    return solution
+
+
+def _constrained_solve(matrix, vector, weights):
+    # solves matrix * x = vector subject to sum(weight * x[index] for (index, weight) in weights.items()) == 0, by
+    # substituting the last weighted unknown, so the reduced matrix stays positive definite
+    if weights is None:
+        return _cholesky_solve(matrix, vector)
+
+    last = max(weights)
+    kept = [index for index in range(len(vector)) if index != last]
+    # x[last] == sum(coefficients[index] * x[index] for index in kept)
+    coefficients = [-weights[index] / weights[last] if index in weights else 0.0 for index in kept]
+
+    reduced_matrix = [[matrix[row][column] + coefficient * matrix[last][column] +
+                       other * matrix[row][last] + coefficient * other * matrix[last][last]
+                       for (column, other) in zip(kept, coefficients)]
+                      for (row, coefficient) in zip(kept, coefficients)]
+    reduced_vector = [vector[row] + coefficient * vector[last] for (row, coefficient) in zip(kept, coefficients)]
+    reduced = _cholesky_solve(reduced_matrix, reduced_vector) if kept else []
+
+    solution = list(reduced)
+    solution.insert(last, sum(coefficient * value for (coefficient, value) in zip(coefficients, reduced)))
+    return solution
+
+
+class Efficiencies(object):
+    """ Calibrated mash efficiencies, by grain and brewing system.
+    """
+
+    __slots__ = ('grains', 'systems', 'prior_efficiency', 'count', 'rms_error')
+
+    def __init__(self, grains, systems, prior_efficiency=DEFAULT_PRIOR_EFFICIENCY, count=0, rms_error=None):
+        """ Create a set of calibrated efficiencies.
+
+        :param grains:  A dict of grain name to its fitted efficiency.
+        :param systems:  A dict of system name to its fitted efficiency offset.
+        :param prior_efficiency:  The efficiency of grains that were not calibrated.
+        :param count:  The number of brews the calibration was fitted to.
+        :param rms_error:  The root mean squared error of the fit, as a fraction of potential points.
+        """
+
+        self.grains = grains
+        self.systems = systems
+        self.prior_efficiency = prior_efficiency
+        self.count = count
+        self.rms_error = rms_error
+
+    def efficiency(self, grain, system=None):
+        """ Gets the calibrated efficiency of a grain on a brewing system.
+
+        :param grain:  The grain name.  Grains that were not calibrated use the prior efficiency.
+        :param system:  The system name, or None for no system offset.  Unknown systems have no offset.
+        :return:  The efficiency, between 0 and 1, rounded to EFFICIENCY_DECIMAL_PLACES.
+        """
+
+        offset = self.systems.get(str(system), 0.0) if system is not None else 0.0
+        efficiency = self.grains.get(grain, self.prior_efficiency) + offset
+        return round(min(max(efficiency, 0.0), 1.0), EFFICIENCY_DECIMAL_PLACES)
+
+    def grain_list(self, grain_ratios, system=None):
+        """ Makes a grain list for calculator.calc_grain_bill from grains and ratios, with calibrated efficiencies.
+
+        :param grain_ratios:  The recipe's grains as (grain_name, ratio) tuples.
+        :param system:  The system the recipe will be brewed on, or None.
+        :return:  A tuple of (grain_name, ratio, efficiency) tuples.
+        """
+
+        return tuple((grain, ratio, self.efficiency(grain, system)) for (grain, ratio) in grain_ratios)
+
+
+class EfficiencyCalibration(object):
+    """ Accumulates brew logs and fits per-grain efficiencies and per-system offsets to them.
+    """
+
+    def __init__(self, prior_efficiency=DEFAULT_PRIOR_EFFICIENCY, regularization=DEFAULT_REGULARIZATION):
+        """ Create an empty calibration.
+
+        :param prior_efficiency:  The efficiency grains are pulled towards.  (Default is 0.7)
+        :param regularization:  How strongly efficiencies are pulled towards the prior, and system offsets towards 0.
+            (Default is 0.01)
+        :raises:
+            ValueError when regularization is not positive.
+        """
+
+        if regularization <= 0:
+            raise ValueError('"regularization" argument must be positive.')
+
+        self.prior_efficiency = prior_efficiency
+        self.regularization = regularization
+        self.count = 0
+        self._normal = {}
+        self._moments = {}
+        self._sum_squares = 0.0
+
+    def add(self, log):
+        """ Adds a brew log to the calibration.
+
+        :param log:  The BrewLog.
+        :raises:
+            KeyError when a grain is not in grains.max_gravities.
+            ValueError when the brew's grains have no potential gravity points.
+        """
+
+        table = calculator.get_fermentable_table()
+        potentials = {}
+        for (grain, weight) in log.grain_bill:
+            key = (_GRAIN, grain)
+            potentials[key] = potentials.get(key, 0.0) + _pounds(weight) * table.ppgs[table.grain_id(grain)]
+
+        potential = sum(potentials.values())
+        if potential <= 0:
+            raise ValueError('The brew\'s grains have no potential gravity points:  {!r}.'.format(log.grain_bill))
+
+        # each brew is one equation in efficiency units:  sum(share * grain efficiency) + system offset = observed
+        row = dict((key, value / potential) for (key, value) in potentials.items())
+        if log.system is not None:
+            row[(_SYSTEM, str(log.system))] = 1.0
+        observed = (log.measured_gravity - 1) * 1000 * log.volume / potential
+
+        for key, value in row.items():
+            normal = self._normal.setdefault(key, {})
+            for other, other_value in row.items():
+                normal[other] = normal.get(other, 0.0) + value * other_value
+            self._moments[key] = self._moments.get(key, 0.0) + value * observed
+
+        self._sum_squares += observed * observed
+        self.count += 1
+
+    def update(self, logs):
+        """ Adds brew logs to the calibration, eg. the logs recorded since it was last saved.
+
+        :param logs:  An iterable of BrewLogs, such as read_jsonl_logs over an open file.
+        :return:  The number of logs added.
+        """
+
+        count = self.count
+        for log in logs:
+            self.add(log)
+
+        return self.count - count
+
+    def merge(self, other):
+        """ Adds the logs of another calibration to this one, as if they had been added directly.
+
+        :param other:  The other EfficiencyCalibration.
+        """
+
+        for key, normal in other._normal.items():
+            mine = self._normal.setdefault(key, {})
+            for other_key, value in normal.items():
+                mine[other_key] = mine.get(other_key, 0.0) + value
+        for key, value in other._moments.items():
+            self._moments[key] = self._moments.get(key, 0.0) + value
+
+        self._sum_squares += other._sum_squares
+        self.count += other.count
+
+    def solve(self):
+        """ Fits the efficiencies to the logs added so far.
+
+        :return:  The fitted Efficiencies.
+        """
+
+        keys = sorted(self._moments)
+        # the regularization pulls grain efficiencies towards the prior and system offsets towards zero
+        priors = [self.prior_efficiency if kind == _GRAIN else 0.0 for (kind, _) in keys]
+        matrix = [[self._normal[key].get(other, 0.0) for other in keys] for key in keys]
+        vector = [self._moments[key] + self.regularization * prior for (key, prior) in zip(keys, priors)]
+        for index in range(len(keys)):
+            matrix[index][index] += self.regularization
+
+        solution = _constrained_solve(matrix, vector, self._offset_constraint(keys)) if keys else []
+
+        rms_error = None
+        if self.count:
+            fitted = sum(value * moment for (value, moment) in zip(solution, (self._moments[key] for key in keys)))
+            explained = sum(value * sum(row[column] * solution[column] for column in range(len(keys)))
+                            for (value, row) in zip(solution, matrix)) - \
+                self.regularization * sum(value * value for value in solution)
+            rms_error = sqrt(max(self._sum_squares - 2 * fitted + explained, 0.0) / self.count)
+
+        grains = {}
+        systems = {}
+        for ((kind, name), value) in zip(keys, solution):
+            (grains if kind == _GRAIN else systems)[name] = value
+
+        return Efficiencies(grains, systems, self.prior_efficiency, self.count, rms_error)
+
+    def _offset_constraint(self, keys):
+        # when every brew names a system, raising every grain efficiency and lowering every system offset by the same
+        # amount fits the logs equally well, so the offsets are held to a brew-weighted sum of zero.  Brews without a
+        # system otherwise serve as the reference, with no offset.
+        brew_counts = dict((index, self._normal[key][key]) for (index, key) in enumerate(keys) if key[0] == _SYSTEM)
+        if not brew_counts or sum(brew_counts.values()) < self.count:
+            return None
+
+        return brew_counts
+
+    def to_dict(self):
+        """ Gets the calibration's state as JSON-serializable data, to save between runs.
+
+        :return:  A dict.
+        """
+
+        return {
+            'prior_efficiency': self.prior_efficiency,
+            'regularization': self.regularization,
+            'count': self.count,
+            'sum_squares': self._sum_squares,
+            'moments': [[kind, name, value] for ((kind, name), value) in sorted(self._moments.items())],
+            'normal': [[kind, name, other_kind, other_name, value]
+                       for ((kind, name), normal) in sorted(self._normal.items())
+                       for ((other_kind, other_name), value) in sorted(normal.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Restores a calibration saved with to_dict.
+
+        :param data:  The dict.
+        :return:  The EfficiencyCalibration.
+        """
+
+        calibration = cls(data['prior_efficiency'], data['regularization'])
+        calibration.count = data['count']
+        calibration._sum_squares = data['sum_squares']
+        calibration._moments = dict(((kind, name), value) for (kind, name, value) in data['moments'])
+        for (kind, name, other_kind, other_name, value) in data['normal']:
+            calibration._normal.setdefault((kind, name), {})[(other_kind, other_name)] = value
+
+        return calibration
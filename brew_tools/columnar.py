@@ -0,0 +1,442 @@
+""" This module contains a columnar, memory-mapped binary format for batch results.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    A results file holds one set of columns per recipe and one per grain bill line, so analysis reads only the
+    columns it needs, and ResultColumns maps the file and exposes each column as a memoryview without copying or
+    parsing it.  Weights, volumes and temperatures are stored as whole thousandths and ounces as whole tenths, the
+    precision the calculator rounds them to, so they reload exactly.
+
+    File layout, all little-endian, each column starting on an 8 byte boundary:
+        header:  magic, version, recipe count (R), line count (L), grain count (G), and the byte lengths of the
+                 recipe id, error and grain name strings
+        recipe columns:  total weight, mash water and strike temp (int64 thousandths; MISSING for none), the first
+                 line of each recipe (uint64, R + 1), then the recipe ids and errors (uint64 offsets, R + 1, and
+                 UTF-8 bytes; an empty error for a calculated recipe)
+        line columns:  recipe row (uint32), grain id (uint32), whole pounds (int32) and tenths of an ounce (int32)
+        grain names:  uint64 offsets (G + 1) and UTF-8 bytes, indexed by grain id
+"""
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from decimal import Decimal
+from brew_tools import batch, calculator
+
+# results files are given this extension by convention
+EXTENSION = '.btbr'
+
+# the stored value of a mash water volume or strike temp that was not calculated
+MISSING = -2 ** 63
+
+_MAGIC = b'BTBR'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIQQQQQQ')
+
+# column name, array typecode (all are fixed size:  q and Q are 8 bytes, i and I are 4)
+_RECIPE_COLUMNS = (('total_weights', 'q'), ('mash_water_volumes', 'q'), ('strike_temps', 'q'))
+_LINE_COLUMNS = (('line_recipes', 'I'), ('line_grain_ids', 'I'), ('line_pounds', 'i'), ('line_tenths', 'i'))
+
+# values are buffered this many at a time before being appended to their column's spill file
+_FLUSH_SIZE = 65536
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _thousandths(value):
+    if value is None:
+        return MISSING
+
+    if isinstance(value, Decimal):
+        return int(value.scaleb(3).to_integral_value())
+
+    return int(round(value * 1000))
+
+
+def _from_thousandths(value):
+    return None if value == MISSING else Decimal(value).scaleb(-3)
+
+
+class _Column(object):
+    # a column of fixed size values, buffered in memory and spilled to a temporary file
+
+    def __init__(self, typecode):
+        self.values = array(typecode)
+        self.count = 0
+        self.file = tempfile.TemporaryFile()
+
+    def append(self, value):
+        self.values.append(value)
+        if len(self.values) >= _FLUSH_SIZE:
+            self.flush()
+
+    def extend(self, values):
+        self.values.extend(values)
+        if len(self.values) >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.count += len(self.values)
+        self.values.tofile(self.file)
+        del self.values[:]
+
+    def copy_to(self, stream):
+        self.flush()
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, stream)
+        size = self.count * self.values.itemsize
+        stream.write(b'\0' * _padding(size))
+        self.file.close()
+
+    def discard(self):
+        self.file.close()
+
+
+class _Strings(object):
+    # a column of strings:  offsets and UTF-8 bytes, each spilled to a temporary file
+
+    def __init__(self):
+        self.offsets = _Column('Q')
+        self.offsets.append(0)
+        self.size = 0
+        self.file = tempfile.TemporaryFile()
+
+    def append(self, text):
+        data = text.encode('utf-8')
+        self.file.write(data)
+        self.size += len(data)
+        self.offsets.append(self.size)
+
+    def copy_to(self, stream):
+        self.offsets.copy_to(stream)
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, stream)
+        stream.write(b'\0' * _padding(self.size))
+        self.file.close()
+
+    def discard(self):
+        self.offsets.discard()
+        self.file.close()
+
+
+class ColumnarWriter(object):
+    """ Writes batch results to a columnar results file.
+
+    Columns are spilled to temporary files as results are written and assembled into the results file on close, so
+    memory use does not grow with the number of results.  The file is assembled under a temporary name and renamed
+    into place, so a results file is never left half written.  Use it as a context manager, which discards the
+    results if the block raises, or call close (or discard).
+    """
+
+    def __init__(self, path):
+        """ Start a results file.
+
+        :param path:  The path to write to.  Nothing is written there until close.
+        """
+
+        self.path = path
+        self.recipe_count = 0
+        self.line_count = 0
+        self._recipe_columns = [_Column(typecode) for (_, typecode) in _RECIPE_COLUMNS]
+        self._line_offsets = _Column('Q')
+        self._line_offsets.append(0)
+        self._line_columns = [_Column(typecode) for (_, typecode) in _LINE_COLUMNS]
+        self._recipe_ids = _Strings()
+        self._errors = _Strings()
+        self._grain_ids = {}
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _grain_id(self, grain):
+        grain_id = self._grain_ids.get(grain)
+        if grain_id is None:
+            grain_id = self._grain_ids[grain] = len(self._grain_ids)
+
+        return grain_id
+
+    def write(self, result):
+        """ Writes one batch result.
+
+        :param result:  The batch.BatchResult (or batch.BatchError).  Recipe ids are stored as strings.
+        """
+
+        total_weights, mash_water_volumes, strike_temps = self._recipe_columns
+        line_recipes, line_grain_ids, line_pounds, line_tenths = self._line_columns
+        row = self.recipe_count
+        self._recipe_ids.append(str(result.id))
+
+        if isinstance(result, batch.BatchError):
+            self._errors.append(result.error)
+            for column in self._recipe_columns:
+                column.append(MISSING)
+        else:
+            self._errors.append('')
+            total_weights.append(_thousandths(result.total_weight))
+            mash_water_volumes.append(_thousandths(result.mash_water))
+            strike_temps.append(_thousandths(result.strike_temp))
+
+            grain_bill = result.grain_bill
+            if isinstance(grain_bill, calculator.GrainBill):
+                names = grain_bill.names
+                line_grain_ids.extend(self._grain_id(names[grain_id]) for grain_id in grain_bill.grain_ids)
+                line_pounds.extend(grain_bill.pounds)
+                line_tenths.extend(grain_bill.tenths)
+            else:
+                for (grain, (lbs, ounces)) in grain_bill:
+                    line_grain_ids.append(self._grain_id(grain))
+                    line_pounds.append(lbs)
+                    line_tenths.append(int(round(ounces * 10)))
+
+            line_recipes.extend([row] * len(grain_bill))
+            self.line_count += len(grain_bill)
+
+        self._line_offsets.append(self.line_count)
+        self.recipe_count += 1
+
+    def write_all(self, results):
+        """ Writes batch results.
+
+        :param results:  An iterable of batch.BatchResult (or batch.BatchError) tuples.
+        """
+
+        for result in results:
+            self.write(result)
+
+    def _columns(self):
+        return self._recipe_columns + [self._line_offsets, self._recipe_ids, self._errors] + self._line_columns
+
+    def discard(self):
+        """ Throws away the columns written so far without writing the results file.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+
+        for column in self._columns():
+            column.discard()
+
+    def close(self):
+        """ Assembles the results file from the columns written so far.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+
+        grain_names = _Strings()
+        for grain in sorted(self._grain_ids, key=self._grain_ids.get):
+            grain_names.append(grain)
+
+        # written next to the results file, so the rename cannot cross file systems
+        temporary_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(temporary_path, 'wb') as stream:
+                stream.write(_HEADER.pack(_MAGIC, _VERSION, self.recipe_count, self.line_count, len(self._grain_ids),
+                                          self._recipe_ids.size, self._errors.size, grain_names.size))
+                stream.write(b'\0' * _padding(_HEADER.size))
+                for column in self._columns():
+                    column.copy_to(stream)
+                grain_names.copy_to(stream)
+
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            for column in self._columns() + [grain_names]:
+                column.discard()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+
+def write_columnar_results(results, path):
+    """ Writes batch results to a columnar results file.
+
+    :param results:  An iterable of batch.BatchResult (or batch.BatchError) tuples, such as batch.process_recipes.
+    :param path:  The path to write to.
+    :return:  The number of results written.
+    """
+
+    with ColumnarWriter(path) as writer:
+        writer.write_all(results)
+
+    return writer.recipe_count
+
+
+class ResultColumns(object):
+    """ A read-only, memory-mapped view of a columnar results file.
+
+    The column attributes (total_weights, mash_water_volumes, strike_temps, line_offsets, line_recipes,
+    line_grain_ids, line_pounds and line_tenths) are memoryviews into the mapped file, so opening a file of any size
+    is instant and only the pages that are used are read.  Recipe row r's lines are line_offsets[r] to
+    line_offsets[r + 1] - 1.  Use it as a context manager, or call close once the columns are no longer used.
+    Slices taken from a column share the mapping, so release them (or copy them out, e.g. with array or list)
+    before closing; grain_bill and result already return copies.
+    """
+
+    def __init__(self, path):
+        """ Map a results file written by ColumnarWriter.
+
+        :param path:  The path to the results file.
+        :raises:
+            ValueError when the file is not a columnar results file.
+        """
+
+        self.path = path
+        with open(path, 'rb') as results_file:
+            self._map = mmap.mmap(results_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._views = []
+        try:
+            self._read_columns()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_columns(self):
+        if len(self._map) < _HEADER.size:
+            raise ValueError('"{}" is not a columnar results file.'.format(self.path))
+
+        (magic, version, self.recipe_count, self.line_count, self.grain_count,
+         recipe_id_size, error_size, grain_name_size) = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('"{}" is not a columnar results file.'.format(self.path))
+
+        self._view = memoryview(self._map)
+        self._views.append(self._view)
+        self._position = _HEADER.size + _padding(_HEADER.size)
+        for name, typecode in _RECIPE_COLUMNS:
+            setattr(self, name, self._column(typecode, self.recipe_count))
+        self.line_offsets = self._column('Q', self.recipe_count + 1)
+        self._recipe_id_offsets = self._column('Q', self.recipe_count + 1)
+        self._recipe_ids = self._column('B', recipe_id_size)
+        self._error_offsets = self._column('Q', self.recipe_count + 1)
+        self._errors = self._column('B', error_size)
+        for name, typecode in _LINE_COLUMNS:
+            setattr(self, name, self._column(typecode, self.line_count))
+        self._grain_name_offsets = self._column('Q', self.grain_count + 1)
+        self._grain_names = self._column('B', grain_name_size)
+        self.grain_names = tuple(self._string(self._grain_name_offsets, self._grain_names, grain_id)
+                                 for grain_id in range(self.grain_count))
+
+    def _column(self, typecode, count):
+        size = count * array(typecode).itemsize
+        start = self._position
+        if start + size > len(self._map):
+            raise ValueError('"{}" is truncated.'.format(self.path))
+
+        self._position += size + _padding(size)
+        column = self._view[start:start + size].cast(typecode)
+        self._views.append(column)
+        return column
+
+    @staticmethod
+    def _string(offsets, data, index):
+        return bytes(data[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def __len__(self):
+        return self.recipe_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """ Releases the column views and unmaps the file.
+
+        :raises:
+            BufferError when a slice of a column is still held by the caller.
+        """
+
+        while self._views:
+            self._views.pop().release()
+        self._map.close()
+
+    def recipe_id(self, row):
+        """ Gets the id of a recipe row, as a string.
+        """
+
+        return self._string(self._recipe_id_offsets, self._recipe_ids, row)
+
+    def error(self, row):
+        """ Gets the error of a recipe row, or None if it was calculated.
+        """
+
+        return self._string(self._error_offsets, self._errors, row) or None
+
+    def grain_bill(self, row):
+        """ Gets the grain bill of a recipe row.
+
+        :param row:  The recipe row.
+        :return:  A GrainBill, with Decimal ounces, whose names are grain_names.
+        """
+
+        start, end = self.line_offsets[row], self.line_offsets[row + 1]
+        return calculator.GrainBill(self.grain_names, self.line_grain_ids[start:end], self.line_pounds[start:end],
+                                    self.line_tenths[start:end])
+
+    def result(self, row):
+        """ Rebuilds the batch result of a recipe row.
+
+        :param row:  The recipe row.
+        :return:  A batch.BatchResult with Decimal values (or a batch.BatchError).
+        """
+
+        error = self.error(row)
+        if error is not None:
+            return batch.BatchError(self.recipe_id(row), error)
+
+        return batch.BatchResult(self.recipe_id(row), self.grain_bill(row), _from_thousandths(self.total_weights[row]),
+                                 _from_thousandths(self.mash_water_volumes[row]),
+                                 _from_thousandths(self.strike_temps[row]))
+
+    def results(self):
+        """ Rebuilds every batch result, in order.
+
+        :return:  A generator of batch.BatchResult (or batch.BatchError) tuples.
+        """
+
+        return (self.result(row) for row in range(self.recipe_count))
+
+
+def read_columnar_results(path):
+    """ Maps a columnar results file.
+
+    :param path:  The path to the results file.
+    :return:  The ResultColumns.
+    """
+
+    return ResultColumns(path)
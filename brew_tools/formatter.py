@@ -21,6 +21,17 @@
     along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
 """
 
+import csv
+import io
+import json
+from itertools import count, repeat
+
+# output formats for write_grain_bills
+TEXT = 'text'
+CSV = 'csv'
+JSON = 'json'
+MARKDOWN = 'markdown'
+
 
 def format_grain_bill_line(grain_bill_line):
     """ Formats a single line in a grain bill as follows:  Name:  1bs, oz
@@ -44,3 +55,94 @@ def format_grain_bill(grain_bill):
     """
 
     return tuple(format_grain_bill_line(grain_bill_line) for grain_bill_line in grain_bill)
+
+
+def _text_chunks(grain_bills, recipe_ids):
+    for (recipe_id, grain_bill) in zip(recipe_ids, grain_bills):
+        lines = [] if recipe_id is None else ['Recipe {}'.format(recipe_id)]
+        lines.extend(format_grain_bill_line(grain_bill_line) for grain_bill_line in grain_bill)
+        lines.append('\n')
+        yield '\n'.join(lines)
+
+
+def _csv_chunks(grain_bills, recipe_ids):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(('recipe', 'grain', 'lbs', 'oz'))
+    for (recipe_id, grain_bill) in zip(recipe_ids, grain_bills):
+        writer.writerows((recipe_id, grain, lbs, ounces) for (grain, (lbs, ounces)) in grain_bill)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _json_chunks(grain_bills, recipe_ids):
+    # weights are written as bare JSON numbers from their str(), which keeps every digit of a Decimal
+    separator = '[\n'
+    for (recipe_id, grain_bill) in zip(recipe_ids, grain_bills):
+        lines = ', '.join('{{"grain": {}, "lbs": {}, "oz": {}}}'.format(json.dumps(grain), lbs, ounces)
+                          for (grain, (lbs, ounces)) in grain_bill)
+        yield '{}{{"recipe": {}, "grain_bill": [{}]}}'.format(separator, json.dumps(recipe_id), lines)
+        separator = ',\n'
+
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+def _markdown_cell(value):
+    return str(value).replace('|', '\\|')
+
+
+def _markdown_chunks(grain_bills, recipe_ids):
+    yield '| Recipe | Grain | Lbs | Oz |\n| --- | --- | ---: | ---: |\n'
+    for (recipe_id, grain_bill) in zip(recipe_ids, grain_bills):
+        yield ''.join('| {} | {} | {} | {} |\n'.format(_markdown_cell(recipe_id), _markdown_cell(grain), lbs, ounces)
+                      for (grain, (lbs, ounces)) in grain_bill)
+
+
+_CHUNKS = {TEXT: _text_chunks, CSV: _csv_chunks, JSON: _json_chunks, MARKDOWN: _markdown_chunks}
+
+
+def write_grain_bills(grain_bills, stream, output_format=TEXT, recipe_ids=None):
+    """ Writes grain bills straight to a stream, one grain bill at a time, so a report of any size is never held in
+    memory.  The formats are:
+        TEXT:  the format_grain_bill lines, with a blank line after each grain bill
+        CSV:  a header row, then one row per grain:  recipe, grain, lbs, oz
+        JSON:  an array of {"recipe": ..., "grain_bill": [{"grain": ..., "lbs": ..., "oz": ...}, ...]} objects
+        MARKDOWN:  a table with one row per grain
+
+    :param grain_bills:  An iterable of grain bills, as returned by calculator.calc_grain_bill.
+    :param stream:  A writable text or binary stream.  Binary streams are written as UTF-8 through a buffer.
+    :param output_format:  TEXT, CSV, JSON or MARKDOWN.  (Default is TEXT)
+    :param recipe_ids:  An iterable of ids labelling the grain bills.  (Default is 1, 2, 3, ...; TEXT output is only
+        labelled when ids are given)
+    :raises:
+        ValueError when the output format is unknown.
+    """
+
+    if output_format not in _CHUNKS:
+        raise ValueError('"output_format" argument must be one of: {}.'.format(', '.join(sorted(_CHUNKS))))
+
+    if recipe_ids is None:
+        recipe_ids = repeat(None) if output_format == TEXT else count(1)
+
+    binary = not isinstance(stream, io.TextIOBase)
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8', newline='') if binary else stream
+    try:
+        for chunk in _CHUNKS[output_format](grain_bills, recipe_ids):
+            text_stream.write(chunk)
+    finally:
+        if binary:
+            # hand the binary stream back to the caller open
+            text_stream.flush()
+            text_stream.detach()
+
+
+def write_grain_bill(grain_bill, stream, output_format=TEXT):
+    """ Writes a single grain bill straight to a stream.  See write_grain_bills.
+
+    :param grain_bill:  The grain bill information.
+    :param stream:  A writable text or binary stream.
+    :param output_format:  TEXT, CSV, JSON or MARKDOWN.  (Default is TEXT)
+    """
+
+    write_grain_bills((grain_bill,), stream, output_format)
@@ -1,4 +1,5 @@
-""" This module contains information about grain/fermentables used in calculations.
+""" This module contains information about grain/fermentables used in calculations.  The catalog of maximum
+    gravities is read from the packaged data file the first time max_gravities is used.
 
     (c) Aaron Morris, 2015
     morris7200@gmail.com
@@ -22,112 +23,231 @@
 """
 
 
+import csv
+import mmap
+import os
+import struct
+from collections.abc import Mapping, MutableMapping
+from threading import Lock
+
 # gravity values were referenced from BYO magazine website: https://byo.com/resources/grains on 17 APR 2015
-max_gravities = {
-    'American Black Barley': 1.025,
-    'American Black Patent': 1.026,
-    'American Chocolate': 1.034,
-    'American Crystal 10L': 1.034,
-    'American Crystal 20L': 1.034,
-    'American Crystal 30L': 1.034,
-    'American Crystal 40L': 1.034,
-    'American Crystal 60L': 1.034,
-    'American Crystal 80L': 1.034,
-    'American Crystal 90L': 1.034,
-    'American Crystal 120L': 1.034,
-    'American Dextrin': 1.033,
-    'American Munich': 1.034,
-    'American Pale (2-Row)': 1.037,
-    'American Pale (6-Row)': 1.035,
-    'American Roasted Barley': 1.025,
-    'American Special Roast': 1.035,
-    'American Victory': 1.034,
-    'American Vienna': 1.035,
-    'American Wheat': 1.038,
-    'American White Wheat': 1.037,
-    'Belgian Aromatic': 1.036,
-    'Belgian Pale Ale': 1.038,
-    'Belgian Biscuit': 1.035,
-    'Belgian Candy Sugar': 1.036,
-    'Belgian Caramel Pils': 1.030,
-    'Belgian Caramunich': 1.033,
-    'Belgian Caravienne': 1.034,
-    'Belgian Chocolate': 1.033,
-    'Belgian De-Bittered Black': 1.030,
-    'Belgian Pale': 1.038,
-    'Belgian Pilsen': 1.037,
-    'Belgian Roasted Wheat': 1.036,
-    'Belgian Special B': 1.030,
-    'British Amber Malt 35L': 1.032,
-    'British Amber Malt 65L': 1.032,
-    'British Black Patent': 1.026,
-    'British Brown': 1.032,
-    'British Cara-Pils Dextrin': 1.033,
-    'British Caramalt': 0.00,
-    'British Chocolate': 1.034,
-    'British Crystal': 1.034,
-    'British Dark Crystal': 1.034,
-    'British Lager': 1.038,
-    'British Maris Otter Pale': 1.038,
-    'British Mild Ale': 1.037,
-    'British Oat': 1.034,
-    'British Pale': 1.038,
-    'British Pale Chocolate': 1.034,
-    'British Peat Smoked': 1.034,
-    'British Roasted Barley': 1.025,
-    'British Toasted Pale': 1.038,
-    'British Torrified Wheat': 1.036,
-    'British Wheat': 1.038,
-    'Brown Sugar': 1.046,
-    'Brown Sugar (Dark)': 1.046,
-    'Candi Sugar (Amber)': 1.036,
-    'Candi Sugar (Dark)': 1.036,
-    'Corn Sugar': 1.036,
-    'Demerara Sugar': 1.041,
-    'Dextrose (Glucose)': 1.037,
-    'Dry Malt Extract': 1.044,
-    'Flaked Barley': 1.032,
-    'Flaked Maize': 1.037,
-    'Flaked Oats': 1.033,
-    'Flaked Rye': 1.036,
-    'Flaked Wheat': 1.036,
-    'Franco-Belges Kiln Coffee': 0.00,
-    'Gambrinus Honey Malt': 1.034,
-    'German Aciduated (Sauer)': 1.033,
-    'German CaraWheat': 1.035,
-    'German CaraAmber': 1.033,
-    'German CaraAroma': 1.034,
-    'German Carafa I': 1.038,
-    'German Carafa II': 1.038,
-    'German Carafa III': 1.038,
-    'German CaraFoam': 1.033,
-    'German CaraHell': 1.034,
-    'German CaraMunich I': 1.034,
-    'German CaraMunich II': 1.034,
-    'German CaraMunich III': 1.034,
-    'German CaraRed': 1.033,
-    'German Chocolate Rye': 1.030,
-    'German Chocolate Wheat': 1.038,
-    'German Dark Munich': 1.034,
-    'German Dark Wheat': 1.039,
-    'German Kolsch': 1.034,
-    'German Light Munich': 1.034,
-    'German Light Wheat': 1.039,
-    'German Melanoidin': 1.033,
-    'German Rauch Smoked': 1.037,
-    'German Rye': 1.029,
-    'German Vienna': 1.035,
-    'Grits': 1.037,
-    'Honey': 1.032,
-    'Invert Sugar': 1.046,
-    'Lactose': 1.043,
-    'Liquid Malt Extract': 1.036,
-    'Lyle\'s Golden Syrup': 1.036,
-    'Maple Sap': 1.009,
-    'Maple Syrup': 1.030,
-    'Molasses': 1.036,
-    'Rice Solids': 1.040,
-    'Scotmalt Golden Promise': 1.038,
-    'Treacle': 1.036,
-    'White Table Sugar': 1.046
-}
\ No newline at end of file
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fermentables.csv')
+
+# a list of extra catalog files (separated by os.pathsep) merged over the default catalog when it is first loaded
+CATALOGS_ENVIRONMENT_VARIABLE = 'BREW_TOOLS_CATALOGS'
+
+# catalog files with this extension use the memory-mapped binary format; any other file is read as CSV
+BINARY_EXTENSION = '.btfc'
+
+# binary catalog layout:  a header (magic, version, count, padding), the gravities as float64, the name offsets as
+# uint32 (count + 1 of them), then the UTF-8 names, sorted by their encoded bytes.  All values are little-endian.
+_MAGIC = b'BTFC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIII')
+
+_load_lock = Lock()
+
+
+class MappedCatalog(Mapping):
+    """ A read-only catalog of grain name to maximum specific gravity, backed by a memory-mapped binary catalog file.
+
+    Nothing is read into memory up front:  lookups binary search the sorted names in the mapped file, so opening a
+    catalog of any size is instant, and worker processes mapping the same file share its pages.
+    """
+
+    def __init__(self, path):
+        """ Map a binary catalog file written by write_catalog.
+
+        :param path:  The path to the catalog file.
+        :raises:
+            ValueError when the file is not a binary catalog.
+        """
+
+        self.path = path
+        with open(path, 'rb') as catalog_file:
+            self._map = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError('"{}" is not a binary fermentable catalog.'.format(path))
+
+        magic, version, self._count, _ = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('"{}" is not a binary fermentable catalog.'.format(path))
+
+        gravities_end = _HEADER.size + 8 * self._count
+        offsets_end = gravities_end + 4 * (self._count + 1)
+        view = memoryview(self._map)
+        self._gravities = view[_HEADER.size:gravities_end].cast('d')
+        self._offsets = view[gravities_end:offsets_end].cast('I')
+        self._names = offsets_end
+
+    def _name_bytes(self, index):
+        return self._map[self._names + self._offsets[index]:self._names + self._offsets[index + 1]]
+
+    def __getitem__(self, grain):
+        key = grain.encode('utf-8') if isinstance(grain, str) else None
+        if key is not None:
+            low, high = 0, self._count
+            while low < high:
+                middle = (low + high) // 2
+                if self._name_bytes(middle) < key:
+                    low = middle + 1
+                else:
+                    high = middle
+
+            if low < self._count and self._name_bytes(low) == key:
+                return self._gravities[low]
+
+        raise KeyError(grain)
+
+    def __iter__(self):
+        return (self._name_bytes(index).decode('utf-8') for index in range(self._count))
+
+    def __len__(self):
+        return self._count
+
+
+class LayeredCatalog(MutableMapping):
+    """ A catalog of grain name to maximum specific gravity that layers catalogs over one another without copying
+    them.  Entries in later layers win.
+
+    The layers are referenced, not copied, so a memory-mapped catalog stays mapped.  Changes made through the layered
+    catalog go into a small overlay dict in front of the layers and never touch the layers themselves.
+    """
+
+    def __init__(self, *layers):
+        """ Layer catalogs over one another.
+
+        :param layers:  Mappings of grain name to maximum specific gravity, lowest first.
+        """
+
+        self.layers = layers
+        self.overlay = {}
+        self._deleted = set()
+
+    def __getitem__(self, grain):
+        try:
+            return self.overlay[grain]
+        except KeyError:
+            pass
+
+        if grain not in self._deleted:
+            for layer in reversed(self.layers):
+                try:
+                    return layer[grain]
+                except KeyError:
+                    pass
+
+        raise KeyError(grain)
+
+    def __setitem__(self, grain, gravity):
+        self.overlay[grain] = gravity
+        self._deleted.discard(grain)
+
+    def __delitem__(self, grain):
+        if grain not in self:
+            raise KeyError(grain)
+
+        self.overlay.pop(grain, None)
+        self._deleted.add(grain)
+
+    def __iter__(self):
+        seen = set(self._deleted)
+        for layer in (self.overlay,) + tuple(reversed(self.layers)):
+            for grain in layer:
+                if grain not in seen:
+                    seen.add(grain)
+                    yield grain
+
+    def __len__(self):
+        # the layers may share names, so they have to be walked to be counted
+        return sum(1 for _ in self)
+
+
+def read_catalog(path):
+    """ Reads a catalog file of grain name to maximum specific gravity.  Files ending in BINARY_EXTENSION are
+    memory-mapped; anything else is read as CSV with 'name' and 'max_gravity' columns.
+
+    :param path:  The path to the catalog file.
+    :return:  A dict (CSV) or MappedCatalog (binary) of grain name to maximum specific gravity.
+    """
+
+    if path.endswith(BINARY_EXTENSION):
+        return MappedCatalog(path)
+
+    with open(path, newline='', encoding='utf-8') as catalog_file:
+        return dict((row['name'], float(row['max_gravity'])) for row in csv.DictReader(catalog_file))
+
+
+def write_catalog(catalog, path):
+    """ Writes a catalog of grain name to maximum specific gravity, in the binary format if the path ends in
+    BINARY_EXTENSION and as CSV otherwise.
+
+    :param catalog:  A mapping of grain name to maximum specific gravity.
+    :param path:  The path to write to.
+    """
+
+    if not path.endswith(BINARY_EXTENSION):
+        with open(path, 'w', newline='', encoding='utf-8') as catalog_file:
+            writer = csv.writer(catalog_file, lineterminator='\n')
+            writer.writerow(('name', 'max_gravity'))
+            writer.writerows((grain, repr(float(gravity))) for (grain, gravity) in catalog.items())
+        return
+
+    entries = sorted((grain.encode('utf-8'), float(gravity)) for (grain, gravity) in catalog.items())
+    offsets = [0]
+    for (name, _) in entries:
+        offsets.append(offsets[-1] + len(name))
+
+    with open(path, 'wb') as catalog_file:
+        catalog_file.write(_HEADER.pack(_MAGIC, _VERSION, len(entries), 0))
+        catalog_file.write(struct.pack('<{}d'.format(len(entries)), *(gravity for (_, gravity) in entries)))
+        catalog_file.write(struct.pack('<{}I'.format(len(offsets)), *offsets))
+        catalog_file.write(b''.join(name for (name, _) in entries))
+
+
+def set_catalog(catalog):
+    """ Replaces max_gravities with the given catalog.  The calculator picks up the new catalog on its next call.
+
+    :param catalog:  A mapping of grain name to maximum specific gravity, such as one returned by read_catalog.
+    """
+
+    global max_gravities
+    max_gravities = catalog
+
+
+def merge_catalogs(*catalogs):
+    """ Merges user or supplier catalogs over max_gravities.  Entries in later catalogs win.  The merged catalog
+    replaces max_gravities, so the calculator picks it up on its next call.  The catalogs are layered, not copied
+    (see LayeredCatalog), so binary catalogs stay memory-mapped.
+
+    :param catalogs:  Mappings of grain name to maximum specific gravity, or paths to catalog files.
+    :return:  The merged catalog, a LayeredCatalog.
+    """
+
+    merged = LayeredCatalog(_load_default_catalog(),
+                            *(read_catalog(catalog) if isinstance(catalog, str) else catalog for catalog in catalogs))
+
+    set_catalog(merged)
+    return merged
+
+
+def _load_default_catalog():
+    with _load_lock:
+        if 'max_gravities' not in globals():
+            catalog = read_catalog(DEFAULT_CATALOG_PATH)
+            paths = list(filter(None, os.environ.get(CATALOGS_ENVIRONMENT_VARIABLE, '').split(os.pathsep)))
+            if paths:
+                catalog = LayeredCatalog(catalog, *(read_catalog(path) for path in paths))
+
+            set_catalog(catalog)
+
+    return max_gravities
+
+
+def __getattr__(name):
+    # max_gravities is loaded from the packaged catalog the first time it is used, not on import
+    if name == 'max_gravities':
+        return _load_default_catalog()
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
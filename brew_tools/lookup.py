@@ -0,0 +1,255 @@
+""" This module contains an indexed fuzzy lookup of fermentable names.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    Supplier data rarely uses the catalog's exact names ("2 row pale" for 'American Pale (2-Row)', "crystal 60" for
+    'American Crystal 60L').  Names are normalized (case, accents, punctuation, and letters split from digits), and
+    an inverted index of word trigrams and whole words is built once, so a query scores only the names it shares
+    something with.  A name's score combines the trigram similarity of the two names with the share of the query's
+    words found in the name.
+"""
+
+import re
+import unicodedata
+from collections import Counter, namedtuple
+from threading import Lock
+from brew_tools import grains
+
+# the lowest score resolve accepts for a fuzzy match
+DEFAULT_MIN_SCORE = 0.6
+
+# how far resolve's best fuzzy match must score above the next best, so near ties are not guessed at
+DEFAULT_MIN_MARGIN = 0.05
+
+# the number of resolved queries each index remembers before starting over
+_MAX_CACHED_QUERIES = 4096
+
+Match = namedtuple('Match', 'grain score')
+
+_WORDS = re.compile(r'[a-z]+|[0-9]+')
+
+_index = None
+_aliases = {}
+_index_lock = Lock()
+
+
+def normalize(name):
+    """ Normalizes a fermentable name for matching:  lower case ASCII words, with letters split from digits.
+    Example:  normalize('American Crystal 60L') == 'american crystal 60 l'
+
+    :param name:  The name.
+    :return:  The normalized name.
+    """
+
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(_WORDS.findall(name.lower()))
+
+
+def _trigrams(words):
+    grams = set()
+    for word in words:
+        padded = ' {} '.format(word)
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+
+    return grams
+
+
+class FermentableIndex(object):
+    """ A search index over fermentable names and their aliases.
+    """
+
+    def __init__(self, grain_names, aliases=None):
+        """ Build an index.
+
+        :param grain_names:  The fermentable names, eg. grains.max_gravities.  Kept as catalog.
+        :param aliases:  A dict of alias to fermentable name.
+        :raises:
+            KeyError when an alias names a fermentable that is not indexed.
+        """
+
+        self.catalog = grain_names
+        self.grain_names = frozenset(grain_names)
+        self._normalized = {}
+        self._entries = []
+        self._trigram_counts = []
+        self._trigram_index = {}
+        self._word_index = {}
+        self._resolved = {}
+
+        for grain in sorted(self.grain_names):
+            self._add_entry(grain, grain)
+        for alias, grain in sorted((aliases or {}).items()):
+            self.add_alias(alias, grain)
+
+    def __len__(self):
+        return len(self.grain_names)
+
+    def _add_entry(self, text, grain):
+        normalized = normalize(text)
+        self._normalized.setdefault(normalized, grain)
+        entry = len(self._entries)
+        words = normalized.split()
+        trigrams = _trigrams(words)
+        self._entries.append(grain)
+        self._trigram_counts.append(len(trigrams))
+        for gram in trigrams:
+            self._trigram_index.setdefault(gram, []).append(entry)
+        for word in set(words):
+            self._word_index.setdefault(word, []).append(entry)
+
+    def add_alias(self, alias, grain):
+        """ Adds another name for a fermentable.  An alias matches exactly (after normalization) and fuzzily.
+
+        :param alias:  The other name, eg. '2 row'.
+        :param grain:  The fermentable's catalog name.
+        :raises:
+            KeyError when the fermentable is not indexed.
+        """
+
+        if grain not in self.grain_names:
+            raise KeyError(grain)
+
+        self._normalized[normalize(alias)] = grain
+        self._add_entry(alias, grain)
+        self._resolved.clear()
+
+    def search(self, query, limit=5):
+        """ Finds the fermentables best matching a query.
+
+        :param query:  The name to look up.
+        :param limit:  The most matches to return.  (Default is 5)
+        :return:  A tuple of Matches, best first, with scores from 0 to 1.
+        """
+
+        words = set(normalize(query).split())
+        if not words:
+            return ()
+
+        trigrams = _trigrams(words)
+        shared = Counter()
+        for gram in trigrams:
+            shared.update(self._trigram_index.get(gram, ()))
+        found = Counter()
+        for word in words:
+            found.update(self._word_index.get(word, ()))
+
+        best = {}
+        for entry, count in shared.items():
+            similarity = 2.0 * count / (len(trigrams) + self._trigram_counts[entry])
+            score = round((similarity + float(found[entry]) / len(words)) / 2, 6)
+            grain = self._entries[entry]
+            if score > best.get(grain, 0):
+                best[grain] = score
+
+        ranked = sorted(best.items(), key=lambda match: (-match[1], len(match[0]), match[0]))
+        return tuple(Match(grain, score) for (grain, score) in ranked[:limit])
+
+    def resolve(self, name, min_score=DEFAULT_MIN_SCORE, min_margin=DEFAULT_MIN_MARGIN):
+        """ Resolves a name to a fermentable:  an exact catalog name, then an exact match of a normalized name or
+        alias, then the best fuzzy match.
+
+        :param name:  The name to resolve.
+        :param min_score:  The lowest score accepted for a fuzzy match.  (Default is 0.6)
+        :param min_margin:  How far the best fuzzy match must score above the next best.  (Default is 0.05)
+        :return:  The fermentable's catalog name.
+        :raises:
+            KeyError when nothing matches well enough, or the best matches are too close to choose between.
+        """
+
+        # the catalog itself, not the indexed snapshot, so a fermentable added since the index was built resolves
+        if name in self.catalog:
+            return name
+
+        key = (name, min_score, min_margin)
+        grain = self._resolved.get(key)
+        if grain is not None:
+            return grain
+
+        grain = self._normalized.get(normalize(name))
+        if grain is None:
+            matches = self.search(name, 2)
+            if not matches or matches[0].score < min_score:
+                raise KeyError(name)
+            if len(matches) > 1 and matches[0].score - matches[1].score < min_margin:
+                raise KeyError('{} (ambiguous:  {} or {})'.format(name, matches[0].grain, matches[1].grain))
+            grain = matches[0].grain
+
+        if len(self._resolved) >= _MAX_CACHED_QUERIES:
+            self._resolved.clear()
+        self._resolved[key] = grain
+        return grain
+
+
+def get_index():
+    """ Gets the index of grains.max_gravities and the aliases added with add_alias, building it on first use,
+    whenever a new catalog is assigned and whenever fermentables are added to or removed from the catalog.  Aliases of
+    fermentables that are not in the catalog are left out.
+
+    :return:  The FermentableIndex.
+    """
+
+    global _index
+
+    index = _index
+    catalog = grains.max_gravities
+    if index is None or index.catalog is not catalog or len(index) != len(catalog):
+        # aliases of fermentables the new catalog does not have are kept for a later catalog, not indexed
+        aliases = dict((alias, grain) for (alias, grain) in _aliases.items() if grain in catalog)
+        with _index_lock:
+            index = _index = FermentableIndex(catalog, aliases)
+
+    return index
+
+
+def reset_index():
+    """ Discards the index so it is rebuilt on next use, eg. after renaming fermentables in grains.max_gravities in
+    place.
+    """
+
+    global _index
+    _index = None
+
+
+def add_alias(alias, grain):
+    """ Adds another name for a fermentable to the shared index, kept when the index is rebuilt.
+
+    :param alias:  The other name, eg. '2 row'.
+    :param grain:  The fermentable's catalog name.
+    :raises:
+        KeyError when the fermentable is not in grains.max_gravities.
+    """
+
+    get_index().add_alias(alias, grain)
+    _aliases[alias] = grain
+
+
+def search(query, limit=5):
+    """ Finds the fermentables in grains.max_gravities best matching a query.  See FermentableIndex.search.
+    """
+
+    return get_index().search(query, limit)
+
+
+def resolve(name, min_score=DEFAULT_MIN_SCORE, min_margin=DEFAULT_MIN_MARGIN):
+    """ Resolves a name to a fermentable in grains.max_gravities.  See FermentableIndex.resolve.
+    """
+
+    return get_index().resolve(name, min_score, min_margin)
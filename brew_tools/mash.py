@@ -0,0 +1,127 @@
+""" This module contains a multi-step mash schedule planner built on the calculator's strike and infusion functions.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+from brew_tools import calculator
+
+# the temperature of the water used for infusions, in degrees Fahrenheit
+DEFAULT_INFUSION_TEMP = 210
+
+# the volume displaced by a pound of grain in the mash, in quarts
+GRAIN_DISPLACEMENT = Decimal('0.32')
+
+MashPlan = namedtuple('MashPlan', 'strike_temp steps feasible')
+
+MashStepPlan = namedtuple('MashStepPlan', 'temp infusion_volume water_volume mash_volume feasible')
+
+
+def _plan_step(previous, temp, grain_weight, infusion_temp, tun_capacity, displacement):
+    if previous.temp >= temp:
+        raise ValueError('Mash step temperatures must increase:  {} follows {}.'.format(temp, previous.temp))
+
+    if infusion_temp <= temp:
+        raise ValueError('"infusion_temp" must be hotter than every mash step:  {} <= {}.'.format(infusion_temp, temp))
+
+    infusion_volume = calculator.calc_infusion_volume(
+        previous.temp, temp, infusion_temp, previous.water_volume, grain_weight)
+    water_volume = calculator.to_number(previous.water_volume + infusion_volume, 3)
+
+    return _step(temp, infusion_volume, water_volume, tun_capacity, displacement)
+
+
+def _step(temp, infusion_volume, water_volume, tun_capacity, displacement):
+    mash_volume = calculator.to_number(water_volume + displacement, 3)
+    feasible = tun_capacity is None or mash_volume <= tun_capacity
+    return MashStepPlan(temp, infusion_volume, water_volume, mash_volume, feasible)
+
+
+def plan_mash_schedule(step_temps, grain_weight, water_grist_ratio, grain_temp,
+                       infusion_temp=DEFAULT_INFUSION_TEMP, tun_capacity=None):
+    """ Plans a multi-step infusion mash:  the strike temperature for the first step, then the volume of infusion water
+    needed to reach each later step, with the running water total carried from step to step.
+
+    :param step_temps:  The rest temperatures of the mash steps, in degrees Fahrenheit.  The first step is reached
+        with the strike water and each later one with an infusion.
+    :param grain_weight:  The amount of grains in the mash, in pounds.
+    :param water_grist_ratio:  The water-to-grist ratio of the strike water, in quarts/pound.
+    :param grain_temp:  The temperature of the grains before mashing in, in degrees Fahrenheit.
+    :param infusion_temp:  The temperature of the infusion water, in degrees Fahrenheit.  (Default is 210)
+    :param tun_capacity:  The capacity of the mash tun, in quarts, or None for no limit.
+    :return:  A MashPlan.  Each step's MashStepPlan holds its infusion volume (zero for the first step), the water in
+        the mash and the volume of the mash (water plus GRAIN_DISPLACEMENT per pound), in quarts, and whether the mash
+        fits the tun.  The plan is feasible when every step is.
+    :raises:
+        ValueError when there are no steps, the step temperatures do not increase, or the infusion water is not
+        hotter than every step.
+    """
+
+    return plan_mash_schedules(
+        (step_temps,), grain_weight, water_grist_ratio, grain_temp, infusion_temp, tun_capacity)[0]
+
+
+def plan_mash_schedules(step_temp_lists, grain_weight, water_grist_ratio, grain_temp,
+                        infusion_temp=DEFAULT_INFUSION_TEMP, tun_capacity=None):
+    """ Plans many candidate mash schedules for the same grist and tun in one pass.  Steps shared by several
+    candidates, such as a common strike and protein rest, are calculated once.
+
+    :param step_temp_lists:  An iterable of step temperature lists, one per candidate schedule.
+    :param grain_weight:  The amount of grains in the mash, in pounds.
+    :param water_grist_ratio:  The water-to-grist ratio of the strike water, in quarts/pound.
+    :param grain_temp:  The temperature of the grains before mashing in, in degrees Fahrenheit.
+    :param infusion_temp:  The temperature of the infusion water, in degrees Fahrenheit.  (Default is 210)
+    :param tun_capacity:  The capacity of the mash tun, in quarts, or None for no limit.
+    :return:  A tuple of MashPlans, one per candidate, as described in plan_mash_schedule.
+    :raises:
+        ValueError as described in plan_mash_schedule.
+    """
+
+    displacement = calculator.to_number(grain_weight) * calculator.to_number(GRAIN_DISPLACEMENT)
+    mash_water = calculator.calc_mash_water_volume(water_grist_ratio, grain_weight)
+    no_infusion = calculator.to_number(0, 3)
+    strike_temps = {}
+    steps = {}
+    plans = []
+
+    for step_temps in step_temp_lists:
+        step_temps = tuple(step_temps)
+        if not step_temps:
+            raise ValueError('A mash schedule must have at least one step.')
+
+        first_temp = step_temps[0]
+        if first_temp not in strike_temps:
+            strike_temps[first_temp] = calculator.calc_strike_temp(water_grist_ratio, grain_temp, first_temp)
+            steps[step_temps[:1]] = _step(first_temp, no_infusion, mash_water, tun_capacity, displacement)
+
+        # each step depends only on the steps before it, so candidates sharing a prefix share its plans
+        planned = [steps[step_temps[:1]]]
+        for end in range(2, len(step_temps) + 1):
+            step = steps.get(step_temps[:end])
+            if step is None:
+                step = steps[step_temps[:end]] = _plan_step(
+                    planned[-1], step_temps[end - 1], grain_weight, infusion_temp, tun_capacity, displacement)
+            planned.append(step)
+
+        plans.append(MashPlan(strike_temps[first_temp], tuple(planned), all(step.feasible for step in planned)))
+
+    return tuple(plans)
@@ -0,0 +1,118 @@
+""" This module contains a multi-process executor for running the batch processor over large recipe streams.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from brew_tools import batch, calculator
+
+# recipes are sent to the workers in chunks this large, so the pickling and IPC cost of each task is spread over
+# many recipes
+DEFAULT_CHUNK_SIZE = 2000
+
+# the number of chunks queued per worker; this bounds the memory held by in-flight results
+CHUNKS_PER_WORKER = 2
+
+
+def _initialize_worker(backend):
+    # runs once in each worker process:  select the backend and load the catalog before the first chunk.  The table
+    # fills in only the grains the worker's recipes use, so a memory-mapped catalog is never copied into the worker
+    calculator.set_backend(backend)
+    calculator.get_fermentable_table()
+
+
+def _process_chunk(chunk, serialize):
+    results = batch.process_recipes(chunk, len(chunk), skip_errors=True)
+    if serialize is None:
+        return list(results)
+
+    # one string per chunk is far cheaper to send back to the parent than the Decimals inside the results
+    return [''.join(serialize(result) + '\n' for result in results)]
+
+
+def _chunks(recipes, chunk_size):
+    recipes = iter(recipes)
+    chunk = tuple(islice(recipes, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = tuple(islice(recipes, chunk_size))
+
+
+def process_recipes(recipes, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True, backend=calculator.DECIMAL,
+                    serialize=None):
+    """ Calculates recipes like batch.process_recipes, sharded across a pool of worker processes.
+
+    The recipe stream is read lazily, chunk_size recipes at a time, with at most CHUNKS_PER_WORKER chunks per worker
+    in flight, so memory use stays constant however long the stream is.  A recipe that cannot be calculated yields a
+    batch.BatchError and the rest of its chunk is unaffected.
+
+    Workers started with fork (the default on Linux) inherit grains.max_gravities as it is in the parent.  Workers
+    started with spawn or forkserver (the default on Windows and macOS) import brew_tools afresh and load the default
+    catalog, so a catalog assigned at runtime, eg. with grains.set_catalog or grains.merge_catalogs, is not seen by
+    them; list extra catalogs in the BREW_TOOLS_CATALOGS environment variable instead, which every process reads.
+
+    :param recipes:  An iterable of batch.BatchRecipe tuples.  They must be picklable.
+    :param workers:  The number of worker processes.  (Default is the number of CPUs)
+    :param chunk_size:  The number of recipes sent to a worker at a time.
+    :param ordered:  When True (the default), results are yielded in input order.  When False, each chunk's results
+        are yielded as soon as the chunk finishes, which keeps every worker busy when chunks take uneven time.
+    :param backend:  The calculator backend the workers use, calculator.DECIMAL or calculator.FLOAT.
+    :param serialize:  An optional module-level function, such as batch.result_to_json, that the workers apply to
+        each result.  Serializing in the workers keeps the parent process from becoming the bottleneck.
+    :return:  A generator of batch.BatchResult and batch.BatchError tuples or, with serialize, of text blocks holding
+        one serialized result per line, ready to write to a file.
+    :raises:
+        ValueError when workers or chunk_size is less than one.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('"workers" argument must be a positive integer.')
+
+    if chunk_size < 1:
+        raise ValueError('"chunk_size" argument must be a positive integer.')
+
+    max_in_flight = workers * CHUNKS_PER_WORKER
+    chunks = _chunks(recipes, chunk_size)
+
+    with ProcessPoolExecutor(workers, initializer=_initialize_worker, initargs=(backend,)) as executor:
+        if ordered:
+            pending = deque(
+                executor.submit(_process_chunk, chunk, serialize) for chunk in islice(chunks, max_in_flight))
+            while pending:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(executor.submit(_process_chunk, chunk, serialize))
+                for result in results:
+                    yield result
+        else:
+            pending = set(executor.submit(_process_chunk, chunk, serialize) for chunk in islice(chunks, max_in_flight))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for chunk in islice(chunks, len(done)):
+                    pending.add(executor.submit(_process_chunk, chunk, serialize))
+                for future in done:
+                    for result in future.result():
+                        yield result
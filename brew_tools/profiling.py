@@ -0,0 +1,298 @@
+""" This module contains opt-in profiling instrumentation for the calculator and formatter modules.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    Profiling is off by default and costs nothing while off:  the instrumented functions are only swapped in while a
+    Profiler is active.  Turn it on for a block with the profile() context manager, or for the whole process by
+    setting the BREW_TOOLS_PROFILE environment variable before importing brew_tools.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from brew_tools import calculator, formatter
+
+ENVIRONMENT_VARIABLE = 'BREW_TOOLS_PROFILE'
+
+# latency percentiles are estimated from a uniform sample of at most this many calls per function
+MAX_SAMPLES = 10000
+
+PERCENTILES = (.5, .9, .99)
+
+CALCULATOR_FUNCTIONS = (
+    'to_decimal', 'to_number', 'convert_sg_to_ppg', 'convert_lbs_to_lbs_ounces', 'calc_total_gravity_points',
+    'calc_expected_yield', 'calc_grain_qty', 'calc_grain_bill', 'calc_grain_bills', 'calc_total_grain_weight',
+    'calc_mash_water_volume', 'calc_strike_temp', 'calc_infusion_volume', 'get_fermentable_table')
+
+FORMATTER_FUNCTIONS = ('format_grain_bill_line', 'format_grain_bill')
+
+_profiler = None
+_originals = []
+
+# the number of Decimals created so far in the current thread or asyncio task, so calls running concurrently
+# elsewhere are not counted against each other
+_decimals = ContextVar('brew_tools_profiling_decimals', default=0)
+
+
+class FunctionStats(object):
+    """ The call count, latency and Decimal allocations recorded for one function.
+    """
+
+    __slots__ = ('calls', 'total_seconds', 'decimals', 'samples', '_random')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.decimals = 0
+        self.samples = []
+        self._random = random.Random(0)
+
+    def record(self, seconds, decimals):
+        """ Records one call.
+
+        :param seconds:  The call's latency.
+        :param decimals:  The number of Decimals created during the call, including by the functions it called.
+        """
+
+        self.calls += 1
+        self.total_seconds += seconds
+        self.decimals += decimals
+
+        # reservoir sampling keeps a uniform sample of every call so far in bounded memory
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            index = self._random.randrange(self.calls)
+            if index < MAX_SAMPLES:
+                self.samples[index] = seconds
+
+    def percentile(self, fraction):
+        """ Estimates a latency percentile.
+
+        :param fraction:  The percentile as a fraction, eg. 0.99
+        :return:  The estimated latency, in seconds, or 0.0 before any calls.
+        """
+
+        if not self.samples:
+            return 0.0
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self):
+        """ Exports the stats.
+
+        :return:  A dict of the call count, total, mean and percentile latencies in seconds, and Decimal allocations.
+        """
+
+        stats = {
+            'calls': self.calls,
+            'total_seconds': self.total_seconds,
+            'mean_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+            'decimals': self.decimals,
+            'decimals_per_call': self.decimals / self.calls if self.calls else 0.0,
+        }
+        for fraction in PERCENTILES:
+            stats['p{:g}_seconds'.format(fraction * 100)] = self.percentile(fraction)
+
+        return stats
+
+
+class Profiler(object):
+    """ Collects FunctionStats for the instrumented functions while it is active.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self._lock = Lock()
+
+    def record(self, name, seconds, decimals):
+        """ Records one call of an instrumented function.
+
+        :param name:  The qualified function name, eg. 'calculator.calc_grain_bill'
+        :param seconds:  The call's latency.
+        :param decimals:  The number of Decimals created during the call.
+        """
+
+        with self._lock:
+            stats = self.functions.get(name)
+            if stats is None:
+                stats = self.functions[name] = FunctionStats()
+
+            stats.record(seconds, decimals)
+
+    def as_dict(self):
+        """ Exports the collected stats.
+
+        :return:  A dict of qualified function name to the dict exported by FunctionStats.as_dict.
+        """
+
+        return dict((name, stats.as_dict()) for (name, stats) in sorted(self.functions.items()))
+
+    def to_prometheus(self, prefix='brew_tools'):
+        """ Exports the collected stats in the Prometheus text exposition format.
+
+        :param prefix:  The metric name prefix.
+        :return:  The metrics text.
+        """
+
+        stats = sorted(self.functions.items())
+        lines = [
+            '# HELP {}_calls_total Calls of each instrumented function.'.format(prefix),
+            '# TYPE {}_calls_total counter'.format(prefix),
+        ]
+        lines.extend('{}_calls_total{{function="{}"}} {}'.format(prefix, name, function.calls)
+                     for (name, function) in stats)
+
+        lines.append('# HELP {}_call_seconds Latency of each instrumented function.'.format(prefix))
+        lines.append('# TYPE {}_call_seconds summary'.format(prefix))
+        for (name, function) in stats:
+            lines.extend('{}_call_seconds{{function="{}",quantile="{:g}"}} {!r}'.format(
+                prefix, name, fraction, function.percentile(fraction)) for fraction in PERCENTILES)
+            lines.append('{}_call_seconds_sum{{function="{}"}} {!r}'.format(prefix, name, function.total_seconds))
+            lines.append('{}_call_seconds_count{{function="{}"}} {}'.format(prefix, name, function.calls))
+
+        lines.append('# HELP {}_decimals_total Decimals created by each instrumented function, inclusive.'.format(
+            prefix))
+        lines.append('# TYPE {}_decimals_total counter'.format(prefix))
+        lines.extend('{}_decimals_total{{function="{}"}} {}'.format(prefix, name, function.decimals)
+                     for (name, function) in stats)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _count_decimals(function):
+    @wraps(function)
+    def counted(*args, **kwargs):
+        if _profiler is not None:
+            _decimals.set(_decimals.get() + 1)
+        return function(*args, **kwargs)
+
+    return counted
+
+
+def _instrument(name, function):
+    @wraps(function)
+    def instrumented(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return function(*args, **kwargs)
+
+        decimals = _decimals.get()
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record(name, perf_counter() - start, _decimals.get() - decimals)
+
+    return instrumented
+
+
+def _patch(target, attribute, replacement):
+    _originals.append((target, attribute, target.__dict__.get(attribute)))
+    setattr(target, attribute, replacement)
+
+
+def _install():
+    # to_decimal always creates a Decimal, whichever backend is selected.  The Decimal backend's round_to is the same
+    # function, bound before profiling starts, so it is patched with the same instrumented to_decimal, and its
+    # quantize is reported under its own name
+    to_decimal = _instrument('calculator.to_decimal', _count_decimals(calculator.to_decimal))
+    decimal_backend = calculator._BACKENDS[calculator.DECIMAL]
+    _patch(decimal_backend, 'to_number', _count_decimals(decimal_backend.to_number))
+    _patch(decimal_backend, 'round_to', to_decimal)
+    _patch(decimal_backend, 'quantize', _instrument('calculator.quantize', _count_decimals(decimal_backend.quantize)))
+    _patch(calculator, 'to_decimal', to_decimal)
+    for name in CALCULATOR_FUNCTIONS[1:]:
+        _patch(calculator, name, _instrument('calculator.' + name, getattr(calculator, name)))
+
+    _patch(calculator.FermentableTable, '_expected_yield', _instrument(
+        'calculator.FermentableTable.expected_yield', calculator.FermentableTable._expected_yield))
+
+    for name in FORMATTER_FUNCTIONS:
+        _patch(formatter, name, _instrument('formatter.' + name, getattr(formatter, name)))
+
+
+def _uninstall():
+    while _originals:
+        target, attribute, original = _originals.pop()
+        if original is None:
+            delattr(target, attribute)
+        else:
+            setattr(target, attribute, original)
+
+
+def enable(profiler=None):
+    """ Starts profiling the calculator and formatter functions, process-wide, until disable is called.
+
+    :param profiler:  The Profiler to record into.  (Default is a new Profiler)
+    :return:  The active Profiler.
+    """
+
+    global _profiler
+
+    if not _originals:
+        _install()
+
+    _profiler = profiler or Profiler()
+    return _profiler
+
+
+def disable():
+    """ Stops profiling and restores the uninstrumented functions.
+    """
+
+    global _profiler
+
+    _uninstall()
+    _profiler = None
+
+
+def get_profiler():
+    """ Gets the active Profiler.
+
+    :return:  The active Profiler, or None when profiling is disabled.
+    """
+
+    return _profiler
+
+
+@contextmanager
+def profile():
+    """ Context manager that profiles the enclosed block into a new Profiler.  Blocks may be nested; the outer
+    Profiler resumes when an inner block exits.
+    Example:  with profiling.profile() as profiler: ... ; print(profiler.to_prometheus())
+    """
+
+    global _profiler
+
+    previous = _profiler
+    profiler = enable(Profiler())
+    try:
+        yield profiler
+    finally:
+        if previous is None:
+            disable()
+        else:
+            _profiler = previous
@@ -0,0 +1,348 @@
+""" This module contains an incremental recipe model that recalculates only what a change affects.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    A Recipe keeps a small dependency graph between its inputs and the values calc_grain_bill,
+    calc_total_grain_weight, calc_mash_water_volume and calc_strike_temp would give for them:
+
+        target_gravity, volume  ->  total gravity points  --+
+        grain, efficiency       ->  line expected yield   --+->  line quantity  ->  grain bill, total grain weight
+        ratio                   ----------------------------+                                    |
+        water_grist_ratio       ------------------------------------------------------------->  mash water volume
+        water_grist_ratio, grain_temp, mash_temp  ------------------------------------------->  strike temp
+
+    Changing an input only marks what depends on it as stale, and values are recalculated when they are next read,
+    so editing one grain recalculates that line and the totals, and changing the volume recalculates the line
+    quantities from the expected yields already known.
+"""
+
+from array import array
+from brew_tools import calculator
+
+
+class Recipe(object):
+    """ A recipe whose grain bill and mash values are kept up to date incrementally as its inputs change.
+
+    Results are the same as calling the calculator functions from scratch, in the current backend.  Changing the
+    backend or the fermentable catalog recalculates everything on the next read.
+    """
+
+    def __init__(self, target_gravity, volume, grain_list=(), water_grist_ratio=None, grain_temp=None,
+                 mash_temp=None):
+        """ Create a recipe.
+
+        :param target_gravity: The target original gravity.
+        :param volume: The target post-boil volume, in gallons.
+        :param grain_list: The grains in the recipe as tuples:  (grain_name, ratio, efficiency)
+        :param water_grist_ratio:  The mash water-to-grist ratio as quarts/pound.  Required for mash water volume
+            and strike temp.
+        :param grain_temp:  The temperature of the grains, in degrees Fahrenheit.  Required for strike temp.
+        :param mash_temp:  The target mash temperature, in degrees Fahrenheit.  Required for strike temp.
+        :raises:
+            KeyError when a grain is not in the fermentable catalog, or ValueError when a grain is listed twice.
+        """
+
+        self._target_gravity = target_gravity
+        self._volume = volume
+        self._water_grist_ratio = water_grist_ratio
+        self._grain_temp = grain_temp
+        self._mash_temp = mash_temp
+
+        self._grains = []
+        self._ratios = []
+        self._efficiencies = []
+        self._grain_ids = array('i')
+        self._expected_yields = []
+        self._yield_ppgs = []
+        self._pounds = array('i')
+        self._tenths = array('i')
+        self._stale_lines = set()
+
+        self._context = None
+        self._total_gravity_points = None
+        self._grain_bill = None
+        self._total_grain_weight = None
+        self._mash_water_volume = None
+        self._strike_temp = None
+
+        for (grain, ratio, efficiency) in grain_list:
+            self.add_grain(grain, ratio, efficiency)
+
+    def __len__(self):
+        return len(self._grains)
+
+    def __repr__(self):
+        return 'Recipe({!r}, {!r}, {!r})'.format(self._target_gravity, self._volume, self.grain_list)
+
+    @property
+    def target_gravity(self):
+        """ The target original gravity.
+        """
+
+        return self._target_gravity
+
+    @target_gravity.setter
+    def target_gravity(self, value):
+        self._target_gravity = value
+        self._invalidate_gravity_points()
+
+    @property
+    def volume(self):
+        """ The target post-boil volume, in gallons.
+        """
+
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = value
+        self._invalidate_gravity_points()
+
+    @property
+    def water_grist_ratio(self):
+        """ The mash water-to-grist ratio as quarts/pound.
+        """
+
+        return self._water_grist_ratio
+
+    @water_grist_ratio.setter
+    def water_grist_ratio(self, value):
+        self._water_grist_ratio = value
+        self._mash_water_volume = None
+        self._strike_temp = None
+
+    @property
+    def grain_temp(self):
+        """ The temperature of the grains, in degrees Fahrenheit.
+        """
+
+        return self._grain_temp
+
+    @grain_temp.setter
+    def grain_temp(self, value):
+        self._grain_temp = value
+        self._strike_temp = None
+
+    @property
+    def mash_temp(self):
+        """ The target mash temperature, in degrees Fahrenheit.
+        """
+
+        return self._mash_temp
+
+    @mash_temp.setter
+    def mash_temp(self, value):
+        self._mash_temp = value
+        self._strike_temp = None
+
+    @property
+    def grain_list(self):
+        """ The grains in the recipe as a tuple of (grain_name, ratio, efficiency) tuples.
+        """
+
+        return tuple(zip(self._grains, self._ratios, self._efficiencies))
+
+    def add_grain(self, grain, ratio, efficiency):
+        """ Adds a grain to the end of the recipe.
+
+        :param grain:  The grain name.
+        :param ratio:  The ratio of gravity points provided by the grain.
+        :param efficiency:  The expected conversion efficiency of the grain in the mash.
+        :raises:
+            KeyError when the grain is not in the fermentable catalog, or ValueError when it is already in the recipe.
+        """
+
+        if grain in self._grains:
+            raise ValueError('"{}" is already in the recipe.'.format(grain))
+
+        grain_id = calculator.get_fermentable_table().grain_id(grain)
+        self._grains.append(grain)
+        self._ratios.append(ratio)
+        self._efficiencies.append(efficiency)
+        self._grain_ids.append(grain_id)
+        self._expected_yields.append(None)
+        self._yield_ppgs.append(None)
+        self._pounds.append(0)
+        self._tenths.append(0)
+        self._stale_lines.add(len(self._grains) - 1)
+        self._invalidate_totals()
+
+    def update_grain(self, grain, ratio=None, efficiency=None):
+        """ Changes the ratio and/or efficiency of a grain in the recipe.  Only that grain's line is recalculated.
+
+        :param grain:  The grain name.
+        :param ratio:  The new ratio, or None to keep the current one.
+        :param efficiency:  The new efficiency, or None to keep the current one.
+        :raises:
+            ValueError when the grain is not in the recipe.
+        """
+
+        line = self._line(grain)
+        if ratio is not None:
+            self._ratios[line] = ratio
+        if efficiency is not None and efficiency != self._efficiencies[line]:
+            self._efficiencies[line] = efficiency
+            self._expected_yields[line] = None
+
+        self._stale_lines.add(line)
+        self._invalidate_totals()
+
+    def remove_grain(self, grain):
+        """ Removes a grain from the recipe.
+
+        :param grain:  The grain name.
+        :raises:
+            ValueError when the grain is not in the recipe.
+        """
+
+        line = self._line(grain)
+        for column in (self._grains, self._ratios, self._efficiencies, self._grain_ids, self._expected_yields,
+                       self._yield_ppgs, self._pounds, self._tenths):
+            del column[line]
+
+        self._stale_lines = set(index - (index > line) for index in self._stale_lines if index != line)
+        self._invalidate_totals()
+
+    def _line(self, grain):
+        try:
+            return self._grains.index(grain)
+        except ValueError:
+            raise ValueError('"{}" is not in the recipe.'.format(grain))
+
+    def _invalidate_gravity_points(self):
+        self._total_gravity_points = None
+        self._invalidate_totals()
+
+    def _invalidate_totals(self):
+        self._grain_bill = None
+        self._total_grain_weight = None
+        self._mash_water_volume = None
+
+    def _check_context(self):
+        # everything calculated so far belongs to one backend and fermentable table
+        context = (calculator.get_backend(), calculator.get_fermentable_table())
+        if context != self._context:
+            if self._context is not None:
+                table = context[1]
+                self._grain_ids = array('i', (table.grain_id(grain) for grain in self._grains))
+                self._expected_yields = [None] * len(self._grains)
+                self._yield_ppgs = [None] * len(self._grains)
+                self._invalidate_gravity_points()
+                self._strike_temp = None
+
+            self._context = context
+        else:
+            self._check_ppgs(context[1])
+
+        return context[1]
+
+    def _check_ppgs(self, table):
+        # grain_id re-reads a mutable catalog, so a gravity edited in place since a line's expected yield was
+        # calculated makes that line stale
+        for line, grain in enumerate(self._grains):
+            if self._yield_ppgs[line] is not None and table.ppgs[table.grain_id(grain)] != self._yield_ppgs[line]:
+                self._expected_yields[line] = None
+                self._stale_lines.add(line)
+                self._invalidate_totals()
+
+    @property
+    def total_gravity_points(self):
+        """ The recipe's total gravity points, as calc_total_gravity_points.
+        """
+
+        self._check_context()
+        if self._total_gravity_points is None:
+            self._total_gravity_points = calculator.calc_total_gravity_points(self._target_gravity, self._volume)
+            # every line quantity depends on the total gravity points
+            self._stale_lines = set(range(len(self._grains)))
+
+        return self._total_gravity_points
+
+    def _update_lines(self):
+        total_gravity_points = self.total_gravity_points
+        table = self._context[1]
+        for line in self._stale_lines:
+            grain_id = self._grain_ids[line] = table.grain_id(self._grains[line])
+            if table.ppgs[grain_id] != self._yield_ppgs[line]:
+                self._expected_yields[line] = None
+
+            expected_yield = self._expected_yields[line]
+            if expected_yield is None:
+                # only this line's yield is needed, so it is calculated directly rather than through the table
+                self._yield_ppgs[line] = table.ppgs[grain_id]
+                expected_yield = self._expected_yields[line] = calculator.calc_expected_yield(
+                    self._yield_ppgs[line], self._efficiencies[line])
+
+            lbs, ounces = calculator.convert_lbs_to_lbs_ounces(
+                calculator.calc_grain_qty(total_gravity_points, self._ratios[line], expected_yield))
+            tenths = int(round(ounces * 10))
+            self._pounds[line] = lbs
+            self._tenths[line] = tenths
+
+        self._stale_lines.clear()
+
+    @property
+    def grain_bill(self):
+        """ The recipe's grain bill, as calc_grain_bill.
+        """
+
+        self._check_context()
+        if self._grain_bill is None:
+            self._update_lines()
+            self._grain_bill = calculator.GrainBill(self._context[1].names, self._grain_ids, self._pounds,
+                                                    self._tenths, self._context[0] == calculator.DECIMAL)
+
+        return self._grain_bill
+
+    @property
+    def total_grain_weight(self):
+        """ The total weight of the grain bill in pounds, as calc_total_grain_weight.
+        """
+
+        self._check_context()
+        if self._total_grain_weight is None:
+            self._total_grain_weight = self.grain_bill.total_weight()
+
+        return self._total_grain_weight
+
+    @property
+    def mash_water_volume(self):
+        """ The volume of mash water in quarts, as calc_mash_water_volume.
+        """
+
+        self._check_context()
+        if self._mash_water_volume is None:
+            self._mash_water_volume = calculator.calc_mash_water_volume(self._water_grist_ratio,
+                                                                        self.total_grain_weight)
+
+        return self._mash_water_volume
+
+    @property
+    def strike_temp(self):
+        """ The strike water temperature in degrees Fahrenheit, as calc_strike_temp.
+        """
+
+        self._check_context()
+        if self._strike_temp is None:
+            self._strike_temp = calculator.calc_strike_temp(self._water_grist_ratio, self._grain_temp,
+                                                            self._mash_temp)
+
+        return self._strike_temp
@@ -0,0 +1,198 @@
+""" This module contains a streaming rollup of grain demand across a production schedule.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    A rollup keeps one integer total per grain, in tenths of an ounce, so its memory depends on the size of the
+    fermentable catalog rather than the number of brews, totals are exact in either backend, and rollups built
+    separately (by parallel workers, or on different days) can be merged.
+"""
+
+from itertools import islice
+from brew_tools import calculator
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _tenth_ounces(grain_bill):
+    # the (grain_name, weight in tenths of an ounce) of each line of a GrainBill
+    names = grain_bill.names
+    return ((names[grain_id], pounds * 160 + tenths)
+            for (grain_id, pounds, tenths) in zip(grain_bill.grain_ids, grain_bill.pounds, grain_bill.tenths))
+
+
+class GrainDemandRollup(object):
+    """ The total weight of each grain needed for a schedule of brews.
+    """
+
+    def __init__(self):
+        self.recipe_count = 0
+        self.batch_count = 0
+        self._tenth_ounces = {}
+
+    def __len__(self):
+        return len(self._tenth_ounces)
+
+    def __contains__(self, grain):
+        return grain in self._tenth_ounces
+
+    def add_grain_bill(self, grain_bill, batch_count=1):
+        """ Adds the grains of a calculated grain bill, brewed batch_count times.
+
+        :param grain_bill:  The GrainBill.
+        :param batch_count:  The number of batches scheduled.  (Default is 1)
+        :raises:
+            ValueError when the batch count is not a non-negative integer.
+        """
+
+        if not isinstance(batch_count, int) or batch_count < 0:
+            raise ValueError('"batch_count" argument must be a non-negative integer.')
+
+        totals = self._tenth_ounces
+        for grain, tenth_ounces in _tenth_ounces(grain_bill):
+            totals[grain] = totals.get(grain, 0) + tenth_ounces * batch_count
+
+        self.recipe_count += 1
+        self.batch_count += batch_count
+
+    def add(self, recipe, batch_count=1):
+        """ Adds a scheduled recipe.
+
+        :param recipe:  A GrainBill, a recipe.Recipe, or any object with target_gravity, volume and grain_list fields
+            such as a batch.BatchRecipe.
+        :param batch_count:  The number of batches scheduled.  (Default is 1)
+        :raises:
+            ValueError when the batch count is not a non-negative integer, or the calculator's exception for a recipe
+            that cannot be calculated.
+        """
+
+        if isinstance(recipe, calculator.GrainBill):
+            grain_bill = recipe
+        elif hasattr(recipe, 'grain_bill'):
+            grain_bill = recipe.grain_bill
+        else:
+            grain_bill = calculator.calc_grain_bill(recipe.target_gravity, recipe.volume, recipe.grain_list)
+
+        self.add_grain_bill(grain_bill, batch_count)
+
+    def update(self, schedule, chunk_size=DEFAULT_CHUNK_SIZE):
+        """ Adds a schedule of recipes.  Recipes that still need calculating are calculated chunk_size at a time
+        through calculator.calc_grain_bills, so memory use does not grow with the schedule.
+
+        :param schedule:  An iterable of (recipe, batch_count) tuples, with recipes as accepted by add.
+        :param chunk_size:  The number of recipes to calculate at a time.
+        :return:  The number of recipes added.
+        """
+
+        count = self.recipe_count
+        schedule = iter(schedule)
+        while True:
+            chunk = tuple(islice(schedule, chunk_size))
+            if not chunk:
+                break
+
+            pending = [(recipe, batch_count) for (recipe, batch_count) in chunk
+                       if not isinstance(recipe, calculator.GrainBill) and not hasattr(recipe, 'grain_bill')]
+            if pending:
+                grain_bills = iter(calculator.calc_grain_bills(
+                    tuple(recipe.target_gravity for (recipe, _) in pending),
+                    tuple(recipe.volume for (recipe, _) in pending),
+                    tuple(recipe.grain_list for (recipe, _) in pending)))
+                pending = set(id(recipe) for (recipe, _) in pending)
+
+            for recipe, batch_count in chunk:
+                self.add(next(grain_bills) if id(recipe) in pending else recipe, batch_count)
+
+        return self.recipe_count - count
+
+    def merge(self, other):
+        """ Adds the totals of another rollup to this one.
+
+        :param other:  The other GrainDemandRollup.
+        :return:  This rollup.
+        """
+
+        totals = self._tenth_ounces
+        for grain, tenth_ounces in other._tenth_ounces.items():
+            totals[grain] = totals.get(grain, 0) + tenth_ounces
+
+        self.recipe_count += other.recipe_count
+        self.batch_count += other.batch_count
+        return self
+
+    def totals(self, unit=calculator.POUNDS):
+        """ Gets the total weight of each grain, heaviest first, in the current backend.
+
+        :param unit:  calculator.POUNDS, OUNCES, KILOGRAMS or GRAMS.  (Default is POUNDS)
+        :return:  A tuple of (grain_name, weight) tuples, with weights to three decimal places.
+        :raises:
+            ValueError when the unit is unknown.
+        """
+
+        grains = sorted(self._tenth_ounces, key=lambda grain: (-self._tenth_ounces[grain], grain))
+        pounds, tenths = zip(*(divmod(self._tenth_ounces[grain], 160) for grain in grains)) if grains else ((), ())
+        grain_bill = calculator.GrainBill(grains, range(len(grains)), pounds, tenths,
+                                          calculator.get_backend() == calculator.DECIMAL)
+        return tuple(zip(grains, grain_bill.weights(unit)))
+
+    def total_weight(self):
+        """ Gets the total weight of every grain, in pounds, in the current backend.
+
+        :return:  The total weight, as calculator.calc_total_grain_weight.
+        """
+
+        pounds, tenths = divmod(sum(self._tenth_ounces.values()), 160)
+        return calculator.GrainBill(('',), (0,), (pounds,), (tenths,)).total_weight()
+
+    def to_dict(self):
+        """ Gets the rollup as JSON-serializable data, to save or send between processes.
+
+        :return:  A dict.
+        """
+
+        return {'recipe_count': self.recipe_count, 'batch_count': self.batch_count,
+                'tenth_ounces': dict(sorted(self._tenth_ounces.items()))}
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Restores a rollup saved with to_dict.
+
+        :param data:  The dict.
+        :return:  The GrainDemandRollup.
+        """
+
+        rollup = cls()
+        rollup.recipe_count = data['recipe_count']
+        rollup.batch_count = data['batch_count']
+        rollup._tenth_ounces = dict(data['tenth_ounces'])
+        return rollup
+
+
+def rollup_grain_demand(schedule, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Totals the grains needed for a schedule of brews.
+
+    :param schedule:  An iterable of (recipe, batch_count) tuples.  See GrainDemandRollup.add for the recipes accepted.
+    :param chunk_size:  The number of recipes to calculate at a time.
+    :return:  The GrainDemandRollup.
+    """
+
+    rollup = GrainDemandRollup()
+    rollup.update(schedule, chunk_size)
+    return rollup
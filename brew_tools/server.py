@@ -0,0 +1,331 @@
+""" This module contains a local asyncio server that serves the calculator functions as JSON.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    The protocol is newline-delimited JSON over TCP or a Unix socket.  Each request is an object such as
+        {"id": 1, "method": "calc_grain_bill", "params": {"target_gravity": 1.052, "volume": 5.5,
+                                                           "grain_list": [["American Wheat", 0.67, 0.68]]}}
+    with params as an object or a list, and each response is {"id": 1, "result": ...} or {"id": 1, "error": "..."}.
+    Responses on a connection are written as they complete, so clients may pipeline requests and match responses by
+    id.  Decimals are returned as strings so no precision is lost.
+
+    Run it with:  python -m brew_tools.server --port 8765   (or --unix /path/to/socket)
+"""
+
+import argparse
+import asyncio
+import json
+from decimal import Decimal
+from brew_tools import batch, cache, calculator
+
+DEFAULT_MAX_BATCH_SIZE = 512
+
+# how long the first calc_grain_bill request of a micro-batch waits for others to join it, in seconds
+DEFAULT_BATCH_DELAY = .001
+
+# the most requests the server works on at once; connections are not read while it is full
+DEFAULT_MAX_PENDING = 4096
+
+# the longest request line read, in bytes; longer lines are answered with an error
+DEFAULT_LINE_LIMIT = 1024 * 1024
+
+# the calculator functions served; they are looked up when called, so profiling instruments them
+METHODS = frozenset((
+    'calc_grain_bill', 'calc_total_grain_weight', 'calc_total_gravity_points', 'calc_mash_water_volume',
+    'calc_strike_temp', 'calc_infusion_volume', 'convert_sg_to_ppg', 'convert_lbs_to_lbs_ounces'))
+
+_GRAIN_BILL_PARAMS = ('target_gravity', 'volume', 'grain_list')
+
+
+class RequestError(Exception):
+    """ Raised for a request that cannot be served, eg. an unknown method.
+    """
+
+
+def _to_json(value):
+    if isinstance(value, calculator.GrainBill):
+        return [{'grain': grain, 'lbs': lbs, 'oz': ounces} for (grain, (lbs, ounces)) in value]
+
+    if isinstance(value, Decimal):
+        return str(value)
+
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def _grain_bill_args(params):
+    if params is None:
+        params = []
+    elif isinstance(params, dict):
+        params = [params.get(name) for name in _GRAIN_BILL_PARAMS]
+
+    if len(params) != 3 or not isinstance(params[2], (list, tuple)):
+        raise RequestError('calc_grain_bill takes target_gravity, volume and grain_list.')
+
+    return params[0], params[1], tuple(tuple(line) for line in params[2])
+
+
+class CalculatorServer(object):
+    """ Serves the calculator functions, coalescing concurrent calc_grain_bill requests into micro-batches for
+    calculator.calc_grain_bills and answering identical in-flight requests with a single calculation.
+    """
+
+    def __init__(self, backend=calculator.DECIMAL, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 batch_delay=DEFAULT_BATCH_DELAY, max_pending=DEFAULT_MAX_PENDING, line_limit=DEFAULT_LINE_LIMIT):
+        """ Create the server.  It does not listen until start_tcp or start_unix is called.
+
+        :param backend:  The calculator backend, calculator.DECIMAL or calculator.FLOAT.
+        :param max_batch_size:  The most calc_grain_bill requests calculated in one micro-batch.
+        :param batch_delay:  How long a micro-batch waits for more requests, in seconds.
+        :param max_pending:  The most requests worked on at once, across all connections.
+        :param line_limit:  The longest request line read, in bytes.
+        """
+
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.line_limit = line_limit
+        self.stats = {'requests': 0, 'deduplicated': 0, 'batches': 0, 'batched_requests': 0, 'errors': 0}
+        self._in_flight = {}
+        self._batch = []
+        self._batch_timer = None
+        self._pending = None
+
+    async def call(self, method, params):
+        """ Calls a calculator function, sharing the result with identical requests already in flight.
+
+        :param method:  The function name; one of METHODS.
+        :param params:  The function arguments, as a list or a dict of keyword arguments.
+        :return:  The function's result.
+        :raises:
+            RequestError when the method is unknown or params is not a list, dict or None, or the calculator's
+            exception for bad arguments.
+        """
+
+        if not isinstance(method, str) or method not in METHODS:
+            raise RequestError('Unknown method "{}".'.format(method))
+
+        if params is not None and not isinstance(params, (list, dict)):
+            raise RequestError('"params" must be a list, an object or null.')
+
+        key = (method, cache.normalize(params if isinstance(params, list) else sorted((params or {}).items())))
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['deduplicated'] += 1
+            return await asyncio.shield(future)
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            if method == 'calc_grain_bill':
+                self._enqueue_grain_bill(_grain_bill_args(params), future)
+            else:
+                with calculator.backend(self.backend):
+                    function = getattr(calculator, method)
+                    if isinstance(params, dict):
+                        future.set_result(function(**params))
+                    else:
+                        future.set_result(function(*(params or ())))
+        except Exception as error:
+            future.set_exception(error)
+        finally:
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(future)
+
+    def _enqueue_grain_bill(self, args, future):
+        self._batch.append((args, future))
+        if len(self._batch) >= self.max_batch_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().call_later(self.batch_delay, self._flush_batch)
+
+    def _flush_batch(self):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+
+        requests, self._batch = self._batch, []
+        if not requests:
+            return
+
+        self.stats['batches'] += 1
+        self.stats['batched_requests'] += len(requests)
+        with calculator.backend(self.backend):
+            try:
+                grain_bills = calculator.calc_grain_bills(*zip(*(args for (args, _) in requests)))
+            except Exception:
+                # a bad recipe fails the whole batch, so calculate each one alone
+                grain_bills = None
+
+            for index, (args, future) in enumerate(requests):
+                if grain_bills is not None:
+                    future.set_result(grain_bills[index])
+                    continue
+
+                # every future must be resolved, whatever goes wrong, or its requests wait forever
+                try:
+                    future.set_result(calculator.calc_grain_bill(*args))
+                except Exception as error:
+                    future.set_exception(error)
+
+    async def handle(self, request):
+        """ Serves one decoded request.
+
+        :param request:  The request object:  {"id": ..., "method": ..., "params": ...}
+        :return:  The response object.
+        """
+
+        self.stats['requests'] += 1
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise RequestError('A request must be a JSON object.')
+            return {'id': request_id, 'result': await self.call(request.get('method'), request.get('params'))}
+        except (RequestError,) + batch.RECIPE_ERRORS as error:
+            self.stats['errors'] += 1
+            return {'id': request_id, 'error': '{}: {}'.format(type(error).__name__, error)}
+
+    async def _response(self, line):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                self.stats['errors'] += 1
+                return json.dumps({'id': None, 'error': 'ValueError: {}'.format(error)})
+
+            request_id = request.get('id') if isinstance(request, dict) else None
+            return json.dumps(await self.handle(request), default=_to_json)
+        except Exception as error:
+            # whatever goes wrong, including a result that cannot be encoded, the client still gets a response line
+            self.stats['errors'] += 1
+            return json.dumps({'id': request_id, 'error': '{}: {}'.format(type(error).__name__, error)})
+
+    async def _respond(self, line, writer):
+        try:
+            if isinstance(line, ValueError):
+                # the line was over line_limit, so there is no request to read an id from
+                self.stats['errors'] += 1
+                response = json.dumps({'id': None, 'error': 'ValueError: {}'.format(line)})
+            else:
+                response = await self._response(line)
+            writer.write(response.encode('utf-8') + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._pending.release()
+
+    async def _serve_connection(self, reader, writer):
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        tasks = set()
+        try:
+            while True:
+                # backpressure:  stop reading until there is room for another request
+                await self._pending.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError as error:
+                    # a line over the limit; the reader has skipped it, so it is answered and reading carries on
+                    line = error
+                except BaseException:
+                    self._pending.release()
+                    raise
+
+                if not line:
+                    self._pending.release()
+                    break
+
+                if not isinstance(line, ValueError) and not line.strip():
+                    self._pending.release()
+                    continue
+
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            # only left over when reading failed; each cancelled response still releases its permit
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start_tcp(self, host='127.0.0.1', port=0):
+        """ Starts listening on a TCP socket.
+
+        :param host:  The host to bind.  (Default is 127.0.0.1)
+        :param port:  The port to bind, or 0 to pick a free one.
+        :return:  The asyncio.Server.
+        """
+
+        return await asyncio.start_server(self._serve_connection, host, port, limit=self.line_limit)
+
+    async def start_unix(self, path):
+        """ Starts listening on a Unix socket.
+
+        :param path:  The socket path.
+        :return:  The asyncio.Server.
+        """
+
+        return await asyncio.start_unix_server(self._serve_connection, path, limit=self.line_limit)
+
+
+async def _serve(args):
+    calculator_server = CalculatorServer(args.backend, args.max_batch_size, args.batch_delay, args.max_pending)
+    if args.unix:
+        server = await calculator_server.start_unix(args.unix)
+    else:
+        server = await calculator_server.start_tcp(args.host, args.port)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """ Runs the server from the command line until it is interrupted.
+
+    :param argv:  The command line arguments, excluding the program name.  (Default is sys.argv[1:])
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m brew_tools.server',
+                                     description='Serve the BrewTools calculator as JSON over TCP or a Unix socket.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--backend', choices=(calculator.DECIMAL, calculator.FLOAT), default=calculator.DECIMAL)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--batch-delay', type=float, default=DEFAULT_BATCH_DELAY)
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING)
+
+    try:
+        asyncio.run(_serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+""" This module contains inverse recipe solvers:  the largest batch a grain inventory can brew.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+from brew_tools import calculator
+
+
+def calc_grain_demand(grain_list):
+    """ Calculates how many pounds of each grain a recipe needs per total gravity point, the inverse of the grain
+    quantity calculation in calculator.calc_grain_bill.  Grains listed more than once are combined.
+
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :return:  A tuple of (grain_name, pounds_per_gravity_point), one per distinct grain with a non-zero ratio.
+    :raises:
+        KeyError when a grain is not in grains.max_gravities.
+        ValueError when a grain has no expected yield (eg. a zero efficiency) or no grain has a positive ratio.
+    """
+
+    table = calculator.get_fermentable_table()
+    demand = {}
+    for (grain, ratio, efficiency) in grain_list:
+        if not ratio:
+            continue
+
+        expected_yield = table.expected_yield(grain, efficiency)
+        if expected_yield <= 0:
+            raise ValueError('"{}" has no expected yield at an efficiency of {}.'.format(grain, efficiency))
+
+        demand[grain] = demand.get(grain, 0) + calculator.to_number(ratio) / expected_yield
+
+    if not demand:
+        raise ValueError('"grain_list" argument must contain a grain with a positive ratio.')
+
+    return tuple(demand.items())
+
+
+def calc_max_gravity_points(grain_demand, inventory):
+    """ Calculates the most total gravity points an inventory can supply while holding the recipe's grain ratios.
+
+    :param grain_demand:  The recipe's grain demand, as returned by calc_grain_demand.
+    :param inventory:  A dict of grain name to pounds on hand.  Missing grains have none on hand.
+    :return:  A tuple:  (total_gravity_points, limiting_grain_name)
+    """
+
+    max_points = limiting_grain = None
+    for (grain, pounds_per_point) in grain_demand:
+        points = calculator.to_number(inventory.get(grain, 0)) / pounds_per_point
+        if max_points is None or points < max_points:
+            max_points, limiting_grain = points, grain
+
+    return max_points, limiting_grain
+
+
+def _fits(grain_bill, inventory):
+    ounces_needed = {}
+    for (grain, (lbs, ounces)) in grain_bill:
+        ounces_needed[grain] = ounces_needed.get(grain, 0) + lbs * 16 + ounces
+
+    return all(ounces <= calculator.to_number(inventory.get(grain, 0)) * 16
+               for (grain, ounces) in ounces_needed.items())
+
+
+def _step_down(value, inventory, grain_bill_args, floor=0):
+    # calc_grain_bill rounds each weight half-up to a tenth of an ounce, so a value rounded down from the closed form
+    # can still need a little more grain than the inventory holds; step it down by thousandths until the bill fits
+    step = calculator.to_number(.001, 3)
+    while value > floor and not _fits(calculator.calc_grain_bill(*grain_bill_args(value)), inventory):
+        value = calculator.to_number(value - step, 3)
+
+    return value
+
+
+def calc_max_volume(target_gravity, grain_list, inventory):
+    """ Calculates the largest post-boil volume an inventory can brew at the target gravity.
+
+    :param target_gravity: The target original gravity.
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :param inventory:  A dict of grain name to pounds on hand.
+    :return:  The largest volume, in gallons to 3 decimal places, whose grain bill fits the inventory.
+    """
+
+    return calc_max_volumes(target_gravity, grain_list, (inventory,))[0]
+
+
+def calc_max_volumes(target_gravity, grain_list, inventories):
+    """ Calculates the largest post-boil volume at the target gravity for each of many inventory scenarios.  The grain
+    demand is calculated once and shared by every scenario.
+
+    :param target_gravity: The target original gravity.
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :param inventories:  An iterable of dicts of grain name to pounds on hand.
+    :return:  A tuple of the largest volumes, in gallons to 3 decimal places, whose grain bills fit the inventories,
+        one per inventory.
+    :raises:
+        ValueError when the target gravity has no gravity points.
+    """
+
+    ppg = calculator.convert_sg_to_ppg(target_gravity)
+    if ppg <= 0:
+        raise ValueError('"target_gravity" argument must be greater than 1.000.')
+
+    grain_demand = calc_grain_demand(grain_list)
+
+    volumes = []
+    for inventory in inventories:
+        points = calc_max_gravity_points(grain_demand, inventory)[0]
+        volume = calculator.to_number(calculator.to_number(int(points / ppg * 1000)) / 1000, 3)
+        volumes.append(_step_down(volume, inventory, lambda volume: (target_gravity, volume, grain_list)))
+
+    return tuple(volumes)
+
+
+def calc_max_gravity(volume, grain_list, inventory):
+    """ Calculates the highest original gravity an inventory can brew at the target post-boil volume.
+
+    :param volume: The target post-boil volume, in gallons.
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :param inventory:  A dict of grain name to pounds on hand.
+    :return:  The highest original gravity, in whole gravity points, whose grain bill fits the inventory.
+    """
+
+    return calc_max_gravities(volume, grain_list, (inventory,))[0]
+
+
+def calc_max_gravities(volume, grain_list, inventories):
+    """ Calculates the highest original gravity at the target volume for each of many inventory scenarios.  The grain
+    demand is calculated once and shared by every scenario.
+
+    :param volume: The target post-boil volume, in gallons.
+    :param grain_list: The list of grains in the recipe as a tuple:  (grain_name, ratio, efficiency)
+    :param inventories:  An iterable of dicts of grain name to pounds on hand.
+    :return:  A tuple of the highest original gravities, in whole gravity points, whose grain bills fit the
+        inventories, one per inventory.
+    :raises:
+        ValueError when the volume is not positive.
+    """
+
+    if volume <= 0:
+        raise ValueError('"volume" argument must be greater than zero.')
+
+    grain_demand = calc_grain_demand(grain_list)
+    volume = calculator.to_number(volume)
+
+    # convert_sg_to_ppg only sees whole points, so round the gravity down to one the inventory can still reach
+    gravities = []
+    for inventory in inventories:
+        points = calc_max_gravity_points(grain_demand, inventory)[0]
+        gravity = calculator.to_number((1000 + int(points / volume)) / 1000, 3)
+        gravities.append(_step_down(gravity, inventory, lambda gravity: (gravity, volume, grain_list), 1))
+
+    return tuple(gravities)
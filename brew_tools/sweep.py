@@ -0,0 +1,252 @@
+""" This module contains a parameter sweep over grids of recipe inputs, with the sensitivity of each grain weight.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    A sweep evaluates a fixed set of grains over every combination of target gravity, volume, mash efficiency, grain
+    ratios and water-to-grist ratio.  Work is shared across the grid:  total gravity points are calculated once per
+    gravity and volume, and expected yields once per efficiency, so each grid point costs only a multiply and divide
+    per grain.  Results are dense float arrays in row-major order over the axes, and can be produced in chunks so
+    large grids never need to fit in memory at once.
+"""
+
+from array import array
+from itertools import islice, product
+from brew_tools import calculator
+
+# the axes of a sweep grid, in row-major order
+TARGET_GRAVITY = 'target_gravity'
+VOLUME = 'volume'
+EFFICIENCY = 'efficiency'
+RATIOS = 'ratios'
+WATER_GRIST_RATIO = 'water_grist_ratio'
+AXES = (TARGET_GRAVITY, VOLUME, EFFICIENCY, RATIOS, WATER_GRIST_RATIO)
+
+# the sensitivity of a grain weight to its own ratio (the other grains' ratios do not affect it)
+RATIO = 'ratio'
+
+DEFAULT_WATER_GRIST_RATIO = 1.25
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def linspace(start, stop, count):
+    """ Makes evenly spaced values for a sweep axis, including both ends.
+    Example:  linspace(1.040, 1.060, 3) == (1.04, 1.05, 1.06)
+
+    :param start:  The first value.
+    :param stop:  The last value.
+    :param count:  The number of values.
+    :return:  A tuple of the values.
+    :raises:
+        ValueError when count is less than 1.
+    """
+
+    if count < 1:
+        raise ValueError('"count" argument must be at least 1.')
+
+    if count == 1:
+        return (start,)
+
+    step = (stop - start) / (count - 1)
+    return tuple(start + step * index for index in range(count - 1)) + (stop,)
+
+
+class SweepResult(object):
+    """ The results of a sweep over a contiguous slice of the grid.
+
+    Grid points are numbered in row-major order over AXES, and this result holds points start to start + len - 1.
+    weights holds one row of grain weights per point, and each array in derivatives has the same layout.
+    """
+
+    __slots__ = ('grains', 'axes', 'start', 'weights', 'total_weights', 'mash_water_volumes', 'derivatives')
+
+    def __init__(self, grains, axes, start, weights, total_weights, mash_water_volumes, derivatives=None):
+        """ Create a sweep result.
+
+        :param grains:  The grain names, in column order.
+        :param axes:  A tuple of the values of each axis, in the order of AXES.
+        :param start:  The grid index of the first point.
+        :param weights:  An array of grain weights in pounds, len(grains) per point.
+        :param total_weights:  An array of the total grain weight of each point, in pounds.
+        :param mash_water_volumes:  An array of the mash water volume of each point, in quarts.
+        :param derivatives:  A dict of input name to an array of the partial derivatives of the grain weights with
+            respect to that input, laid out as weights, or None.
+        """
+
+        self.grains = grains
+        self.axes = axes
+        self.start = start
+        self.weights = weights
+        self.total_weights = total_weights
+        self.mash_water_volumes = mash_water_volumes
+        self.derivatives = derivatives
+
+    def __len__(self):
+        return len(self.total_weights)
+
+    @property
+    def shape(self):
+        """ The shape of the whole grid, as the number of values on each axis.
+        """
+
+        return tuple(len(values) for values in self.axes)
+
+    def parameters(self, index):
+        """ Gets the inputs of a point in this result.
+
+        :param index:  The index of the point within this result.
+        :return:  A dict of axis name to value.
+        """
+
+        parameters = {}
+        remainder = self.start + index
+        for name, values in reversed(tuple(zip(AXES, self.axes))):
+            remainder, position = divmod(remainder, len(values))
+            parameters[name] = values[position]
+
+        return dict((name, parameters[name]) for name in AXES)
+
+    def grain_weights(self, index):
+        """ Gets the grain weights of a point in this result.
+
+        :param index:  The index of the point within this result.
+        :return:  A tuple of (grain_name, weight_in_pounds) tuples.
+        """
+
+        width = len(self.grains)
+        return tuple(zip(self.grains, self.weights[index * width:(index + 1) * width]))
+
+
+def _yield_columns(table, grains, efficiencies):
+    columns = []
+    for efficiency in efficiencies:
+        column = tuple(table.expected_yield(grain, efficiency) for grain in grains)
+        for grain, expected_yield in zip(grains, column):
+            if expected_yield <= 0:
+                raise ValueError('"{}" has no expected yield at an efficiency of {}.'.format(grain, efficiency))
+        columns.append(column)
+
+    return columns
+
+
+def _partials(derivatives):
+    return dict((name, array('d')) for name in (TARGET_GRAVITY, VOLUME, EFFICIENCY, RATIO)) if derivatives else None
+
+
+def sweep_chunks(grains, target_gravities, volumes, efficiencies, ratio_sets,
+                 water_grist_ratios=(DEFAULT_WATER_GRIST_RATIO,), derivatives=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Sweeps a fixed set of grains over a grid of recipe inputs, a chunk of grid points at a time.
+
+    Grain weights are those calc_grain_qty gives in the FLOAT backend, before they are split into pounds and
+    ounces, and totals are summed from them.  Derivatives are exact for the continuous formula, treating gravity
+    points as continuous rather than rounded to whole points.
+
+    :param grains:  The grain names.
+    :param target_gravities:  The target original gravities to sweep.
+    :param volumes:  The post-boil volumes to sweep, in gallons.
+    :param efficiencies:  The mash efficiencies to sweep, applied to every grain.
+    :param ratio_sets:  The grain ratios to sweep, each a sequence with one ratio per grain.
+    :param water_grist_ratios:  The water-to-grist ratios to sweep, in quarts/pound.  (Default is 1.25)
+    :param derivatives:  True to include the partial derivatives of each grain weight with respect to
+        TARGET_GRAVITY, VOLUME, EFFICIENCY and the grain's own RATIO.  (Default is False)
+    :param chunk_size:  The most grid points in each result.
+    :return:  A generator of SweepResults covering the grid in order.
+    :raises:
+        KeyError when a grain is not in grains.max_gravities.
+        ValueError when a ratio set has the wrong number of ratios, or a grain has no expected yield.
+    """
+
+    if chunk_size < 1:
+        raise ValueError('"chunk_size" argument must be at least 1.')
+
+    grains = tuple(grains)
+    axes = tuple(tuple(values) for values in (target_gravities, volumes, efficiencies, ratio_sets,
+                                               water_grist_ratios))
+    for ratios in axes[3]:
+        if len(ratios) != len(grains):
+            raise ValueError('Each ratio set must have one ratio per grain:  {!r}.'.format(ratios))
+
+    with calculator.backend(calculator.FLOAT):
+        table = calculator.get_fermentable_table()
+        yield_columns = _yield_columns(table, grains, axes[2])
+        ppgs = [calculator.convert_sg_to_ppg(gravity) for gravity in axes[0]]
+        gravity_points = [[calculator.calc_total_gravity_points(gravity, volume) for volume in axes[1]]
+                          for gravity in axes[0]]
+
+    ratio_sets = [tuple(float(ratio) for ratio in ratios) for ratios in axes[3]]
+    water_grist_ratios = [float(ratio) for ratio in axes[4]]
+    points = product(*(range(len(values)) for values in axes))
+    start = 0
+
+    while True:
+        chunk = list(islice(points, chunk_size))
+        if not chunk:
+            break
+
+        weights = array('d')
+        total_weights = array('d')
+        mash_water_volumes = array('d')
+        partials = _partials(derivatives)
+
+        for (gravity, volume, efficiency, ratios, water_grist_ratio) in chunk:
+            total_gravity_points = gravity_points[gravity][volume]
+            expected_yields = yield_columns[efficiency]
+            ratios = ratio_sets[ratios]
+            line_weights = [round(total_gravity_points * ratio / expected_yield, 3)
+                            for ratio, expected_yield in zip(ratios, expected_yields)]
+            total_weight = round(sum(line_weights), 3)
+            weights.extend(line_weights)
+            total_weights.append(total_weight)
+            mash_water_volumes.append(round(water_grist_ratios[water_grist_ratio] * total_weight, 3))
+
+            if derivatives:
+                # weight = ppg(gravity) * volume * ratio / (max_ppg * efficiency)
+                gallons = axes[1][volume]
+                per_ratio = [total_gravity_points / expected_yield for expected_yield in expected_yields]
+                partials[TARGET_GRAVITY].extend(1000 * gallons * ratio / expected_yield
+                                                for ratio, expected_yield in zip(ratios, expected_yields))
+                partials[VOLUME].extend(ppgs[gravity] * ratio / expected_yield
+                                        for ratio, expected_yield in zip(ratios, expected_yields))
+                partials[EFFICIENCY].extend(-points * ratio / axes[2][efficiency]
+                                            for points, ratio in zip(per_ratio, ratios))
+                partials[RATIO].extend(per_ratio)
+
+        yield SweepResult(grains, axes, start, weights, total_weights, mash_water_volumes, partials)
+        start += len(chunk)
+
+
+def sweep(grains, target_gravities, volumes, efficiencies, ratio_sets, water_grist_ratios=(DEFAULT_WATER_GRIST_RATIO,),
+          derivatives=False):
+    """ Sweeps a fixed set of grains over a grid of recipe inputs in one result.  See sweep_chunks for the details;
+    prefer it for grids too large to hold in memory.
+
+    :return:  A SweepResult for the whole grid.
+    """
+
+    axes = [tuple(values) for values in (target_gravities, volumes, efficiencies, ratio_sets, water_grist_ratios)]
+    size = 1
+    for values in axes:
+        size *= len(values)
+
+    for result in sweep_chunks(grains, *axes, derivatives=derivatives, chunk_size=max(size, 1)):
+        return result
+
+    return SweepResult(tuple(grains), tuple(axes), 0, array('d'), array('d'), array('d'), _partials(derivatives))
@@ -0,0 +1,133 @@
+""" This module contains PyTest unit tests for the 'batch' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import json
+import pytest
+from decimal import Decimal
+from brew_tools import batch, calculator
+
+CSV_RECIPES = '''id,target_gravity,volume,water_grist_ratio,grain_temp,mash_temp,grain,ratio,efficiency
+wit,1.052,5.5,1.25,70,152,American Wheat,0.67,0.68
+wit,,,,,,American Pale (2-Row),0.33,0.68
+bitter,1.040,5,,,,British Maris Otter Pale,1,0.72
+'''
+
+JSONL_RECIPES = '''{"id": "wit", "target_gravity": 1.052, "volume": 5.5, "water_grist_ratio": 1.25, "grain_temp": 70, \
+"mash_temp": 152, "grains": [["American Wheat", 0.67, 0.68], ["American Pale (2-Row)", 0.33, 0.68]]}
+
+{"id": "bitter", "target_gravity": 1.040, "volume": 5, "grains": [["British Maris Otter Pale", 1, 0.72]]}
+'''
+
+
+def test__read_recipes__reads_csv_and_jsonl():
+    csv_recipes = tuple(batch.read_csv_recipes(io.StringIO(CSV_RECIPES)))
+    jsonl_recipes = tuple(batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES)))
+
+    assert csv_recipes == jsonl_recipes
+    assert csv_recipes[0] == batch.BatchRecipe(
+        'wit', 1.052, 5.5, (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68)), 1.25, 70, 152)
+    assert csv_recipes[1].water_grist_ratio is None
+
+
+def test__process_recipes__calculates():
+    recipes = batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES))
+    wit, bitter = batch.process_recipes(recipes, chunk_size=1)
+
+    grain_list = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+    grain_bill = calculator.calc_grain_bill(1.052, 5.5, grain_list)
+    assert wit.grain_bill == grain_bill
+    assert wit.total_weight == calculator.calc_total_grain_weight(
+        (grain, lbs + ounces / 16) for (grain, (lbs, ounces)) in grain_bill)
+    assert wit.mash_water == calculator.calc_mash_water_volume(1.25, wit.total_weight)
+    assert wit.strike_temp == calculator.calc_strike_temp(1.25, 70, 152)
+    assert bitter.mash_water is None
+    assert bitter.strike_temp is None
+
+
+def test__write_results__writes_text_and_json():
+    results = tuple(batch.process_recipes(batch.read_csv_recipes(io.StringIO(CSV_RECIPES))))
+
+    text = io.StringIO()
+    batch.write_text_results(results, text)
+    assert text.getvalue().startswith('Recipe wit\nAmerican Wheat:  ')
+    assert text.getvalue().count('\n\n') == 2
+    assert 'Strike temp:  {} F\n'.format(results[0].strike_temp) in text.getvalue()
+
+    output = io.StringIO()
+    batch.write_json_results(results, output)
+    wit = json.loads(output.getvalue().splitlines()[0])
+    assert wit['id'] == 'wit'
+    assert Decimal(wit['total_weight']) == results[0].total_weight
+    assert wit['grain_bill'][0]['grain'] == 'American Wheat'
+
+
+def test__main__processes_files(tmpdir):
+    source = tmpdir.join('recipes.csv')
+    source.write(CSV_RECIPES)
+    sink = tmpdir.join('results.jsonl')
+
+    assert batch.main([str(source), '-o', str(sink), '--output-format', 'json', '--backend', 'float']) == 0
+
+    results = [json.loads(line) for line in sink.readlines()]
+    assert [result['id'] for result in results] == ['wit', 'bitter']
+    assert isinstance(results[0]['total_weight'], float)
+
+
+def test__process_recipes__skips_errors():
+    recipes = tuple(batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES)))
+    bad = recipes[0]._replace(id='bad', grain_list=(('Unknown Grain', 1, .7),))
+
+    pytest.raises(KeyError, list, batch.process_recipes(recipes + (bad,)))
+
+    wit, bitter, error = batch.process_recipes(recipes + (bad,), skip_errors=True)
+    assert (wit.id, bitter.id) == ('wit', 'bitter')
+    assert error == batch.BatchError('bad', "KeyError: 'Unknown Grain'")
+    assert batch.format_result(error) == ('Recipe bad', "Error:  KeyError: 'Unknown Grain'")
+    assert json.loads(batch.result_to_json(error)) == {'id': 'bad', 'error': "KeyError: 'Unknown Grain'"}
+
+
+def test__read_recipes__skips_errors(tmpdir):
+    jsonl = JSONL_RECIPES + '{"id": "bad json",\n[1, 2]\n{"id": "no volume", "target_gravity": 1.05, "grains": []}\n'
+    pytest.raises(ValueError, list, batch.read_jsonl_recipes(io.StringIO(jsonl)))
+
+    wit, bitter, bad_json, not_object, no_volume = batch.read_jsonl_recipes(io.StringIO(jsonl), skip_errors=True)
+    assert (wit.id, bitter.id) == ('wit', 'bitter')
+    assert bad_json.id == 4 and bad_json.error.startswith('JSONDecodeError')
+    assert not_object == batch.BatchError(5, 'ValueError: A recipe must be a JSON object.')
+    assert no_volume == batch.BatchError('no volume', "KeyError: 'volume'")
+
+    csv_text = CSV_RECIPES + 'empty ratio,1.050,5,,,,American Wheat,,0.7\n'
+    pytest.raises(ValueError, list, batch.read_csv_recipes(io.StringIO(csv_text)))
+    wit, bitter, empty_ratio = batch.read_csv_recipes(io.StringIO(csv_text), skip_errors=True)
+    assert empty_ratio.id == 'empty ratio' and empty_ratio.error.startswith('ValueError')
+
+    results = list(batch.process_recipes(batch.read_csv_recipes(io.StringIO(csv_text), skip_errors=True)))
+    assert [type(result) for result in results] == [batch.BatchResult, batch.BatchResult, batch.BatchError]
+
+    source = tmpdir.join('recipes.csv')
+    source.write(csv_text)
+    sink = tmpdir.join('results.jsonl')
+    pytest.raises(ValueError, batch.main, [str(source), '-o', str(sink)])
+    assert batch.main([str(source), '-o', str(sink), '--output-format', 'json', '--skip-errors']) == 0
+    assert json.loads(sink.readlines()[-1])['id'] == 'empty ratio'
@@ -0,0 +1,109 @@
+""" This module contains PyTest unit tests for the 'cache' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+from decimal import Decimal
+from brew_tools import cache, calculator, grains
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(cache, '_cache', cache.LRUCache())
+
+
+def test__lru_cache__evicts_least_recently_used():
+    lru = cache.LRUCache(2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+    assert lru.stats() == {'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2, 'maxsize': 2}
+
+    lru.resize(1)
+    assert len(lru) == 1
+    assert lru.stats()['evictions'] == 2
+    pytest.raises(ValueError, cache.LRUCache, 0)
+    pytest.raises(ValueError, lru.resize, 0)
+
+
+def test__normalize__normalizes():
+    assert cache.normalize([('Grain', .67, .68)]) == cache.normalize((['Grain', .67, .68],))
+    assert cache.normalize(.1 + .2) == cache.normalize(.3)
+    assert cache.normalize(1) == cache.normalize(1.0)
+    assert cache.normalize(Decimal('1.5')) != cache.normalize(1.5)
+    assert cache.normalize(Decimal('1.5')) != cache.normalize(Decimal('1.50'))
+    assert cache.normalize(Decimal('1.5')) == cache.normalize(Decimal('1.5'))
+
+
+def test__calc_grain_bill__caches():
+    grain_list = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+    expected = calculator.calc_grain_bill(1.052, 5.5, grain_list)
+
+    assert cache.calc_grain_bill(1.052, 5.5, grain_list) == expected
+    assert cache.calc_grain_bill(1.052, 5.5, [list(line) for line in grain_list]) == expected
+    assert cache.calc_grain_bill(1.052, 2.75 * 2, grain_list) == expected
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': cache.DEFAULT_MAXSIZE}
+
+    with calculator.backend(calculator.FLOAT):
+        assert isinstance(cache.calc_grain_bill(1.052, 5.5, grain_list)[0][1][1], float)
+
+
+def test__calc_grain_bill__keys_decimals_apart_from_floats():
+    grain_list = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+
+    for target_gravity in (1.0505, Decimal('1.0505'), 1.0505, Decimal('1.0505')):
+        assert cache.calc_grain_bill(target_gravity, 5, grain_list) == \
+            calculator.calc_grain_bill(target_gravity, 5, grain_list)
+
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+
+
+def test__calc_grain_bill__invalidates(monkeypatch):
+    grain_list = (('Grain A', 1, 1),)
+    monkeypatch.setattr(grains, 'max_gravities', {'Grain A': 1.040})
+    assert cache.calc_grain_bill(1.040, 5, grain_list) == (('Grain A', (5, Decimal('0.0'))),)
+
+    grains.max_gravities['Grain A'] = 1.050
+    cache.invalidate()
+    assert cache.calc_grain_bill(1.040, 5, grain_list) == (('Grain A', (4, Decimal('0.0'))),)
+
+    monkeypatch.setattr(grains, 'max_gravities', {'Grain A': 1.040})
+    assert cache.calc_grain_bill(1.040, 5, grain_list) == (('Grain A', (5, Decimal('0.0'))),)
+
+
+def test__calc_strike_temp_and_infusion_volume__cache():
+    assert cache.calc_strike_temp(1, 70, 104) == Decimal('110.8')
+    assert cache.calc_strike_temp(1.0, 70, 104) == Decimal('110.8')
+    assert cache.calc_infusion_volume(104, 140, 210, 8, 8) == Decimal('4.937')
+    assert cache.calc_infusion_volume(104, 140, 210, 8, 8) == Decimal('4.937')
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+
+    cache.set_maxsize(1)
+    assert cache.stats()['size'] == 1
+    assert cache.stats()['evictions'] == 1
@@ -21,9 +21,10 @@
     along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
 """
 
+import pickle
 import pytest
 from decimal import Decimal
-from brew_tools import calculator
+from brew_tools import calculator, grains
 
 
 def test__to_decimal__converts():
@@ -76,6 +77,47 @@ def test__calc_grain_qty__calculates():
     assert calculator.calc_grain_qty(200, 1, 35) == Decimal ('5.714')
 
 
+def test__fermentable_table__builds_lazily():
+    catalog = {'Grain A': 1.037, 'Grain B': 1.025, 'Grain C': 1.030}
+    table = calculator.FermentableTable(catalog)
+
+    assert len(table) == 3
+    assert table.names == []
+    assert table.expected_yield('Grain B', .7) == Decimal('17.5')
+    assert table.grain_id('Grain A') == 1
+    assert table.grain_id('Grain B') == 0
+    assert table.names == ['Grain B', 'Grain A']
+    assert table.ids == {'Grain B': 0, 'Grain A': 1}
+    assert list(table.gravities) == [1.025, 1.037]
+    assert list(table.ppgs) == [25, 37]
+    pytest.raises(KeyError, table.expected_yield, 'Grain D', .7)
+
+    # only the grain and efficiency asked for are calculated
+    assert table._expected_yields == [{(calculator.DECIMAL, .7): Decimal('17.5')}, {}]
+
+    catalog['Grain B'] = 1.030
+    assert table.expected_yield('Grain B', .7) == Decimal('21.0')
+    assert table.ppgs[0] == 30
+
+
+def test__get_fermentable_table__follows_grains(monkeypatch):
+    table = calculator.get_fermentable_table()
+    assert table.source is grains.max_gravities
+    assert calculator.get_fermentable_table() is table
+
+    monkeypatch.setattr(grains, 'max_gravities', {'Grain A': 1.040})
+    assert calculator.calc_grain_bill(1.040, 5, (('Grain A', 1, 1),)) == (('Grain A', (5, Decimal('0.0'))),)
+
+    # in-place edits are picked up without resetting the table
+    grains.max_gravities['Grain A'] = 1.050
+    assert calculator.calc_grain_bill(1.040, 5, (('Grain A', 1, 1),)) == (('Grain A', (4, Decimal('0.0'))),)
+    grain_bill, = calculator.calc_grain_bills((1.040,), (5,), ((('Grain A', 1, 1),),))
+    assert grain_bill == (('Grain A', (4, Decimal('0.0'))),)
+
+    monkeypatch.undo()
+    assert calculator.get_fermentable_table().source is grains.max_gravities
+
+
 def test__calc_grain_bill__calculates():
 
     grain_recipe = (
@@ -89,6 +131,78 @@ def test__calc_grain_bill__calculates():
     assert grain_bill == (('American Wheat', wheat_weight), ('American Pale (2-Row)', pale_weight))
 
 
+def test__calc_grain_bills__matches_calc_grain_bill():
+    target_gravities = (1.052, 1.048, 1.052, 1.075)
+    volumes = (5.5, 5, 5.5, 10.25)
+    grain_lists = (
+        (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68)),
+        (('British Maris Otter Pale', .9, .72), ('British Crystal', .1, .65)),
+        (('American Wheat', .5, .7), ('American Pale (2-Row)', .5, .75)),
+        (('Belgian Pilsen', .85, .74), ('German Light Munich', .1, .74), ('Corn Sugar', .05, 1)),
+    )
+
+    grain_bills = calculator.calc_grain_bills(target_gravities, volumes, grain_lists)
+
+    assert grain_bills == tuple(
+        calculator.calc_grain_bill(target_gravity, volume, grain_list)
+        for target_gravity, volume, grain_list in zip(target_gravities, volumes, grain_lists))
+
+
+def test__calc_grain_bills__raises_errors():
+    pytest.raises(ValueError, calculator.calc_grain_bills, (1.050, 1.060), (5,), ((), ()))
+    pytest.raises(KeyError, calculator.calc_grain_bills, (1.050,), (5,), ((('Unknown Grain', 1, .7),),))
+
+
+def test__grain_bill__behaves_like_tuples():
+    grain_recipe = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68), ('American Wheat', .1, .5))
+    grain_bill = calculator.calc_grain_bill(1.052, 5.5, grain_recipe)
+    lines = tuple((grain, calculator.convert_lbs_to_lbs_ounces(calculator.calc_grain_qty(
+        calculator.calc_total_gravity_points(1.052, 5.5), ratio, calculator.calc_expected_yield(ppg, efficiency))))
+        for ((grain, ratio, efficiency), ppg) in zip(grain_recipe, (38, 37, 38)))
+
+    assert isinstance(grain_bill, calculator.GrainBill)
+    assert grain_bill == lines
+    assert lines == grain_bill
+    assert tuple(grain_bill) == lines
+    assert grain_bill[-1] == lines[-1]
+    assert grain_bill[1:] == lines[1:]
+    assert hash(grain_bill) == hash(lines)
+    assert len(grain_bill) == 3
+    pytest.raises(IndexError, grain_bill.__getitem__, 3)
+
+    grain, (lbs, ounces) = grain_bill[0]
+    assert (grain, lbs, ounces) == (grain_bill[0].grain, grain_bill[0].lbs, grain_bill[0].ounces)
+    assert grain_bill[0].grain_id == grain_bill[2].grain_id == calculator.get_fermentable_table().ids['American Wheat']
+    assert list(grain_bill.pounds) == [line[1][0] for line in lines]
+    assert list(grain_bill.tenths) == [int(line[1][1] * 10) for line in lines]
+    assert pickle.loads(pickle.dumps(grain_bill)) == grain_bill
+
+
+def test__grain_bill__calculates():
+    table = calculator.FermentableTable({'Grain A': 1.037, 'Grain B': 1.025})
+    grain_bill = calculator.GrainBill.from_lines(
+        table, (('Grain A', (8, Decimal('8.0'))), ('Grain B', (1, Decimal('8.0'))), ('Grain A', (0, Decimal('0.3')))))
+
+    assert grain_bill.total_weight() == calculator.calc_total_grain_weight(
+        (('Grain A', 8.5), ('Grain B', 1.5), ('Grain A', Decimal('0.3') / 16)))
+    assert calculator.calc_total_grain_weight(grain_bill) == Decimal('10.019')
+    assert grain_bill.percentages() == (Decimal('84.8'), Decimal('15.0'), Decimal('0.2'))
+    assert grain_bill.weights(calculator.OUNCES) == (Decimal('136.000'), Decimal('24.000'), Decimal('0.300'))
+    assert grain_bill.weights(calculator.KILOGRAMS) == (Decimal('3.856'), Decimal('0.680'), Decimal('0.009'))
+    assert grain_bill.weights(calculator.GRAMS)[0] == Decimal('3855.535')
+    pytest.raises(ValueError, grain_bill.weights, 'stone')
+
+    with calculator.backend(calculator.FLOAT):
+        assert grain_bill.total_weight() == 10.019
+        assert grain_bill.percentages()[0] == 84.8
+
+    empty = calculator.GrainBill(table.names, (), (), ())
+    assert empty == ()
+    assert empty.total_weight() == 0
+    assert empty.percentages() == ()
+    pytest.raises(ValueError, calculator.GrainBill, table.names, (0,), (), ())
+
+
 def test__calc_total_grain_weight__calculates():
     grain_bill = (('grain1', 1.1), ('grain2', 2.2), ('grain3', 3.3))
     assert calculator.calc_total_grain_weight(grain_bill) == Decimal('6.6')
@@ -100,6 +214,9 @@ def test__calc_total_grain_weight__calculates():
 def test__calc_mash_water_volume__calculates():
     assert calculator.calc_mash_water_volume(1.25, 7.75) == Decimal('9.688')
     assert calculator.calc_mash_water_volume(1.5, 8) == Decimal('12')
+    assert calculator.calc_mash_water_volume(1.25, Decimal('7.750')) == Decimal('9.688')
+    assert calculator.calc_mash_water_volume(1.57, 98.85) == Decimal('155.195')
+    assert calculator.calc_mash_water_volume(Decimal('1.57'), 98.85) == Decimal('155.195')
 
 
 def test__calc_strike_temp__calculates():
@@ -0,0 +1,181 @@
+""" This module contains PyTest differential tests comparing the 'calculator' module's float and Decimal backends.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import random
+import threading
+from decimal import Decimal
+import pytest
+from brew_tools import calculator, grains
+
+# The stated tolerance of the float backend:  every rounded result is within one unit of its last decimal place of the
+# Decimal backend's result, and a grain bill line's total weight (lbs + oz / 16) is within 0.01 lbs.
+TOLERANCE = Decimal('0.001')
+OUNCES_TOLERANCE = Decimal('0.1')
+GRAIN_BILL_TOLERANCE = Decimal('0.01')
+SAMPLES = 500
+
+GRAIN_NAMES = sorted(name for (name, gravity) in grains.max_gravities.items() if gravity > 1)
+
+
+def _gravity(rng):
+    return round(rng.uniform(1.020, 1.120), 3)
+
+
+def _grain_list(rng):
+    ratios = [rng.uniform(.05, 1) for _ in range(rng.randint(1, 6))]
+    return tuple((rng.choice(GRAIN_NAMES), ratio / sum(ratios), round(rng.uniform(.55, .85), 2)) for ratio in ratios)
+
+
+def _grain_bill_weight(lbs_ounces):
+    lbs, ounces = lbs_ounces
+    return lbs + Decimal(str(ounces)) / 16
+
+
+def _compare(function, args_factory, tolerance=TOLERANCE):
+    rng = random.Random(function.__name__)
+    for _ in range(SAMPLES):
+        args = args_factory(rng)
+        exact = function(*args)
+        with calculator.backend(calculator.FLOAT):
+            fast = function(*args)
+
+        assert isinstance(fast, float), (function.__name__, args)
+        assert abs(exact - Decimal(str(fast))) <= tolerance, (function.__name__, args, exact, fast)
+
+
+def test__backend__selects():
+    assert calculator.get_backend() == calculator.DECIMAL
+    assert isinstance(calculator.calc_expected_yield(35, .7), Decimal)
+    assert calculator.to_number(1.5) == Decimal('1.5')
+    assert calculator.to_number(1.2345, 2) == Decimal('1.23')
+
+    with calculator.backend(calculator.FLOAT):
+        assert calculator.get_backend() == calculator.FLOAT
+        assert calculator.calc_expected_yield(35, .7) == 24.5
+        assert isinstance(calculator.to_decimal(1.5), Decimal)
+        assert calculator.to_number(Decimal('1.5')) == 1.5
+        assert isinstance(calculator.to_number(1), float)
+        assert calculator.to_number(Decimal('1.2345'), 2) == 1.23
+
+    assert calculator.get_backend() == calculator.DECIMAL
+
+    calculator.set_backend(calculator.FLOAT)
+    try:
+        assert calculator.get_backend() == calculator.FLOAT
+        with calculator.backend(calculator.DECIMAL):
+            assert calculator.get_backend() == calculator.DECIMAL
+    finally:
+        calculator.set_backend(calculator.DECIMAL)
+
+
+def test__backend__is_local_to_context():
+    seen = []
+    with calculator.backend(calculator.FLOAT):
+        thread = threading.Thread(target=lambda: seen.append(calculator.get_backend()))
+        thread.start()
+        thread.join()
+
+    assert seen == [calculator.DECIMAL]
+
+
+def test__backend__raises_errors():
+    pytest.raises(ValueError, calculator.set_backend, 'numpy')
+    with pytest.raises(ValueError):
+        with calculator.backend('numpy'):
+            pass
+
+    with calculator.backend(calculator.FLOAT):
+        pytest.raises(TypeError, calculator.calc_total_gravity_points, 'hello', 1)
+        pytest.raises(TypeError, calculator.to_number, '1.5')
+
+
+def test__convert_sg_to_ppg__backends_agree():
+    rng = random.Random('convert_sg_to_ppg')
+    for _ in range(SAMPLES):
+        gravity = rng.uniform(1.000, 1.150)
+        with calculator.backend(calculator.FLOAT):
+            fast = calculator.convert_sg_to_ppg(gravity)
+        assert calculator.convert_sg_to_ppg(gravity) == fast, gravity
+
+
+def test__convert_lbs_to_lbs_ounces__backends_agree():
+    rng = random.Random('convert_lbs_to_lbs_ounces')
+    for _ in range(SAMPLES):
+        lbs = round(rng.uniform(0, 50), 3)
+        exact_lbs, exact_ounces = calculator.convert_lbs_to_lbs_ounces(lbs)
+        with calculator.backend(calculator.FLOAT):
+            fast_lbs, fast_ounces = calculator.convert_lbs_to_lbs_ounces(lbs)
+
+        assert exact_lbs == fast_lbs
+        assert abs(exact_ounces - Decimal(str(fast_ounces))) <= OUNCES_TOLERANCE
+
+
+def test__calc_total_gravity_points__backends_agree():
+    _compare(calculator.calc_total_gravity_points, lambda rng: (_gravity(rng), round(rng.uniform(1, 50), 2)))
+
+
+def test__calc_expected_yield__backends_agree():
+    _compare(calculator.calc_expected_yield, lambda rng: (rng.randint(20, 46), round(rng.uniform(.5, 1), 2)))
+
+
+def test__calc_grain_qty__backends_agree():
+    _compare(calculator.calc_grain_qty,
+             lambda rng: (rng.randint(20, 5000), rng.uniform(0, 1), round(rng.uniform(10, 46), 3)))
+
+
+def test__calc_grain_bill__backends_agree():
+    rng = random.Random('calc_grain_bill')
+    recipes = [(_gravity(rng), round(rng.uniform(1, 50), 2), _grain_list(rng)) for _ in range(SAMPLES)]
+
+    exact = [calculator.calc_grain_bill(*recipe) for recipe in recipes]
+    with calculator.backend(calculator.FLOAT):
+        fast = [calculator.calc_grain_bill(*recipe) for recipe in recipes]
+        fast_batch = calculator.calc_grain_bills(*zip(*recipes))
+
+    assert tuple(fast) == fast_batch
+    for (exact_bill, fast_bill) in zip(exact, fast):
+        for ((exact_grain, exact_weight), (fast_grain, fast_weight)) in zip(exact_bill, fast_bill):
+            assert exact_grain == fast_grain
+            assert isinstance(fast_weight[1], float)
+            assert abs(_grain_bill_weight(exact_weight) - _grain_bill_weight(fast_weight)) <= GRAIN_BILL_TOLERANCE
+
+
+def test__calc_total_grain_weight__backends_agree():
+    _compare(calculator.calc_total_grain_weight,
+             lambda rng: (tuple(('grain', round(rng.uniform(0, 20), 4)) for _ in range(rng.randint(1, 8))),))
+
+
+def test__calc_mash_water_volume__backends_agree():
+    _compare(calculator.calc_mash_water_volume,
+             lambda rng: (round(rng.uniform(1, 2.5), 2), round(rng.uniform(1, 100), 3)))
+
+
+def test__calc_strike_temp__backends_agree():
+    _compare(calculator.calc_strike_temp,
+             lambda rng: (round(rng.uniform(1, 2.5), 2), rng.randint(40, 80), rng.randint(120, 160)))
+
+
+def test__calc_infusion_volume__backends_agree():
+    _compare(calculator.calc_infusion_volume,
+             lambda rng: (rng.randint(100, 150), rng.randint(150, 170), rng.randint(180, 212),
+                          round(rng.uniform(5, 40), 1), round(rng.uniform(5, 30), 1)))
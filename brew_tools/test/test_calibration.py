@@ -0,0 +1,138 @@
+""" This module contains PyTest unit tests for the 'calibration' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import json
+import random
+import pytest
+from brew_tools import calculator, calibration
+
+GRAIN_EFFICIENCIES = {'American Wheat': 0.78, 'American Pale (2-Row)': 0.72, 'Belgian Pilsen': 0.65}
+# the systems take turns, so these offsets sum to zero weighted by brew count, as the fitted offsets do
+SYSTEM_OFFSETS = {'5 gallon': 0.05, '10 gallon': -0.05}
+
+
+def _logs(count, seed=7, systems=sorted(SYSTEM_OFFSETS)):
+    generator = random.Random(seed)
+    table = calculator.get_fermentable_table()
+    grains = sorted(GRAIN_EFFICIENCIES)
+    for index in range(count):
+        system = systems[index % len(systems)]
+        grain_bill = [(grain, round(generator.uniform(0.5, 8), 2)) for grain in generator.sample(grains, 2)]
+        offset = SYSTEM_OFFSETS.get(system, 0.0)
+        points = sum(pounds * table.ppgs[table.grain_id(grain)] * (GRAIN_EFFICIENCIES[grain] + offset)
+                     for (grain, pounds) in grain_bill)
+        volume = generator.choice((5, 5.5, 10))
+        yield calibration.BrewLog(tuple(grain_bill), volume, 1 + points / volume / 1000, system)
+
+
+def test__efficiency_calibration__fits_logs():
+    calibrated = calibration.EfficiencyCalibration(regularization=1e-6)
+    assert calibrated.update(_logs(300)) == 300
+
+    efficiencies = calibrated.solve()
+    assert efficiencies.count == 300
+    assert efficiencies.rms_error == pytest.approx(0, abs=1e-3)
+    for grain, efficiency in GRAIN_EFFICIENCIES.items():
+        for system, offset in SYSTEM_OFFSETS.items():
+            assert efficiencies.efficiency(grain, system) == pytest.approx(efficiency + offset, abs=0.002)
+
+    grain_list = efficiencies.grain_list([('American Wheat', 0.6), ('British Maris Otter Pale', 0.4)], '10 gallon')
+    assert grain_list[0] == ('American Wheat', 0.6, 0.73)
+    assert grain_list[1][2] == round(0.7 + efficiencies.systems['10 gallon'], 3)
+    assert len(calculator.calc_grain_bill(1.052, 5.5, grain_list)) == 2
+
+
+def test__efficiency_calibration__separates_grains_from_systems():
+    for regularization in (calibration.DEFAULT_REGULARIZATION, 1e-6):
+        efficiencies = calibration.EfficiencyCalibration(regularization=regularization)
+        efficiencies.update(_logs(300))
+        efficiencies = efficiencies.solve()
+
+        for grain, efficiency in GRAIN_EFFICIENCIES.items():
+            assert efficiencies.grains[grain] == pytest.approx(efficiency, abs=0.002)
+        for system, offset in SYSTEM_OFFSETS.items():
+            assert efficiencies.systems[system] == pytest.approx(offset, abs=0.002)
+
+    # brews without a system are the reference, so the offsets are not constrained
+    with_reference = calibration.EfficiencyCalibration()
+    with_reference.update(_logs(300, systems=[None, '5 gallon']))
+    efficiencies = with_reference.solve()
+    assert efficiencies.grains['American Wheat'] == pytest.approx(0.78, abs=0.002)
+    assert efficiencies.systems['5 gallon'] == pytest.approx(0.05, abs=0.002)
+
+    mixed = calibration.EfficiencyCalibration()
+    mixed.update(log._replace(system=5 if log.system == '5 gallon' else log.system) for log in _logs(10))
+    assert mixed.solve().efficiency('American Wheat', 5) == mixed.solve().efficiency('American Wheat', '5')
+
+
+def test__efficiency_calibration__updates_and_merges():
+    logs = list(_logs(100))
+    whole = calibration.EfficiencyCalibration()
+    whole.update(logs)
+
+    saved = json.loads(json.dumps(calibration.EfficiencyCalibration().to_dict()))
+    nightly = calibration.EfficiencyCalibration.from_dict(saved)
+    nightly.update(logs[:60])
+    nightly = calibration.EfficiencyCalibration.from_dict(json.loads(json.dumps(nightly.to_dict())))
+    nightly.update(logs[60:])
+
+    merged = calibration.EfficiencyCalibration()
+    merged.update(logs[:30])
+    other = calibration.EfficiencyCalibration()
+    other.update(logs[30:])
+    merged.merge(other)
+
+    for calibrated in (nightly, merged):
+        assert calibrated.count == 100
+        solved = calibrated.solve()
+        for grain, efficiency in whole.solve().grains.items():
+            assert solved.grains[grain] == pytest.approx(efficiency)
+
+
+def test__read_jsonl_logs__reads():
+    lines = io.StringIO('{"grains": [["American Wheat", 6.25], ["Belgian Pilsen", [3, 2.5]]], "volume": 5.5, '
+                        '"measured_gravity": 1.051, "system": "5 gallon"}\n\n'
+                        '{"grains": [["American Wheat", 10]], "volume": 5, "measured_gravity": 1.05}\n')
+    first, second = calibration.read_jsonl_logs(lines)
+
+    assert first == ((('American Wheat', 6.25), ('Belgian Pilsen', (3, 2.5))), 5.5, 1.051, '5 gallon')
+    assert second.system is None
+
+    calibrated = calibration.EfficiencyCalibration()
+    calibrated.update([first, second])
+    assert calibrated.solve().efficiency('Belgian Pilsen', 'unknown system') > 0
+
+
+def test__efficiency_calibration__raises_errors():
+    with pytest.raises(ValueError):
+        calibration.EfficiencyCalibration(regularization=0)
+
+    with pytest.raises(KeyError):
+        calibration.EfficiencyCalibration().add(calibration.BrewLog((('Not A Grain', 5),), 5, 1.05, None))
+
+    with pytest.raises(ValueError):
+        calibration.EfficiencyCalibration().add(calibration.BrewLog((('American Wheat', 0),), 5, 1.05, None))
+
+    empty = calibration.EfficiencyCalibration().solve()
+    assert empty.count == 0 and empty.efficiency('American Wheat') == 0.7
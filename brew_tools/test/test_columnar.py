@@ -0,0 +1,115 @@
+""" This module contains PyTest unit tests for the 'columnar' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import pytest
+from brew_tools import batch, calculator, columnar
+from brew_tools.test.test_batch import JSONL_RECIPES
+
+
+def _results():
+    recipes = tuple(batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES)))
+    bad = recipes[0]._replace(id='bad', grain_list=(('Unknown Grain', 1, .7),))
+    return list(batch.process_recipes(recipes + (bad,), skip_errors=True))
+
+
+def test__write_columnar_results__round_trips(tmpdir):
+    path = str(tmpdir.join('results' + columnar.EXTENSION))
+    results = _results()
+    assert columnar.write_columnar_results(results, path) == 3
+
+    with columnar.read_columnar_results(path) as columns:
+        assert len(columns) == 3 and columns.line_count == 3
+        assert list(columns.results()) == results
+        assert columns.recipe_id(1) == 'bitter'
+        assert columns.error(0) is None and columns.error(2) == "KeyError: 'Unknown Grain'"
+
+        wit = results[0]
+        assert columns.total_weights[0] == int(wit.total_weight * 1000)
+        assert columns.mash_water_volumes[1] == columnar.MISSING
+        assert list(columns.line_offsets) == [0, 2, 3, 3]
+        assert list(columns.line_recipes) == [0, 0, 1]
+        assert [columns.grain_names[grain_id] for grain_id in columns.line_grain_ids] == [
+            grain for result in results[:2] for (grain, _) in result.grain_bill]
+        assert list(columns.line_tenths) == list(wit.grain_bill.tenths) + list(results[1].grain_bill.tenths)
+
+
+def test__columnar_writer__streams_float_results(tmpdir, monkeypatch):
+    monkeypatch.setattr(columnar, '_FLUSH_SIZE', 2)
+    path = str(tmpdir.join('results.btbr'))
+    with calculator.backend(calculator.FLOAT):
+        results = _results()[:2] * 5
+
+    with columnar.ColumnarWriter(path) as writer:
+        for result in results:
+            writer.write(result._replace(grain_bill=tuple(result.grain_bill)))
+
+    with columnar.ResultColumns(path) as columns:
+        assert len(columns) == 10 and columns.line_count == 15
+        for result, reloaded in zip(results, columns.results()):
+            assert reloaded.grain_bill == calculator.GrainBill.from_lines(
+                calculator.get_fermentable_table(), ((grain, (lbs, calculator.to_number(ounces, 1)))
+                                                     for (grain, (lbs, ounces)) in result.grain_bill))
+            assert float(reloaded.total_weight) == result.total_weight
+
+
+def test__result_columns__raises_errors(tmpdir):
+    path = tmpdir.join('results.btbr')
+    path.write_binary(b'not a results file')
+    pytest.raises(ValueError, columnar.ResultColumns, str(path))
+
+    assert batch.main([str(tmpdir.join('missing.jsonl')), '--output-format', 'columnar']) == 2
+
+    source = tmpdir.join('recipes.jsonl')
+    source.write(JSONL_RECIPES)
+    assert batch.main([str(source), '-o', str(path), '--output-format', 'columnar']) == 0
+    with columnar.ResultColumns(str(path)) as columns:
+        assert [result.id for result in columns.results()] == ['wit', 'bitter']
+
+    with pytest.raises(KeyError):
+        with columnar.ResultColumns(str(path)) as columns:
+            raise KeyError('Unknown Grain')
+    assert columns._map.closed
+
+    path.write_binary(path.read_binary()[:100])
+    pytest.raises(ValueError, columnar.ResultColumns, str(path))
+
+
+def test__columnar_writer__discards_failed_runs(tmpdir):
+    path = tmpdir.join('results.btbr')
+    results = _results()
+    columnar.write_columnar_results(results, str(path))
+    written = path.read_binary()
+
+    def failing_results():
+        yield results[0]
+        raise KeyError('Unknown Grain')
+
+    pytest.raises(KeyError, columnar.write_columnar_results, failing_results(), str(path))
+    assert path.read_binary() == written
+    assert tmpdir.listdir() == [path]
+
+    with columnar.ColumnarWriter(str(tmpdir.join('discarded.btbr'))) as writer:
+        writer.write(results[0])
+        writer.discard()
+    assert tmpdir.listdir() == [path]
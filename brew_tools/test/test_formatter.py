@@ -21,6 +21,10 @@
     along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
 """
 
+import csv
+import io
+import json
+import pytest
 from decimal import Decimal
 from brew_tools import formatter
 
@@ -42,3 +46,60 @@ def test__format_grain_bill__formats():
         (('American Wheat', (7, Decimal('6.7'))), ('American Pale (2-Row)', (3, Decimal('12.0')))))
 
     assert formatted_grain_bill == ('American Wheat:  7 lbs, 6.7 oz', 'American Pale (2-Row):  3 lbs, 12.0 oz')
+
+
+GRAIN_BILLS = (
+    (('American Wheat', (7, Decimal('6.7'))), ('American Pale (2-Row)', (3, Decimal('12.0')))),
+    (('Crystal | 60L', (0, Decimal('8.0'))),),
+)
+
+
+def test__write_grain_bills__writes_text():
+    stream = io.StringIO()
+    formatter.write_grain_bills(iter(GRAIN_BILLS), stream)
+
+    assert stream.getvalue() == ('American Wheat:  7 lbs, 6.7 oz\nAmerican Pale (2-Row):  3 lbs, 12.0 oz\n\n'
+                                 'Crystal | 60L:  0 lbs, 8.0 oz\n\n')
+
+    stream = io.StringIO()
+    formatter.write_grain_bills(GRAIN_BILLS, stream, formatter.TEXT, ('wit', 'bitter'))
+    assert stream.getvalue().startswith('Recipe wit\nAmerican Wheat:  7 lbs, 6.7 oz\n')
+
+
+def test__write_grain_bills__writes_csv():
+    stream = io.StringIO()
+    formatter.write_grain_bills(GRAIN_BILLS, stream, formatter.CSV)
+
+    assert list(csv.reader(io.StringIO(stream.getvalue()))) == [
+        ['recipe', 'grain', 'lbs', 'oz'],
+        ['1', 'American Wheat', '7', '6.7'],
+        ['1', 'American Pale (2-Row)', '3', '12.0'],
+        ['2', 'Crystal | 60L', '0', '8.0']]
+
+
+def test__write_grain_bills__writes_json_to_binary_stream():
+    stream = io.BytesIO()
+    formatter.write_grain_bills(GRAIN_BILLS, stream, formatter.JSON, ('wit', 'bitter'))
+
+    assert not stream.closed
+    report = json.loads(stream.getvalue().decode('utf-8'), parse_float=Decimal)
+    assert report[0] == {'recipe': 'wit', 'grain_bill': [
+        {'grain': 'American Wheat', 'lbs': 7, 'oz': Decimal('6.7')},
+        {'grain': 'American Pale (2-Row)', 'lbs': 3, 'oz': Decimal('12.0')}]}
+    assert report[1]['recipe'] == 'bitter'
+
+    stream = io.StringIO()
+    formatter.write_grain_bills((), stream, formatter.JSON)
+    assert json.loads(stream.getvalue()) == []
+
+
+def test__write_grain_bills__writes_markdown():
+    stream = io.StringIO()
+    formatter.write_grain_bill(GRAIN_BILLS[1], stream, formatter.MARKDOWN)
+
+    assert stream.getvalue() == ('| Recipe | Grain | Lbs | Oz |\n| --- | --- | ---: | ---: |\n'
+                                 '| 1 | Crystal \\| 60L | 0 | 8.0 |\n')
+
+
+def test__write_grain_bills__raises_errors():
+    pytest.raises(ValueError, formatter.write_grain_bills, GRAIN_BILLS, io.StringIO(), 'xml')
@@ -0,0 +1,139 @@
+""" This module contains PyTest unit tests for the 'grains' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+from decimal import Decimal
+from brew_tools import calculator, grains
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def restore_catalog():
+    catalog = grains.max_gravities
+    yield
+    grains.set_catalog(catalog)
+
+
+def _run(script, **environment):
+    return subprocess.check_output([sys.executable, '-c', script], env=dict(os.environ, **environment),
+                                   cwd=PACKAGE_ROOT).decode('utf-8').strip()
+
+
+def test__max_gravities__loads_lazily():
+    assert _run('from brew_tools import grains; print("max_gravities" in vars(grains))') == 'False'
+    assert len(grains.max_gravities) == 106
+    assert grains.max_gravities['American Pale (2-Row)'] == 1.037
+    assert grains.max_gravities['British Caramalt'] == 0
+
+
+def test__read_catalog__reads_and_writes_csv(tmpdir):
+    path = str(tmpdir.join('supplier.csv'))
+    grains.write_catalog({'Supplier Pils': 1.0375, 'Supplier, Munich': 1.036}, path)
+
+    assert grains.read_catalog(path) == {'Supplier Pils': 1.0375, 'Supplier, Munich': 1.036}
+
+
+def test__mapped_catalog__reads_binary(tmpdir):
+    path = str(tmpdir.join('catalog' + grains.BINARY_EXTENSION))
+    catalog = dict(grains.max_gravities, **{'Malterie Château Pilsen': 1.037})
+    grains.write_catalog(catalog, path)
+
+    mapped = grains.read_catalog(path)
+    assert isinstance(mapped, grains.MappedCatalog)
+    assert len(mapped) == len(catalog)
+    assert dict(mapped) == catalog
+    assert mapped['Malterie Château Pilsen'] == 1.037
+    assert 'Unknown Grain' not in mapped
+    assert mapped.get(42) is None
+    pytest.raises(KeyError, mapped.__getitem__, 'Unknown Grain')
+
+    empty_path = str(tmpdir.join('empty' + grains.BINARY_EXTENSION))
+    grains.write_catalog({}, empty_path)
+    assert len(grains.read_catalog(empty_path)) == 0
+
+    bad_path = str(tmpdir.join('bad' + grains.BINARY_EXTENSION))
+    with open(bad_path, 'wb') as bad_file:
+        bad_file.write(b'name,max_gravity\n')
+    pytest.raises(ValueError, grains.MappedCatalog, bad_path)
+
+
+def test__merge_catalogs__merges(tmpdir, restore_catalog):
+    path = str(tmpdir.join('supplier.csv'))
+    grains.write_catalog({'Supplier Pils': 1.040}, path)
+
+    merged = grains.merge_catalogs(path, {'American Wheat': 1.040})
+
+    assert grains.max_gravities is merged
+    assert isinstance(merged, grains.LayeredCatalog)
+    assert merged['Supplier Pils'] == 1.040
+    assert merged['American Wheat'] == 1.040
+    assert merged['American Pale (2-Row)'] == 1.037
+    assert calculator.calc_grain_bill(1.040, 5, (('Supplier Pils', 1, 1),)) == (('Supplier Pils', (5, Decimal('0.0'))),)
+
+
+def test__merge_catalogs__keeps_mapped_catalogs_mapped(tmpdir, restore_catalog):
+    path = str(tmpdir.join('catalog' + grains.BINARY_EXTENSION))
+    grains.write_catalog({'Supplier Pils': 1.040, 'American Wheat': 1.041}, path)
+    base = grains.max_gravities
+
+    merged = grains.merge_catalogs(path)
+    assert merged.layers[0] is base
+    assert isinstance(merged.layers[1], grains.MappedCatalog)
+    assert len(merged) == len(base) + 1
+    assert merged['American Wheat'] == 1.041
+
+    merged['Supplier Pils'] = 1.039
+    del merged['American Wheat']
+    del merged['American Pale (2-Row)']
+    assert merged.overlay == {'Supplier Pils': 1.039}
+    assert merged['Supplier Pils'] == 1.039
+    assert 'American Wheat' not in merged
+    assert 'American Pale (2-Row)' not in merged
+    assert len(merged) == len(base) - 1
+    assert base['American Pale (2-Row)'] == 1.037
+    assert merged.layers[1]['American Wheat'] == 1.041
+    pytest.raises(KeyError, merged.__delitem__, 'American Wheat')
+
+    merged['American Wheat'] = 1.042
+    assert merged['American Wheat'] == 1.042
+    assert calculator.calc_grain_bill(1.039, 5, (('Supplier Pils', 1, 1),)) == (('Supplier Pils', (5, Decimal('0.0'))),)
+
+
+def test__set_catalog__uses_mapped_catalog(tmpdir, restore_catalog):
+    path = str(tmpdir.join('catalog' + grains.BINARY_EXTENSION))
+    grains.write_catalog({'Grain A': 1.040}, path)
+    grains.set_catalog(grains.read_catalog(path))
+
+    assert calculator.calc_grain_bill(1.040, 5, (('Grain A', 1, 1),)) == (('Grain A', (5, Decimal('0.0'))),)
+
+
+def test__environment_variable__merges_catalogs(tmpdir):
+    path = str(tmpdir.join('catalog' + grains.BINARY_EXTENSION))
+    grains.write_catalog({'Supplier Pils': 1.040}, path)
+
+    script = 'from brew_tools import grains; print(len(grains.max_gravities), grains.max_gravities["Supplier Pils"])'
+    assert _run(script, BREW_TOOLS_CATALOGS=path) == '107 1.04'
@@ -0,0 +1,107 @@
+""" This module contains PyTest unit tests for the 'lookup' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import pytest
+from brew_tools import batch, calculator, grains, lookup
+
+
+def test__normalize__normalizes():
+    assert lookup.normalize('American Crystal 60L') == 'american crystal 60 l'
+    assert lookup.normalize('  AMERICAN pale (2-row) ') == 'american pale 2 row'
+    assert lookup.normalize('Franco-Belges Kiln Coffee') == 'franco belges kiln coffee'
+    assert lookup.normalize('Pilsnér') == 'pilsner'
+
+
+def test__search__ranks_fuzzy_matches():
+    index = lookup.FermentableIndex(grains.max_gravities)
+
+    best, second = index.search('2 row pale', 2)
+    assert best.grain == 'American Pale (2-Row)'
+    assert second.grain == 'American Pale (6-Row)' and second.score < best.score
+    assert index.search('crystal 60')[0].grain == 'American Crystal 60L'
+    assert index.search('brown sugar, dark')[0] == lookup.Match('Brown Sugar (Dark)', 1.0)
+    assert index.search('') == ()
+    assert index.search('zzz') == ()
+
+
+def test__resolve__resolves():
+    index = lookup.FermentableIndex(grains.max_gravities, {'2 row': 'American Pale (2-Row)'})
+
+    assert index.resolve('American Wheat') == 'American Wheat'
+    assert index.resolve('american WHEAT') == 'American Wheat'
+    assert index.resolve('2-Row') == 'American Pale (2-Row)'
+    assert index.resolve('maris otter') == 'British Maris Otter Pale'
+    assert index.resolve('CARAMUNICH II') == 'German CaraMunich II'
+
+    pytest.raises(KeyError, index.resolve, 'pilsner')
+    pytest.raises(KeyError, index.resolve, 'roasted barley')
+    index.add_alias('Pilsner Malt', 'Belgian Pilsen')
+    assert index.resolve('pilsner malt') == 'Belgian Pilsen'
+    assert index.resolve('pilsner malts', min_score=0.5) == 'Belgian Pilsen'
+
+    pytest.raises(KeyError, index.add_alias, 'nothing', 'Not A Grain')
+
+
+def test__resolve_grain_list__resolves(monkeypatch):
+    monkeypatch.setattr(lookup, '_aliases', {})
+    lookup.add_alias('pils', 'Belgian Pilsen')
+
+    grain_list = calculator.resolve_grain_list([('2 row pale', 0.7, 0.7), ('pils', 0.3, 0.7)])
+    assert grain_list == (('American Pale (2-Row)', 0.7, 0.7), ('Belgian Pilsen', 0.3, 0.7))
+    assert calculator.resolve_grain_list([('pilsner', 1, 0.7)], strict=False) == (('pilsner', 1, 0.7),)
+    pytest.raises(KeyError, calculator.resolve_grain_list, [('pilsner', 1, 0.7)])
+
+    recipe, = batch.read_jsonl_recipes(io.StringIO(
+        '{"target_gravity": 1.05, "volume": 5, "grains": [["crystal 60", 0.1, 0.7], ["2 row pale", 0.9, 0.7]]}'),
+        resolve_names=True)
+    assert [grain for (grain, _, _) in recipe.grain_list] == ['American Crystal 60L', 'American Pale (2-Row)']
+
+    lookup.reset_index()
+    assert lookup.resolve('pils') == 'Belgian Pilsen'
+    lookup.reset_index()
+
+
+def test__get_index__skips_aliases_missing_from_catalog(monkeypatch):
+    monkeypatch.setattr(lookup, '_aliases', {})
+    monkeypatch.setattr(grains, 'max_gravities', grains.max_gravities)
+    lookup.add_alias('pils', 'Belgian Pilsen')
+
+    grains.set_catalog({'American Wheat': 1.038})
+    assert lookup.resolve('american wheat') == 'American Wheat'
+    pytest.raises(KeyError, lookup.resolve, 'pils')
+
+    grains.set_catalog({'Belgian Pilsen': 1.037})
+    assert lookup.resolve('pils') == 'Belgian Pilsen'
+    lookup.reset_index()
+
+
+def test__get_index__sees_catalog_additions(monkeypatch):
+    monkeypatch.setattr(grains, 'max_gravities', {'American Wheat': 1.038})
+    index = lookup.get_index()
+    assert index.resolve('american wheat') == 'American Wheat'
+
+    grains.max_gravities['Zebra Malt'] = 1.035
+    assert index.resolve('Zebra Malt') == 'Zebra Malt'
+    assert lookup.resolve('zebra malt') == 'Zebra Malt'
+    lookup.reset_index()
@@ -0,0 +1,62 @@
+""" This module contains PyTest unit tests for the 'mash' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+from decimal import Decimal
+from brew_tools import calculator, mash
+
+
+def test__plan_mash_schedule__chains_infusions():
+    plan = mash.plan_mash_schedule((104, 140, 158), 8, 1, 70)
+
+    assert plan.strike_temp == Decimal('110.8')
+    assert plan.feasible
+    assert [step.temp for step in plan.steps] == [104, 140, 158]
+    assert [step.infusion_volume for step in plan.steps] == [
+        0, Decimal('4.937'), calculator.calc_infusion_volume(140, 158, 210, Decimal('12.937'), 8)]
+    assert [step.water_volume for step in plan.steps] == [
+        Decimal('8'), Decimal('12.937'), Decimal('12.937') + plan.steps[2].infusion_volume]
+    assert plan.steps[0].mash_volume == Decimal('10.560')
+
+
+def test__plan_mash_schedule__flags_tun_capacity():
+    plan = mash.plan_mash_schedule((104, 140, 158), 8, 1, 70, tun_capacity=16)
+
+    assert not plan.feasible
+    assert [step.feasible for step in plan.steps] == [True, True, False]
+
+
+def test__plan_mash_schedule__raises_errors():
+    pytest.raises(ValueError, mash.plan_mash_schedule, (), 8, 1, 70)
+    pytest.raises(ValueError, mash.plan_mash_schedule, (150, 140), 8, 1, 70)
+    pytest.raises(ValueError, mash.plan_mash_schedule, (150, 170), 8, 1, 70, infusion_temp=165)
+
+
+def test__plan_mash_schedules__matches_single_plans():
+    candidates = [(122, 152, 168), (122, 152), (122, 148, 168), (152, 168), (152,)]
+    plans = mash.plan_mash_schedules(candidates, 12.5, 1.25, 68, tun_capacity=40)
+
+    assert plans == tuple(mash.plan_mash_schedule(temps, 12.5, 1.25, 68, tun_capacity=40) for temps in candidates)
+
+    with calculator.backend(calculator.FLOAT):
+        assert isinstance(mash.plan_mash_schedules(candidates, 12.5, 1.25, 68)[0].steps[-1].water_volume, float)
@@ -0,0 +1,67 @@
+""" This module contains PyTest unit tests for the 'parallel' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+from brew_tools import batch, parallel
+
+
+def _recipes(count):
+    grain_list = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+    return [batch.BatchRecipe(recipe_id, 1.040 + (recipe_id % 40) / 1000, 5 + recipe_id % 7, grain_list, 1.5, 70, 152)
+            for recipe_id in range(count)]
+
+
+def test__process_recipes__matches_batch():
+    recipes = _recipes(50)
+    expected = list(batch.process_recipes(recipes))
+
+    assert list(parallel.process_recipes(recipes, workers=2, chunk_size=7)) == expected
+
+    unordered = list(parallel.process_recipes(recipes, workers=2, chunk_size=7, ordered=False))
+    assert sorted(unordered, key=lambda result: result.id) == expected
+
+
+def test__process_recipes__reports_bad_recipes():
+    recipes = _recipes(10)
+    recipes[3] = recipes[3]._replace(grain_list=(('Unknown Grain', 1, .7),))
+
+    results = list(parallel.process_recipes(iter(recipes), workers=2, chunk_size=4, backend='float'))
+
+    assert len(results) == 10
+    assert results[3] == batch.BatchError(3, "KeyError: 'Unknown Grain'")
+    assert all(isinstance(result, batch.BatchResult) for result in results[:3] + results[4:])
+    assert isinstance(results[0].total_weight, float)
+
+
+def test__process_recipes__raises_errors():
+    pytest.raises(ValueError, list, parallel.process_recipes(_recipes(1), workers=-1))
+    pytest.raises(ValueError, list, parallel.process_recipes(_recipes(1), workers=0))
+    pytest.raises(ValueError, list, parallel.process_recipes(_recipes(1), chunk_size=0))
+
+
+def test__process_recipes__serializes_in_workers():
+    recipes = _recipes(20)
+    expected = ''.join(batch.result_to_json(result) + '\n' for result in batch.process_recipes(recipes))
+
+    blocks = parallel.process_recipes(recipes, workers=2, chunk_size=6, serialize=batch.result_to_json)
+    assert ''.join(blocks) == expected
@@ -0,0 +1,121 @@
+""" This module contains PyTest unit tests for the 'profiling' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from brew_tools import calculator, formatter, profiling, server
+
+GRAIN_LIST = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+
+
+def test__profile__records_calls():
+    original = calculator.calc_grain_bill
+
+    with profiling.profile() as profiler:
+        assert calculator.calc_grain_bill is not original
+        formatter.format_grain_bill(calculator.calc_grain_bill(1.052, 5.5, GRAIN_LIST))
+        calculator.calc_grain_bill(1.052, 5.5, GRAIN_LIST)
+
+    assert calculator.calc_grain_bill is original
+    assert profiling.get_profiler() is None
+
+    stats = profiler.as_dict()
+    assert stats['calculator.calc_grain_bill']['calls'] == 2
+    assert stats['calculator.calc_grain_qty']['calls'] == 4
+    assert stats['formatter.format_grain_bill_line']['calls'] == 2
+    assert stats['calculator.calc_grain_bill']['p50_seconds'] > 0
+    assert stats['calculator.calc_grain_bill']['decimals_per_call'] > 0
+    assert stats['calculator.calc_grain_bill']['decimals'] >= stats['calculator.calc_grain_qty']['decimals']
+    assert stats['calculator.to_decimal']['calls'] > 0
+    assert stats['calculator.to_decimal']['decimals'] == stats['calculator.to_decimal']['calls']
+
+
+def test__profile__counts_no_decimals_in_float_backend():
+    with profiling.profile() as profiler, calculator.backend(calculator.FLOAT):
+        calculator.calc_strike_temp(1.25, 70, 152)
+        calculator.to_decimal(1.5)
+
+    stats = profiler.as_dict()
+    assert stats['calculator.calc_strike_temp']['decimals'] == 0
+    assert stats['calculator.to_decimal']['decimals'] == 1
+
+
+def test__profile__nests():
+    with profiling.profile() as outer:
+        calculator.calc_strike_temp(1.25, 70, 152)
+        with profiling.profile() as inner:
+            calculator.calc_strike_temp(1.25, 70, 152)
+        calculator.calc_strike_temp(1.25, 70, 152)
+
+    assert outer.as_dict()['calculator.calc_strike_temp']['calls'] == 2
+    assert inner.as_dict()['calculator.calc_strike_temp']['calls'] == 1
+
+
+def test__profile__counts_decimals_per_thread():
+    with profiling.profile() as profiler:
+        calculator.calc_strike_temp(1.25, 70, 152)
+    decimals_per_call = profiler.as_dict()['calculator.calc_strike_temp']['decimals']
+
+    def brew(_):
+        for _ in range(200):
+            calculator.calc_strike_temp(1.25, 70, 152)
+
+    with profiling.profile() as profiler, ThreadPoolExecutor(4) as executor:
+        list(executor.map(brew, range(4)))
+
+    stats = profiler.as_dict()['calculator.calc_strike_temp']
+    assert stats['calls'] == 800
+    assert stats['decimals'] == 800 * decimals_per_call
+
+
+def test__profile__instruments_server():
+    request = {'id': 1, 'method': 'calc_strike_temp', 'params': [1.25, 70, 152]}
+    with profiling.profile() as profiler:
+        response = asyncio.run(server.CalculatorServer().handle(request))
+
+    assert response == {'id': 1, 'result': calculator.calc_strike_temp(1.25, 70, 152)}
+    assert profiler.as_dict()['calculator.calc_strike_temp']['calls'] == 1
+
+
+def test__to_prometheus__exports():
+    with profiling.profile() as profiler:
+        calculator.calc_mash_water_volume(1.25, 7.75)
+
+    text = profiler.to_prometheus()
+    assert '# TYPE brew_tools_calls_total counter\n' in text
+    assert 'brew_tools_calls_total{function="calculator.calc_mash_water_volume"} 1\n' in text
+    assert 'brew_tools_call_seconds{function="calculator.calc_mash_water_volume",quantile="0.99"} ' in text
+    assert 'brew_tools_decimals_total{function="calculator.calc_mash_water_volume"} 1\n' in text
+
+
+def test__environment_variable__enables():
+    environment = dict(os.environ, BREW_TOOLS_PROFILE='1')
+    script = ('from brew_tools import calculator, profiling; calculator.calc_strike_temp(1, 70, 104); '
+              'print(profiling.get_profiler().as_dict()["calculator.calc_strike_temp"]["calls"])')
+    output = subprocess.check_output([sys.executable, '-c', script], env=environment,
+                                     cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    assert output.strip() == b'1'
@@ -0,0 +1,114 @@
+""" This module contains PyTest unit tests for the 'recipe' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+from brew_tools import calculator, grains, recipe
+
+GRAIN_LIST = [('American Wheat', 0.6, 0.68), ('American Pale (2-Row)', 0.3, 0.68), ('Belgian Pilsen', 0.1, 0.7)]
+
+
+def _expected(target_gravity, volume, grain_list, water_grist_ratio=1.25, grain_temp=70, mash_temp=152):
+    grain_bill = calculator.calc_grain_bill(target_gravity, volume, grain_list)
+    total_weight = calculator.calc_total_grain_weight(grain_bill)
+    return (grain_bill, total_weight, calculator.calc_mash_water_volume(water_grist_ratio, total_weight),
+            calculator.calc_strike_temp(water_grist_ratio, grain_temp, mash_temp))
+
+
+def _actual(brew):
+    return brew.grain_bill, brew.total_grain_weight, brew.mash_water_volume, brew.strike_temp
+
+
+@pytest.mark.parametrize('backend', [calculator.DECIMAL, calculator.FLOAT])
+def test__recipe__matches_calculator(backend):
+    with calculator.backend(backend):
+        brew = recipe.Recipe(1.052, 5.5, GRAIN_LIST, 1.25, 70, 152)
+        assert _actual(brew) == _expected(1.052, 5.5, GRAIN_LIST)
+
+        brew.update_grain('American Wheat', ratio=0.5)
+        brew.update_grain('Belgian Pilsen', ratio=0.2, efficiency=0.72)
+        grain_list = [('American Wheat', 0.5, 0.68), ('American Pale (2-Row)', 0.3, 0.68),
+                      ('Belgian Pilsen', 0.2, 0.72)]
+        assert _actual(brew) == _expected(1.052, 5.5, grain_list)
+
+        brew.volume = 11
+        brew.target_gravity = 1.060
+        brew.water_grist_ratio = 1.5
+        assert _actual(brew) == _expected(1.060, 11, grain_list, 1.5)
+
+        brew.remove_grain('American Pale (2-Row)')
+        brew.add_grain('American Crystal 20L', 0.3, 0.7)
+        grain_list = [grain_list[0], grain_list[2], ('American Crystal 20L', 0.3, 0.7)]
+        assert brew.grain_list == tuple(grain_list)
+        assert _actual(brew) == _expected(1.060, 11, grain_list, 1.5)
+
+    assert brew.grain_bill == calculator.calc_grain_bill(1.060, 11, grain_list)
+
+
+def test__recipe__recalculates_only_what_changed(monkeypatch):
+    brew = recipe.Recipe(1.052, 5.5, GRAIN_LIST, 1.25, 70, 152)
+    _actual(brew)
+
+    calls = []
+    calc_grain_qty = calculator.calc_grain_qty
+    monkeypatch.setattr(calculator, 'calc_grain_qty', lambda *args: calls.append(args) or calc_grain_qty(*args))
+    monkeypatch.setattr(calculator, 'calc_strike_temp', None)
+    calc_expected_yield = calculator.calc_expected_yield
+    yields = []
+    monkeypatch.setattr(calculator, 'calc_expected_yield',
+                        lambda *args: yields.append(args) or calc_expected_yield(*args))
+
+    brew.update_grain('American Pale (2-Row)', ratio=0.35)
+    brew.total_grain_weight
+    assert len(calls) == 1 and yields == []
+
+    brew.volume = 6
+    brew.mash_water_volume
+    assert len(calls) == 4 and yields == []
+
+    brew.update_grain('American Wheat', efficiency=0.7)
+    brew.grain_bill
+    assert len(calls) == 5 and yields == [(38, 0.7)]
+
+
+def test__recipe__sees_catalog_edits_in_place(monkeypatch):
+    monkeypatch.setattr(grains, 'max_gravities', dict(grains.max_gravities))
+    brew = recipe.Recipe(1.052, 5.5, GRAIN_LIST, 1.25, 70, 152)
+    _actual(brew)
+
+    grains.max_gravities['American Wheat'] = 1.030
+    assert _actual(brew) == _expected(1.052, 5.5, GRAIN_LIST)
+
+    grains.max_gravities['Belgian Pilsen'] = 1.035
+    brew.volume = 6
+    assert _actual(brew) == _expected(1.052, 6, GRAIN_LIST)
+
+
+def test__recipe__raises_errors():
+    with pytest.raises(KeyError):
+        recipe.Recipe(1.052, 5.5, [('Not A Grain', 1, 0.7)])
+
+    with pytest.raises(ValueError):
+        recipe.Recipe(1.052, 5.5, GRAIN_LIST + GRAIN_LIST[:1])
+
+    with pytest.raises(ValueError):
+        recipe.Recipe(1.052, 5.5, GRAIN_LIST).update_grain('Belgian Pale', ratio=0.2)
@@ -0,0 +1,90 @@
+""" This module contains PyTest unit tests for the 'rollup' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import json
+import pytest
+from decimal import Decimal
+from brew_tools import batch, calculator, recipe, rollup
+from brew_tools.test.test_batch import JSONL_RECIPES
+
+WIT, BITTER = batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES))
+
+
+def _expected(schedule):
+    totals = {}
+    for (scheduled, batch_count) in schedule:
+        for (grain, (lbs, ounces)) in calculator.calc_grain_bill(scheduled.target_gravity, scheduled.volume,
+                                                                 scheduled.grain_list):
+            totals[grain] = totals.get(grain, 0) + (lbs * 16 + ounces) * batch_count
+
+    return dict((grain, calculator.to_number(ounces / 16, 3)) for (grain, ounces) in totals.items())
+
+
+def test__rollup_grain_demand__totals_schedule():
+    schedule = [(WIT, 3), (BITTER, 2), (WIT, 1)]
+    demand = rollup.rollup_grain_demand(schedule, chunk_size=2)
+
+    assert (demand.recipe_count, demand.batch_count, len(demand)) == (3, 6, 3)
+    assert dict(demand.totals()) == _expected(schedule)
+    weights = [weight for (_, weight) in demand.totals()]
+    assert weights == sorted(weights, reverse=True)
+    assert demand.total_weight() == sum(dict(demand.totals()).values())
+    assert isinstance(demand.total_weight(), Decimal)
+
+    grams = dict(demand.totals(calculator.GRAMS))
+    assert grams['American Wheat'] == calculator.to_number(dict(demand.totals())['American Wheat'] * Decimal(
+        '453.59237'), 3)
+    with pytest.raises(ValueError):
+        demand.totals('stone')
+
+
+def test__grain_demand_rollup__accepts_grain_bills_and_recipes():
+    demand = rollup.GrainDemandRollup()
+    demand.add(calculator.calc_grain_bill(WIT.target_gravity, WIT.volume, WIT.grain_list), 2)
+    demand.add(recipe.Recipe(WIT.target_gravity, WIT.volume, WIT.grain_list))
+    demand.update([(BITTER, 1), (calculator.calc_grain_bill(BITTER.target_gravity, BITTER.volume,
+                                                            BITTER.grain_list), 0)])
+
+    assert dict(demand.totals()) == _expected([(WIT, 3), (BITTER, 1)])
+    assert demand.batch_count == 4
+
+    with pytest.raises(ValueError):
+        demand.add(WIT, -1)
+
+    with calculator.backend(calculator.FLOAT):
+        assert isinstance(demand.total_weight(), float)
+
+
+def test__grain_demand_rollup__merges():
+    schedule = [(WIT, 3), (BITTER, 2), (BITTER, 5), (WIT, 1)]
+    whole = rollup.rollup_grain_demand(schedule)
+
+    monday = rollup.rollup_grain_demand(schedule[:2])
+    tuesday = rollup.GrainDemandRollup.from_dict(json.loads(json.dumps(rollup.rollup_grain_demand(
+        schedule[2:]).to_dict())))
+    merged = monday.merge(tuesday)
+
+    assert merged.totals() == whole.totals()
+    assert merged.to_dict() == whole.to_dict()
+    assert rollup.GrainDemandRollup().totals() == ()
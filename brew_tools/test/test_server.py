@@ -0,0 +1,156 @@
+""" This module contains PyTest unit tests for the 'server' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from decimal import Decimal
+from brew_tools import calculator, server
+
+WIT = {'target_gravity': 1.052, 'volume': 5.5,
+       'grain_list': [['American Wheat', 0.67, 0.68], ['American Pale (2-Row)', 0.33, 0.68]]}
+BITTER = [1.040, 5, [['British Maris Otter Pale', 1, 0.72]]]
+
+
+def test__handle__batches_and_deduplicates():
+    calculator_server = server.CalculatorServer(batch_delay=.01)
+
+    async def run():
+        requests = [{'id': 1, 'method': 'calc_grain_bill', 'params': WIT},
+                    {'id': 2, 'method': 'calc_grain_bill', 'params': BITTER},
+                    {'id': 3, 'method': 'calc_grain_bill', 'params': dict(WIT)}]
+        return await asyncio.gather(*(calculator_server.handle(request) for request in requests))
+
+    responses = asyncio.run(run())
+    grain_list = [tuple(line) for line in WIT['grain_list']]
+    assert responses[0] == {'id': 1, 'result': calculator.calc_grain_bill(1.052, 5.5, grain_list)}
+    assert responses[1]['result'] == calculator.calc_grain_bill(1.040, 5, [('British Maris Otter Pale', 1, 0.72)])
+    assert responses[2] == {'id': 3, 'result': responses[0]['result']}
+    assert calculator_server.stats['batches'] == 1
+    assert calculator_server.stats['batched_requests'] == 2
+    assert calculator_server.stats['deduplicated'] == 1
+
+
+def test__handle__reports_errors():
+    calculator_server = server.CalculatorServer(batch_delay=0)
+
+    async def run():
+        requests = [{'id': 1, 'method': 'calc_grain_bill', 'params': WIT},
+                    {'id': 2, 'method': 'calc_grain_bill', 'params': [1.040, 5, [['Not A Grain', 1, 0.72]]]},
+                    {'id': 3, 'method': 'os.remove', 'params': ['/']},
+                    {'id': 4, 'method': 'calc_strike_temp', 'params': [152, 1.25]},
+                    {'id': 5, 'method': 'calc_strike_temp', 'params': 5},
+                    {'id': 6, 'method': 'calc_grain_bill'},
+                    ['not', 'an', 'object']]
+        return await asyncio.gather(*(calculator_server.handle(request) for request in requests))
+
+    good, unknown_grain, unknown_method, missing_args, bad_params, no_params, not_object = asyncio.run(run())
+    assert len(good['result']) == 2
+    assert unknown_grain['id'] == 2 and unknown_grain['error'].startswith('KeyError')
+    assert unknown_method['id'] == 3 and unknown_method['error'].startswith('RequestError')
+    assert missing_args['error'].startswith('TypeError')
+    assert bad_params == {'id': 5, 'error': 'RequestError: "params" must be a list, an object or null.'}
+    assert no_params['id'] == 6 and no_params['error'].startswith('RequestError')
+    assert not_object == {'id': None, 'error': 'RequestError: A request must be a JSON object.'}
+    assert calculator_server.stats['errors'] == 6
+
+
+async def _exchange(reader, writer, lines):
+    writer.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    return sorted(responses, key=lambda response: response['id'] or 0)
+
+
+def test__start_tcp__pipelines_requests():
+    lines = [json.dumps({'id': number, 'method': 'calc_strike_temp', 'params': [152, 1.25, 70]})
+             for number in range(1, 51)]
+    lines += ['{"id": 51, "method": "convert_sg_to_ppg", "params": {"gravity": 1.035}}', 'not json']
+
+    async def run():
+        calculator_server = server.CalculatorServer(max_pending=4)
+        tcp_server = await calculator_server.start_tcp()
+        async with tcp_server:
+            reader, writer = await asyncio.open_connection(*tcp_server.sockets[0].getsockname()[:2])
+            return await _exchange(reader, writer, lines)
+
+    responses = asyncio.run(run())
+    assert responses[0]['error'].startswith('ValueError')
+    assert [response['id'] for response in responses[1:]] == list(range(1, 52))
+    assert Decimal(responses[1]['result']) == calculator.calc_strike_temp(152, 1.25, 70)
+    assert responses[-1]['result'] == 35
+
+
+def test__start_tcp__responds_to_unexpected_errors(monkeypatch):
+    def fail(*args):
+        raise RuntimeError('calculator failed')
+
+    monkeypatch.setattr(calculator, 'calc_grain_bills', fail)
+    monkeypatch.setattr(calculator, 'calc_grain_bill', fail)
+    lines = [json.dumps({'id': 1, 'method': 'calc_grain_bill', 'params': BITTER}),
+             json.dumps({'id': 2, 'method': 'convert_sg_to_ppg', 'params': [1.035]})]
+
+    async def run():
+        tcp_server = await server.CalculatorServer(batch_delay=0).start_tcp()
+        async with tcp_server:
+            reader, writer = await asyncio.open_connection(*tcp_server.sockets[0].getsockname()[:2])
+            return await asyncio.wait_for(_exchange(reader, writer, lines), 5)
+
+    assert asyncio.run(run()) == [{'id': 1, 'error': 'RuntimeError: calculator failed'}, {'id': 2, 'result': 35}]
+
+
+def test__start_tcp__answers_oversized_lines():
+    oversized = json.dumps({'id': 1, 'method': 'convert_sg_to_ppg', 'params': [1.035], 'padding': 'x' * 2048})
+    lines = [oversized, oversized, oversized, json.dumps({'id': 2, 'method': 'convert_sg_to_ppg', 'params': [1.035]})]
+
+    async def run():
+        tcp_server = await server.CalculatorServer(max_pending=2, line_limit=1024).start_tcp()
+        async with tcp_server:
+            address = tcp_server.sockets[0].getsockname()[:2]
+            responses = await asyncio.wait_for(_exchange(*await asyncio.open_connection(*address), lines), 5)
+            line = json.dumps({'id': 3, 'method': 'convert_sg_to_ppg', 'params': [1.040]})
+            responses += await asyncio.wait_for(_exchange(*await asyncio.open_connection(*address), [line]), 5)
+            return responses
+
+    responses = asyncio.run(run())
+    assert [response['id'] for response in responses] == [None, None, None, 2, 3]
+    assert all(response['error'].startswith('ValueError') for response in responses[:3])
+    assert [response['result'] for response in responses[3:]] == [35, 40]
+
+
+def test__start_unix__serves():
+    async def run(path):
+        unix_server = await server.CalculatorServer(backend=calculator.FLOAT).start_unix(path)
+        async with unix_server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            return await _exchange(reader, writer, [json.dumps({'id': 1, 'method': 'calc_grain_bill',
+                                                                'params': BITTER})])
+
+    with tempfile.TemporaryDirectory() as directory:
+        response, = asyncio.run(run(os.path.join(directory, 'brew_tools.sock')))
+
+    grain, lbs, oz = response['result'][0]['grain'], response['result'][0]['lbs'], response['result'][0]['oz']
+    assert grain == 'British Maris Otter Pale'
+    assert isinstance(lbs, int) and isinstance(oz, float)
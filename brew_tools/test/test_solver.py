@@ -0,0 +1,109 @@
+""" This module contains PyTest unit tests for the 'solver' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+import random
+from decimal import Decimal
+from brew_tools import calculator, grains, solver
+
+GRAIN_LIST = (('American Wheat', .67, .68), ('American Pale (2-Row)', .33, .68))
+
+
+def _pounds(grain_bill):
+    return dict((grain, lbs + Decimal(ounces) / 16) for (grain, (lbs, ounces)) in grain_bill)
+
+
+def test__calc_grain_demand__calculates():
+    demand = dict(solver.calc_grain_demand(GRAIN_LIST + (('American Wheat', 0, .5),)))
+
+    assert demand['American Wheat'] == Decimal(.67) / calculator.calc_expected_yield(38, .68)
+    assert demand['American Pale (2-Row)'] == Decimal(.33) / calculator.calc_expected_yield(37, .68)
+
+
+def test__calc_grain_demand__raises_errors():
+    pytest.raises(ValueError, solver.calc_grain_demand, (('American Wheat', 1, 0),))
+    pytest.raises(ValueError, solver.calc_grain_demand, (('British Caramalt', 1, .7),))
+    pytest.raises(ValueError, solver.calc_grain_demand, (('American Wheat', 0, .7),))
+    pytest.raises(KeyError, solver.calc_grain_demand, (('Unknown Grain', 1, .7),))
+
+
+def test__calc_max_volume__fits_inventory():
+    inventory = {'American Wheat': 50, 'American Pale (2-Row)': 10}
+    volume = solver.calc_max_volume(1.052, GRAIN_LIST, inventory)
+
+    points, limiting_grain = solver.calc_max_gravity_points(solver.calc_grain_demand(GRAIN_LIST), inventory)
+    assert limiting_grain == 'American Pale (2-Row)'
+    assert volume == int(points / 52 * 1000) / Decimal(1000)
+
+    pounds = _pounds(calculator.calc_grain_bill(1.052, volume, GRAIN_LIST))
+    assert pounds['American Pale (2-Row)'] <= 10
+    assert pounds['American Wheat'] <= 50
+    pounds = _pounds(calculator.calc_grain_bill(1.052, volume + Decimal('0.01'), GRAIN_LIST))
+    assert pounds['American Pale (2-Row)'] > 10
+
+
+def test__calc_max_gravity__fits_inventory():
+    inventory = {'American Wheat': 8, 'American Pale (2-Row)': 50}
+    gravity = solver.calc_max_gravity(5.5, GRAIN_LIST, inventory)
+
+    assert _pounds(calculator.calc_grain_bill(gravity, 5.5, GRAIN_LIST))['American Wheat'] <= 8
+    assert _pounds(calculator.calc_grain_bill(gravity + Decimal('0.001'), 5.5, GRAIN_LIST))['American Wheat'] > 8
+    assert solver.calc_max_gravity(5.5, GRAIN_LIST, {}) == Decimal('1.000')
+    pytest.raises(ValueError, solver.calc_max_gravity, 0, GRAIN_LIST, inventory)
+
+
+def test__calc_max_volumes__calculates_scenarios():
+    inventories = [{'American Wheat': wheat, 'American Pale (2-Row)': 20} for wheat in range(0, 40, 5)]
+
+    volumes = solver.calc_max_volumes(1.052, GRAIN_LIST, inventories)
+    assert volumes == tuple(solver.calc_max_volume(1.052, GRAIN_LIST, inventory) for inventory in inventories)
+    for (volume, inventory) in zip(volumes, inventories):
+        for (grain, pounds) in _pounds(calculator.calc_grain_bill(1.052, volume, GRAIN_LIST)).items():
+            assert pounds <= inventory[grain]
+    assert solver.calc_max_gravities(5, GRAIN_LIST, inventories)[1] == solver.calc_max_gravity(5, GRAIN_LIST,
+                                                                                              inventories[1])
+    pytest.raises(ValueError, solver.calc_max_volumes, 1.000, GRAIN_LIST, inventories)
+
+    with calculator.backend(calculator.FLOAT):
+        assert isinstance(solver.calc_max_volume(1.052, GRAIN_LIST, inventories[-1]), float)
+
+
+def test__calc_max_volumes_and_gravities__fit_random_inventories():
+    generator = random.Random(11)
+    names = sorted(grain for (grain, gravity) in grains.max_gravities.items() if gravity > 1)
+
+    for _ in range(200):
+        grain_list = tuple((grain, generator.uniform(.05, 1), round(generator.uniform(.6, .85), 2))
+                           for grain in generator.sample(names, generator.randint(1, 4)))
+        inventories = [dict((grain, round(generator.uniform(0, 30), 3)) for (grain, _, _) in grain_list)
+                       for _ in range(3)]
+        target_gravity = round(generator.uniform(1.030, 1.100), 3)
+        volume = round(generator.uniform(1, 15), 3)
+
+        bills = [calculator.calc_grain_bill(target_gravity, max_volume, grain_list)
+                 for max_volume in solver.calc_max_volumes(target_gravity, grain_list, inventories)]
+        bills += [calculator.calc_grain_bill(max_gravity, volume, grain_list)
+                  for max_gravity in solver.calc_max_gravities(volume, grain_list, inventories)]
+        for (grain_bill, inventory) in zip(bills, inventories * 2):
+            for (grain, pounds) in _pounds(grain_bill).items():
+                assert pounds <= Decimal(str(inventory[grain]))
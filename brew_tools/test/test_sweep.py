@@ -0,0 +1,104 @@
+""" This module contains PyTest unit tests for the 'sweep' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import pytest
+from brew_tools import calculator, sweep
+
+GRAINS = ('American Wheat', 'American Pale (2-Row)')
+GRAVITIES = sweep.linspace(1.040, 1.060, 3)
+VOLUMES = (5, 5.5, 10)
+EFFICIENCIES = (0.65, 0.7)
+RATIO_SETS = ((0.5, 0.5), (0.67, 0.33))
+
+
+def test__linspace__spaces_evenly():
+    assert sweep.linspace(1, 2, 5) == (1, 1.25, 1.5, 1.75, 2)
+    assert sweep.linspace(1.05, 2, 1) == (1.05,)
+
+    with pytest.raises(ValueError):
+        sweep.linspace(1, 2, 0)
+
+
+def test__sweep__matches_calculator():
+    result = sweep.sweep(GRAINS, GRAVITIES, VOLUMES, EFFICIENCIES, RATIO_SETS, (1.25, 1.5))
+    assert result.shape == (3, 3, 2, 2, 2)
+    assert len(result) == 72
+
+    with calculator.backend(calculator.FLOAT):
+        for index in range(len(result)):
+            parameters = result.parameters(index)
+            points = calculator.calc_total_gravity_points(parameters['target_gravity'], parameters['volume'])
+            expected = tuple(
+                (grain, calculator.calc_grain_qty(points, ratio, calculator.calc_expected_yield(
+                    calculator.convert_sg_to_ppg(calculator.grains.max_gravities[grain]),
+                    parameters['efficiency'])))
+                for grain, ratio in zip(GRAINS, parameters['ratios']))
+            total_weight = calculator.calc_total_grain_weight(expected)
+
+            assert result.grain_weights(index) == expected
+            assert result.total_weights[index] == total_weight
+            assert result.mash_water_volumes[index] == calculator.calc_mash_water_volume(
+                parameters['water_grist_ratio'], total_weight)
+
+    assert result.parameters(71) == {'target_gravity': 1.06, 'volume': 10, 'efficiency': 0.7, 'ratios': (0.67, 0.33),
+                                     'water_grist_ratio': 1.5}
+
+
+def test__sweep_chunks__matches_sweep():
+    whole = sweep.sweep(GRAINS, GRAVITIES, VOLUMES, EFFICIENCIES, RATIO_SETS, derivatives=True)
+    chunks = list(sweep.sweep_chunks(GRAINS, GRAVITIES, VOLUMES, EFFICIENCIES, RATIO_SETS, derivatives=True,
+                                     chunk_size=5))
+
+    assert [chunk.start for chunk in chunks] == [0, 5, 10, 15, 20, 25, 30, 35]
+    assert sum((chunk.weights for chunk in chunks[1:]), chunks[0].weights) == whole.weights
+    assert sum((chunk.derivatives['volume'] for chunk in chunks[1:]), chunks[0].derivatives['volume']) == \
+        whole.derivatives['volume']
+    assert chunks[-1].parameters(1) == whole.parameters(36)
+
+
+def test__sweep__calculates_derivatives():
+    result = sweep.sweep(GRAINS, (1.050, 1.051), (5,), (0.7,), ((0.6, 0.4),), derivatives=True)
+    derivatives = result.derivatives
+    for column, ratio in enumerate((0.6, 0.4)):
+        weight = result.weights[column]
+        assert derivatives['volume'][column] * 5 == pytest.approx(weight, abs=1e-3)
+        assert derivatives['efficiency'][column] * 0.7 == pytest.approx(-weight, abs=1e-3)
+        assert derivatives['ratio'][column] * ratio == pytest.approx(weight, abs=1e-3)
+        assert derivatives['target_gravity'][column] * 0.001 == pytest.approx(
+            result.weights[2 + column] - weight, abs=1e-3)
+
+    empty = sweep.sweep(GRAINS, (), VOLUMES, EFFICIENCIES, RATIO_SETS, derivatives=True)
+    assert len(empty) == 0
+    assert sorted(empty.derivatives) == sorted(result.derivatives)
+    assert sweep.sweep(GRAINS, (), VOLUMES, EFFICIENCIES, RATIO_SETS).derivatives is None
+
+
+def test__sweep__raises_errors():
+    with pytest.raises(ValueError):
+        sweep.sweep(GRAINS, GRAVITIES, VOLUMES, EFFICIENCIES, ((1,),))
+
+    with pytest.raises(ValueError):
+        sweep.sweep(GRAINS, GRAVITIES, VOLUMES, (0,), RATIO_SETS)
+
+    with pytest.raises(KeyError):
+        sweep.sweep(('Not A Grain',), GRAVITIES, VOLUMES, EFFICIENCIES, ((1,),))
@@ -0,0 +1,114 @@
+""" This module contains PyTest unit tests for the 'validation' module.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import io
+import json
+import pytest
+from brew_tools import batch, validation
+from brew_tools.test.test_batch import CSV_RECIPES, JSONL_RECIPES
+
+RECIPES = tuple(batch.read_jsonl_recipes(io.StringIO(JSONL_RECIPES)))
+
+
+def _bad_recipes():
+    wit, bitter = RECIPES
+    return (
+        wit,
+        bitter._replace(id='unknown', grain_list=(('Unknown Grain', 1, .7),)),
+        bitter._replace(id='caramalt', grain_list=(('British Caramalt', .2, .7), ('British Maris Otter Pale', .8, .7))),
+        bitter._replace(id='ratios', grain_list=(('British Maris Otter Pale', .5, .7),)),
+        bitter._replace(id='zeroes', volume=0, target_gravity=1.0, water_grist_ratio=0,
+                        grain_list=(('British Maris Otter Pale', 1, 0),)),
+        bitter._replace(id='empty', volume='5', grain_list=()),
+        bitter._replace(id='unhashable', grain_list=((['British Maris Otter Pale'], 1, .7),)),
+        batch.BatchError('unreadable', "ValueError: could not convert string to float: 'abc'"),
+        bitter,
+    )
+
+
+def test__validate_recipes__reports_every_issue():
+    report = validation.validate_recipes(_bad_recipes())
+
+    assert not report.ok
+    assert report.recipe_count == 9
+    assert report.invalid_ids == ('unknown', 'caramalt', 'ratios', 'zeroes', 'empty', 'unhashable', 'unreadable')
+    assert [(issue.id, issue.field, issue.code) for issue in report] == [
+        ('unknown', 'grain_list[0]', validation.UNKNOWN_GRAIN),
+        ('caramalt', 'grain_list[0]', validation.DEGENERATE_GRAVITY),
+        ('ratios', 'grain_list', validation.RATIO_SUM),
+        ('zeroes', 'target_gravity', validation.BAD_TARGET_GRAVITY),
+        ('zeroes', 'volume', validation.BAD_VOLUME),
+        ('zeroes', 'water_grist_ratio', validation.BAD_WATER_GRIST_RATIO),
+        ('zeroes', 'grain_list[0]', validation.BAD_EFFICIENCY),
+        ('empty', 'volume', validation.NOT_A_NUMBER),
+        ('empty', 'grain_list', validation.NO_GRAINS),
+        ('unhashable', 'grain_list[0]', validation.UNKNOWN_GRAIN),
+        ('unreadable', 'recipe', validation.UNREADABLE),
+    ]
+    assert report.as_dict()['counts'][validation.UNKNOWN_GRAIN] == 2
+    assert report.as_dict()['invalid_recipes'] == 7
+    assert validation.validate_recipe(_bad_recipes()[-2])[0].code == validation.UNREADABLE
+
+    assert validation.validate_recipes(RECIPES).ok
+    assert validation.check_recipes(RECIPES).recipe_count == 2
+    with pytest.raises(validation.ValidationError) as error:
+        validation.check_recipes(_bad_recipes())
+    assert error.value.report.recipe_count == 9
+    assert str(error.value).startswith('7 of 9 recipes are invalid:  1 bad_efficiency')
+
+
+def test__validate_infusion():
+    assert validation.validate_infusion(150, 158, 210) == []
+
+    issue, = validation.validate_infusion(150, 158, 158, 'wit')
+    assert (issue.id, issue.field, issue.code) == ('wit', 'infusion_temp', validation.BAD_INFUSION_TEMP)
+    assert validation.validate_infusion(150, None, 210)[0].code == validation.NOT_A_NUMBER
+
+
+def test__main__validates_before_calculating(tmpdir, capsys):
+    source = tmpdir.join('recipes.jsonl')
+    source.write(JSONL_RECIPES + '{"id": "bad", "target_gravity": 1.05, "volume": 5, '
+                                 '"grains": [["Franco-Belges Kiln Coffee", 1, 0.7]]}\n')
+    sink = tmpdir.join('results.txt')
+
+    assert batch.main([str(source), '-o', str(sink), '--validate']) == 2
+    assert not sink.exists()
+    assert '"degenerate_gravity": 1' in capsys.readouterr().err
+
+
+def test__main__reports_unreadable_recipes(tmpdir, capsys):
+    source = tmpdir.join('recipes.csv')
+    source.write(CSV_RECIPES + 'bad ratio,1.050,5,,,,American Wheat,abc,0.7\n')
+    sink = tmpdir.join('results.txt')
+
+    assert batch.main([str(source), '-o', str(sink), '--validate']) == 2
+    report = json.loads(capsys.readouterr().err)
+    assert [(issue['id'], issue['code']) for issue in report['issues']] == [('bad ratio', validation.UNREADABLE)]
+
+
+def test__main__validates_standard_input(tmpdir, monkeypatch):
+    sink = tmpdir.join('results.jsonl')
+    monkeypatch.setattr('sys.stdin', io.StringIO(JSONL_RECIPES))
+
+    assert batch.main(['-', '-o', str(sink), '--output-format', 'json', '--validate']) == 0
+    assert [json.loads(line)['id'] for line in sink.readlines()] == ['wit', 'bitter']
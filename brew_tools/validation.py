@@ -0,0 +1,304 @@
+""" This module contains an up-front validation pass for batches of recipes.
+
+    (c) Aaron Morris, 2015
+    morris7200@gmail.com
+
+    Licensed under the GNU General Public License, v3
+
+    GPL Notice:  This file is part of BrewTools.
+
+    BrewTools is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    BrewTools is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with BrewTools.  If not, see <http://www.gnu.org/licenses/>
+
+    Validation finds the recipes the calculator would reject or get wrong before any of them are calculated:  unknown
+    grains (a KeyError deep in calc_grain_bill), grains with no gravity in the catalog (a negative ppg and silently
+    wrong weights), ratios that do not sum to 1, and inputs that divide by zero.  Every problem in the batch is
+    collected into one ValidationReport instead of stopping at the first.
+"""
+
+from collections import namedtuple
+from math import isnan
+from numbers import Number
+from brew_tools import calculator
+
+# the kinds of problem a ValidationIssue describes
+UNREADABLE = 'unreadable'
+NOT_A_NUMBER = 'not_a_number'
+BAD_TARGET_GRAVITY = 'bad_target_gravity'
+BAD_VOLUME = 'bad_volume'
+NO_GRAINS = 'no_grains'
+UNKNOWN_GRAIN = 'unknown_grain'
+DEGENERATE_GRAVITY = 'degenerate_gravity'
+BAD_RATIO = 'bad_ratio'
+RATIO_SUM = 'ratio_sum'
+BAD_EFFICIENCY = 'bad_efficiency'
+BAD_WATER_GRIST_RATIO = 'bad_water_grist_ratio'
+BAD_INFUSION_TEMP = 'bad_infusion_temp'
+
+# how far a recipe's grain ratios may sum from 1
+DEFAULT_RATIO_TOLERANCE = 0.001
+
+# the number of distinct grain lists remembered while validating a batch
+_MAX_CACHED_GRAIN_LISTS = 4096
+
+# field is the recipe field at fault, eg. 'grain_list[1]'
+ValidationIssue = namedtuple('ValidationIssue', 'id field code message')
+
+
+class ValidationReport(object):
+    """ The problems found in a batch of recipes.
+    """
+
+    def __init__(self, issues=None, recipe_count=0):
+        """ Create a report.
+
+        :param issues:  A list of ValidationIssues.
+        :param recipe_count:  The number of recipes validated.
+        """
+
+        self.issues = issues if issues is not None else []
+        self.recipe_count = recipe_count
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __iter__(self):
+        return iter(self.issues)
+
+    @property
+    def ok(self):
+        """ True when no problems were found.
+        """
+
+        return not self.issues
+
+    @property
+    def invalid_ids(self):
+        """ The ids of the recipes with problems, in input order.
+        """
+
+        return tuple(dict.fromkeys(issue.id for issue in self.issues))
+
+    def counts(self):
+        """ Counts the problems of each kind.
+
+        :return:  A dict of issue code to the number of issues.
+        """
+
+        counts = {}
+        for issue in self.issues:
+            counts[issue.code] = counts.get(issue.code, 0) + 1
+
+        return counts
+
+    def as_dict(self):
+        """ Gets the report as JSON-serializable data.
+
+        :return:  A dict with the recipe count, the invalid recipe count, counts by code and the issues.
+        """
+
+        return {
+            'recipes': self.recipe_count,
+            'invalid_recipes': len(self.invalid_ids),
+            'counts': self.counts(),
+            'issues': [issue._asdict() for issue in self.issues],
+        }
+
+
+class ValidationError(ValueError):
+    """ Raised when a batch of recipes fails validation.  The report attribute holds the ValidationReport.
+    """
+
+    def __init__(self, report):
+        super(ValidationError, self).__init__('{} of {} recipes are invalid:  {}'.format(
+            len(report.invalid_ids), report.recipe_count,
+            ', '.join('{} {}'.format(count, code) for (code, count) in sorted(report.counts().items()))))
+        self.report = report
+
+
+def _is_number(value):
+    return isinstance(value, Number) and not isinstance(value, bool) and not isnan(value)
+
+
+def _grain_list_issues(grain_list, table, ratio_tolerance):
+    # (field, code, message) problems of a grain list, independent of the recipe it belongs to
+    if not grain_list:
+        return (('grain_list', NO_GRAINS, 'The recipe has no grains.'),)
+
+    issues = []
+    ratio_sum = 0
+    for index, line in enumerate(grain_list):
+        field = 'grain_list[{}]'.format(index)
+        try:
+            grain, ratio, efficiency = line
+        except (TypeError, ValueError):
+            issues.append((field, NOT_A_NUMBER, 'Expected (grain_name, ratio, efficiency), got {!r}.'.format(line)))
+            continue
+
+        try:
+            grain_id = table.grain_id(grain)
+        except (KeyError, TypeError):
+            # a TypeError is an unhashable name, eg. a list where a string belongs
+            grain_id = None
+            issues.append((field, UNKNOWN_GRAIN, 'Unknown grain {!r}.'.format(grain)))
+        if grain_id is not None and table.ppgs[grain_id] <= 0:
+            issues.append((field, DEGENERATE_GRAVITY, '"{}" has a maximum gravity of {}.'.format(
+                grain, table.gravities[grain_id])))
+
+        if not _is_number(ratio):
+            issues.append((field, NOT_A_NUMBER, 'Ratio {!r} is not a number.'.format(ratio)))
+        elif ratio < 0:
+            issues.append((field, BAD_RATIO, 'Ratio {} is negative.'.format(ratio)))
+        else:
+            ratio_sum += ratio
+
+        if not _is_number(efficiency):
+            issues.append((field, NOT_A_NUMBER, 'Efficiency {!r} is not a number.'.format(efficiency)))
+        elif not 0 < efficiency <= 1:
+            issues.append((field, BAD_EFFICIENCY, 'Efficiency {} is not greater than 0 and at most 1.'.format(
+                efficiency)))
+
+    if not issues and abs(ratio_sum - 1) > ratio_tolerance:
+        issues.append(('grain_list', RATIO_SUM, 'Ratios sum to {:g}, not 1.'.format(ratio_sum)))
+
+    return tuple(issues)
+
+
+def validate_recipe(recipe, ratio_tolerance=DEFAULT_RATIO_TOLERANCE, table=None):
+    """ Finds the problems in one recipe.
+
+    :param recipe:  A batch.BatchRecipe, or any object with its fields, or the batch.BatchError a reader yields with
+        skip_errors for a recipe it could not read.
+    :param ratio_tolerance:  How far the grain ratios may sum from 1.  (Default is 0.001)
+    :param table:  The FermentableTable to check grains against.  (Default is the current one)
+    :return:  A list of ValidationIssues, empty when the recipe is valid.
+    """
+
+    # imported here because the batch module builds on this one
+    from brew_tools.batch import BatchError
+
+    if isinstance(recipe, BatchError):
+        return [ValidationIssue(recipe.id, 'recipe', UNREADABLE, recipe.error)]
+
+    table = table or calculator.get_fermentable_table()
+    return [ValidationIssue(recipe.id, field, code, message)
+            for (field, code, message) in _recipe_issues(recipe, table, ratio_tolerance, {})]
+
+
+def _recipe_issues(recipe, table, ratio_tolerance, grain_list_issues):
+    issues = []
+    if not _is_number(recipe.target_gravity):
+        issues.append(('target_gravity', NOT_A_NUMBER, 'Target gravity {!r} is not a number.'.format(
+            recipe.target_gravity)))
+    elif recipe.target_gravity <= 1:
+        issues.append(('target_gravity', BAD_TARGET_GRAVITY, 'Target gravity {} is not above 1.'.format(
+            recipe.target_gravity)))
+
+    if not _is_number(recipe.volume):
+        issues.append(('volume', NOT_A_NUMBER, 'Volume {!r} is not a number.'.format(recipe.volume)))
+    elif recipe.volume <= 0:
+        issues.append(('volume', BAD_VOLUME, 'Volume {} is not positive.'.format(recipe.volume)))
+
+    water_grist_ratio = getattr(recipe, 'water_grist_ratio', None)
+    if water_grist_ratio is not None:
+        if not _is_number(water_grist_ratio):
+            issues.append(('water_grist_ratio', NOT_A_NUMBER, 'Water-to-grist ratio {!r} is not a number.'.format(
+                water_grist_ratio)))
+        elif water_grist_ratio <= 0:
+            issues.append(('water_grist_ratio', BAD_WATER_GRIST_RATIO,
+                           'Water-to-grist ratio {} is not positive.'.format(water_grist_ratio)))
+
+    # recipes in a batch share few distinct grain lists, so each one is checked once
+    try:
+        grain_issues = grain_list_issues.get(recipe.grain_list)
+    except TypeError:
+        grain_issues = _grain_list_issues(recipe.grain_list, table, ratio_tolerance)
+    else:
+        if grain_issues is None:
+            if len(grain_list_issues) >= _MAX_CACHED_GRAIN_LISTS:
+                grain_list_issues.clear()
+            grain_issues = grain_list_issues[recipe.grain_list] = _grain_list_issues(
+                recipe.grain_list, table, ratio_tolerance)
+
+    issues.extend(grain_issues)
+    return issues
+
+
+def validate_recipes(recipes, ratio_tolerance=DEFAULT_RATIO_TOLERANCE):
+    """ Finds the problems in a batch of recipes in one pass, without calculating any of them.
+
+    :param recipes:  An iterable of batch.BatchRecipe tuples, such as batch.read_jsonl_recipes over an open file.
+        Recipes the reader could not read, the batch.BatchErrors it yields with skip_errors, are reported as
+        UNREADABLE.
+    :param ratio_tolerance:  How far each recipe's grain ratios may sum from 1.  (Default is 0.001)
+    :return:  The ValidationReport.
+    """
+
+    from brew_tools.batch import BatchError
+
+    table = calculator.get_fermentable_table()
+    grain_list_issues = {}
+    report = ValidationReport()
+    for recipe in recipes:
+        report.recipe_count += 1
+        if isinstance(recipe, BatchError):
+            report.issues.append(ValidationIssue(recipe.id, 'recipe', UNREADABLE, recipe.error))
+            continue
+
+        report.issues.extend(ValidationIssue(recipe.id, field, code, message)
+                             for (field, code, message) in _recipe_issues(recipe, table, ratio_tolerance,
+                                                                          grain_list_issues))
+
+    return report
+
+
+def check_recipes(recipes, ratio_tolerance=DEFAULT_RATIO_TOLERANCE):
+    """ Validates a batch of recipes, raising if any are invalid.
+
+    :param recipes:  An iterable of batch.BatchRecipe tuples.
+    :param ratio_tolerance:  How far each recipe's grain ratios may sum from 1.  (Default is 0.001)
+    :return:  The ValidationReport, when every recipe is valid.
+    :raises:
+        ValidationError when any recipe is invalid.
+    """
+
+    report = validate_recipes(recipes, ratio_tolerance)
+    if not report.ok:
+        raise ValidationError(report)
+
+    return report
+
+
+def validate_infusion(initial_temp, target_temp, infusion_temp, recipe_id=None):
+    """ Finds the problems in the temperatures given to calculator.calc_infusion_volume, which divides by
+    infusion_temp - target_temp.
+
+    :param initial_temp:  The current temperature of the mash, in degrees Fahrenheit.
+    :param target_temp:  The target temperature of the mash, in degrees Fahrenheit.
+    :param infusion_temp:  The temperature of the infusion water, in degrees Fahrenheit.
+    :param recipe_id:  The id to report the issues under.
+    :return:  A list of ValidationIssues, empty when the temperatures are valid.
+    """
+
+    issues = []
+    for field, value in (('initial_temp', initial_temp), ('target_temp', target_temp),
+                         ('infusion_temp', infusion_temp)):
+        if not _is_number(value):
+            issues.append(ValidationIssue(recipe_id, field, NOT_A_NUMBER, '{!r} is not a number.'.format(value)))
+
+    if not issues and infusion_temp <= target_temp:
+        issues.append(ValidationIssue(recipe_id, 'infusion_temp', BAD_INFUSION_TEMP,
+                                      'Infusion temperature {} is not above the target temperature {}.'.format(
+                                          infusion_temp, target_temp)))
+
+    return issues